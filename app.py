@@ -1,15 +1,31 @@
 import os
-from flask import Flask, render_template
+from flask import Flask, render_template, send_file, abort
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
 
+from backend.db import init_db
+from backend.services.write_behind import init_write_behind
+from backend.services.rate_limit import init_rate_limiter
+from backend.services.tenants import init_tenants
+from backend.services.metrics import init_metrics
+from backend.services.cache import init_cache
+from backend.services.storage import init_storage
+from backend.services.notifications import init_notifications
+from backend.services.materializer import init_materializer
+from backend.services.reports import init_reports
+from backend.services.assets import init_assets
+
 from backend.routes.auth import auth_bp
 from backend.routes.profile import profile_bp
 from backend.routes.health import health_bp
 from backend.routes.medication import medication_bp
 from backend.routes.insights import insights_bp
 from backend.routes.alerts import alerts_bp
+from backend.routes.export import export_bp
+from backend.routes.caregiver import caregiver_bp
+from backend.routes.sync import sync_bp
+from backend.routes.reports import reports_bp
 
 
 def create_app():
@@ -25,8 +41,70 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = 'super-secret-key-change-this'
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
+    # Write-behind buffering of health_logs inserts (off by default)
+    app.config['HEALTH_WRITE_BEHIND'] = os.environ.get('HEALTH_WRITE_BEHIND', '0') == '1'
+    app.config['WRITE_BEHIND_WAL_DIR'] = os.environ.get('WRITE_BEHIND_WAL_DIR', os.path.join(BASE_DIR, 'wal'))
+    app.config['WRITE_BEHIND_QUEUE_SIZE'] = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 10000))
+    app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    app.config['WRITE_BEHIND_FLUSH_SIZE'] = int(os.environ.get('WRITE_BEHIND_FLUSH_SIZE', 500))
+    app.config['WRITE_BEHIND_FSYNC'] = os.environ.get('WRITE_BEHIND_FSYNC', 'interval')
+
+    # MULTI_NODE=1 keeps every piece of shared state in Mongo so N stateless
+    # app nodes can run behind a load balancer
+    multi_node = os.environ.get('MULTI_NODE', '0') == '1'
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'mongo' if multi_node else 'local')
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'gridfs' if multi_node else 'local')
+
+    # Per-user rate limits on ingestion / polling: 'local', 'mongo' (shared by workers) or 'off'
+    app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'mongo' if multi_node else 'local')
+    app.config['MONGO_SHED_QUEUE'] = int(os.environ.get('MONGO_SHED_QUEUE', 50))
+
+    # Several clinics on one deployment: each gets its own database, connection pool and quotas
+    app.config['TENANT_MODE'] = os.environ.get('TENANT_MODE', '0') == '1'
+    app.config['TENANT_QUOTAS'] = {
+        "rate": float(os.environ.get('TENANT_RATE', 50)),          # sustained requests/s per clinic
+        "burst": int(os.environ.get('TENANT_BURST', 200)),
+        "max_users": int(os.environ['TENANT_MAX_USERS']) if os.environ.get('TENANT_MAX_USERS') else None,
+        "shed_queue": int(os.environ.get('TENANT_SHED_QUEUE', 20))  # waiting on the clinic's pool
+    }
+
+    # Request metrics at /metrics; X-Profile: 1 samples a request when profiling is enabled
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+    app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+    # Outbound alert notifications: comma-separated channels ('file', 'http'); empty = off
+    app.config['NOTIFY_CHANNELS'] = os.environ.get('NOTIFY_CHANNELS', '')
+    app.config['NOTIFY_FILE_PATH'] = os.environ.get('NOTIFY_FILE_PATH', os.path.join(BASE_DIR, 'notifications', 'outbox.jsonl'))
+    app.config['NOTIFY_HTTP_URL'] = os.environ.get('NOTIFY_HTTP_URL')
+    app.config['NOTIFY_DIGEST_WINDOW'] = int(os.environ.get('NOTIFY_DIGEST_WINDOW', 60))
+    app.config['NOTIFY_CONCURRENCY'] = os.environ.get('NOTIFY_CONCURRENCY', '')  # e.g. 'http=8,file=1'
+    app.config['NOTIFY_WORKERS'] = os.environ.get('NOTIFY_WORKERS', '1') == '1'
+
+    # Keep latest_vitals / trends / cached risk up to date from a change stream (replica set only)
+    app.config['MATERIALIZER'] = os.environ.get('MATERIALIZER', '0') == '1'
+
+    # Weekly / monthly reports rendered in a process pool as each period closes (off by default)
+    app.config['REPORT_SCHEDULE'] = os.environ.get('REPORT_SCHEDULE', '0') == '1'
+    app.config['REPORT_WORKERS'] = int(os.environ['REPORT_WORKERS']) if os.environ.get('REPORT_WORKERS') else None
+    app.config['REPORT_FORMATS'] = os.environ.get('REPORT_FORMATS', 'html')  # 'html', 'pdf' or 'html,pdf'
+
+    # Fingerprinted JS/CSS bundles: 'auto' rebuilds at startup when a source changed, 'off' uses the last build
+    app.config['ASSET_BUILD'] = os.environ.get('ASSET_BUILD', 'auto')
+
     CORS(app)
     JWTManager(app)
+    init_metrics(app)
+    init_db(app)
+    init_write_behind(app)
+    init_rate_limiter(app)
+    init_tenants(app)
+    init_cache(app)
+    init_storage(app)
+    init_notifications(app)
+    init_materializer(app)
+    init_reports(app)
+    init_assets(app)
 
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -35,6 +113,10 @@ def create_app():
     app.register_blueprint(medication_bp, url_prefix='/api/medication')
     app.register_blueprint(insights_bp, url_prefix='/api/insights')
     app.register_blueprint(alerts_bp, url_prefix='/api/alerts')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
+    app.register_blueprint(caregiver_bp, url_prefix='/api/caregiver')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
 
     # Frontend routes
     @app.route('/')
@@ -81,6 +163,15 @@ def create_app():
     def settings_page():
         return render_template('settings.html')
 
+    # Uploaded images, from local disk or shared storage
+    @app.route('/uploads/<filename>')
+    def uploaded_file(filename):
+        found = app.extensions['storage'].open(filename)
+        if found is None:
+            abort(404)
+        stream, content_type = found
+        return send_file(stream, mimetype=content_type, max_age=86400)
+
     return app
 
 if __name__ == '__main__':
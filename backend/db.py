@@ -1,13 +1,380 @@
-from flask import g
-from pymongo import MongoClient
+import functools
+import os
+import re
+import threading
+from flask import g, has_app_context
+from pymongo import HASHED, MongoClient
+from pymongo import monitoring
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from backend.services.metrics import command_timer
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+DB_NAME = os.environ.get('MONGO_DB_NAME', 'smart_wellness_db')
+
+# Replica-set read routing. When enabled every request runs in a causally
+# consistent session and read-heavy routes may be served by secondaries.
+READ_ROUTING = os.environ.get('MONGO_READ_ROUTING', '0') == '1'
+# How far behind the primary a secondary may be and still serve reads (server minimum: 90s)
+READ_MAX_STALENESS = int(os.environ.get('MONGO_READ_MAX_STALENESS', 90))
+
+READ_PREFERENCES = {
+    'history': SecondaryPreferred(max_staleness=READ_MAX_STALENESS),
+    'trends': SecondaryPreferred(max_staleness=READ_MAX_STALENESS),
+    'insights': SecondaryPreferred(max_staleness=READ_MAX_STALENESS),
+    # Freshly written state, e.g. latest vitals right after logging
+    'latest': Primary()
+}
+
+# Collection methods that take a session
+SESSION_METHODS = frozenset((
+    'find', 'find_one', 'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one', 'delete_one',
+    'delete_many', 'bulk_write', 'aggregate', 'count_documents', 'distinct', 'create_index'
+))
+WRITE_METHODS = frozenset((
+    'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete', 'insert_one',
+    'insert_many', 'update_one', 'update_many', 'replace_one', 'delete_one', 'delete_many', 'bulk_write'
+))
+
+# Multi-clinic deployments: every clinic (tenant) gets its own database on the
+# same cluster and its own connection pool. The default tenant keeps DB_NAME,
+# which also holds the shared collections (tenant registry, cache, queues).
+DEFAULT_TENANT = os.environ.get('DEFAULT_TENANT', 'default')
+# Connections per tenant pool, unless the tenant's registry entry sets max_pool_size
+TENANT_POOL_SIZE = int(os.environ.get('TENANT_POOL_SIZE', 20))
+TENANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9-]{0,30}$')
+TENANT_DB_SEPARATOR = '__'
+
+# Shard keys for the collections that grow with every reading. The tenant is
+# already part of the namespace, and every query on these collections has an
+# equality on user_id, so each one is routed to a single shard; hashing spreads
+# new users (whose ids only ever increase) across shards. Per-user documents
+# (profiles, latest_vitals, ...) stay unsharded on the tenant's primary shard.
+SHARD_KEYS = {
+    'health_logs': {"user_id": HASHED},
+    'alerts': {"user_id": HASHED},
+    'medication_events': {"user_id": HASHED},
+    'risk_history': {"user_id": HASHED},
+}
+
+_client = None
+_tenant_clients = {}
+_tenant_lock = threading.Lock()
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks how many operations are waiting for a pooled connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checked_out = 0
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+
+
+pool_monitor = PoolMonitor()
+# Tenant id -> PoolMonitor of that tenant's connection pool
+tenant_pools = {}
+
+def get_client(tenant_id=None, max_pool_size=None):
+    """
+    Process-wide MongoClient (it pools connections, so share one per process).
+    Other tenants than the default get a client of their own, so a busy clinic
+    can only exhaust its own pool; `max_pool_size` applies when it is created.
+    """
+    global _client
+    if tenant_id is None or tenant_id == DEFAULT_TENANT:
+        if _client is None:
+            _client = MongoClient(MONGO_URI, event_listeners=[pool_monitor, command_timer])
+        return _client
+    client = _tenant_clients.get(tenant_id)
+    if client is None:
+        with _tenant_lock:
+            client = _tenant_clients.get(tenant_id)
+            if client is None:
+                monitor = tenant_pools.setdefault(tenant_id, PoolMonitor())
+                client = MongoClient(MONGO_URI, maxPoolSize=max_pool_size or TENANT_POOL_SIZE,
+                                     event_listeners=[monitor, command_timer])
+                _tenant_clients[tenant_id] = client
+    return client
+
+def reset_clients():
+    """Forget clients inherited from a parent process (call first thing in a worker)"""
+    global _client
+    _client = None
+    _tenant_clients.clear()
+
+def tenant_db_name(tenant_id=None):
+    if tenant_id is None or tenant_id == DEFAULT_TENANT:
+        return DB_NAME
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+    return f"{DB_NAME}{TENANT_DB_SEPARATOR}{tenant_id}"
+
+def tenant_from_db_name(name):
+    """The tenant a database belongs to, or None for databases of other applications"""
+    if name == DB_NAME:
+        return DEFAULT_TENANT
+    prefix = DB_NAME + TENANT_DB_SEPARATOR
+    if name.startswith(prefix) and TENANT_ID_PATTERN.match(name[len(prefix):]):
+        return name[len(prefix):]
+    return None
+
+def current_tenant():
+    """Tenant of the current request or app context (set by services.tenants)"""
+    if has_app_context():
+        return g.get('tenant') or DEFAULT_TENANT
+    return DEFAULT_TENANT
+
+def connect(tenant_id=None):
+    """Database handle for code running outside a Flask request (CLIs, workers)"""
+    return get_client(tenant_id)[tenant_db_name(tenant_id)]
+
+
+class SessionCollection:
+    """Collection proxy that runs every operation in the request's session"""
+
+    def __init__(self, collection, session):
+        self._collection = collection
+        self._session = session
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in SESSION_METHODS:
+            return attr
+        if name in WRITE_METHODS:
+            g.mongo_wrote = True
+        return functools.partial(attr, session=self._session)
+
+
+class SessionDatabase:
+    """Database proxy handing out session-bound collections"""
+
+    def __init__(self, db, session):
+        self._db = db
+        self._session = session
+
+    def __getattr__(self, name):
+        if hasattr(Database, name):
+            return getattr(self._db, name)
+        return SessionCollection(self._db[name], self._session)
+
+    def __getitem__(self, name):
+        return SessionCollection(self._db[name], self._session)
+
+
+def _request_session():
+    if 'mongo_session' not in g:
+        g.mongo_session = get_client(current_tenant()).start_session(causal_consistency=True)
+    return g.mongo_session
 
 def get_db():
+    """Primary database handle for the current request, in the request's tenant database"""
     if 'db' not in g:
-        client = MongoClient('mongodb://localhost:27017/')
-        g.db = client['smart_wellness_db']
+        db = connect(current_tenant())
+        g.db = SessionDatabase(db, _request_session()) if READ_ROUTING else db
     return g.db
 
+def get_read_db(kind, user_id=None):
+    """
+    Database handle for a read-only route, using the read preference for
+    `kind` (see READ_PREFERENCES). The session is first advanced past the
+    user's last acknowledged write, kept in the shared (mongo) cache, so
+    secondaries wait until they have it: users always read their own
+    writes, even from another app node.
+    """
+    if not READ_ROUTING:
+        return get_db()
+    session = _request_session()
+    if user_id and not g.get('causal_user'):
+        g.causal_user = user_id
+        token = _load_causal_token(user_id)
+        if token:
+            session.advance_cluster_time(token['cluster_time'])
+            session.advance_operation_time(token['operation_time'])
+    tenant_id = current_tenant()
+    db = get_client(tenant_id).get_database(tenant_db_name(tenant_id), read_preference=READ_PREFERENCES[kind])
+    return SessionDatabase(db, session)
+
+def _load_causal_token(user_id):
+    from backend.services.cache import get_cache
+    cache = get_cache()
+    return cache.get(f"causal:{user_id}") if cache else None
+
+def end_request_session(exc=None):
+    """Remember the operation time of a request's writes for the user's later reads"""
+    session = g.pop('mongo_session', None)
+    if session is None:
+        return
+    try:
+        if g.pop('mongo_wrote', False) and session.operation_time is not None:
+            from flask_jwt_extended import get_jwt_identity
+            from backend.services.cache import get_cache
+            user_id = get_jwt_identity()
+            cache = get_cache()
+            if user_id and cache:
+                cache.set(f"causal:{user_id}", {
+                    "cluster_time": session.cluster_time,
+                    "operation_time": session.operation_time
+                }, ttl=READ_MAX_STALENESS * 2)
+    except Exception as e:
+        print(f"Causal Token Error: {e}")
+    finally:
+        session.end_session()
+
+# Attempts of a versioned read-modify-write before giving up under contention
+VERSIONED_RETRIES = 20
+
+def update_versioned(collection, key, apply):
+    """
+    Read-modify-write of the one document matching `key` (a unique field),
+    for state that can't be expressed as update operators (e.g. rolling
+    windows). `apply` gets the current document, or None, and returns the
+    new one, or None to leave it as it is. The write only lands if the
+    document's `version` is unchanged since it was read; otherwise it is
+    re-read and `apply` runs again, so concurrent writers never overwrite
+    each other's updates.
+    Returns the document as written (or as read, when left unchanged).
+    """
+    for _ in range(VERSIONED_RETRIES):
+        current = collection.find_one(key)
+        version = (current or {}).get('version', 0)
+        # Documents written before versioning have no field yet
+        expected = version if current is None or 'version' in current else {"$exists": False}
+        new = apply(current)
+        if new is None:
+            return current
+        new.pop('_id', None)
+        new.update(key, version=version + 1)
+        if current is None:
+            try:
+                collection.insert_one(new)
+                return new
+            except DuplicateKeyError:
+                continue  # Created concurrently (unique index on the key)
+        if collection.replace_one({**key, "version": expected}, new).matched_count:
+            return new
+    raise RuntimeError(f"Too much contention updating {collection.name} {key}")
+
+# Index options conflict with an existing index on the same keys
+INDEX_CONFLICT_CODES = (85, 86)
+
+class IndexSetupError(RuntimeError):
+    """An index the application relies on for correctness could not be built"""
+
+
+def _ensure_reading_indexes(db):
+    """
+    Live readings are indexed per user and timestamp but not unique (two in
+    the same millisecond are both kept). Imported readings are unique on
+    that key, so overlapping imports of one export can't store it twice.
+    """
+    keys = [("user_id", 1), ("timestamp", -1)]
+    try:
+        db.health_logs.create_index(keys)
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        # Left unique by an earlier version: rebuild it as a plain index
+        db.health_logs.drop_index(keys)
+        db.health_logs.create_index(keys)
+    try:
+        db.health_logs.create_index(
+            [("user_id", 1), ("timestamp", 1)], name='import_dedupe', unique=True,
+            partialFilterExpression={"source": "import"}
+        )
+    except OperationFailure as e:
+        raise IndexSetupError(
+            f"Can't build the unique index on imported readings ({e}); "
+            "remove duplicate imported health_logs and restart"
+        ) from e
+
+def ensure_indexes(db):
+    db.latest_vitals.create_index("user_id", unique=True)
+    db.profiles.create_index("user_id", unique=True)
+    db.medication_events.create_index([("user_id", 1), ("medication_id", 1), ("timestamp", -1)])
+    db.medication_adherence.create_index([("user_id", 1), ("medication_id", 1)], unique=True)
+    db.vitals_trends.create_index("user_id", unique=True)
+    db.vitals_baselines.create_index("user_id", unique=True)
+    db.export_jobs.create_index([("user_id", 1), ("created_at", -1)])
+    db.export_jobs.create_index("expires_at")
+    db.alerts.create_index([("user_id", 1), ("read", 1), ("timestamp", -1)])
+    db.alert_thresholds.create_index("user_id")
+    db.patient_groups.create_index("owner_id")
+    db.group_members.create_index([("group_id", 1), ("patient_id", 1)], unique=True)
+    db.group_members.create_index([("patient_id", 1), ("status", 1)])
+    # Delta sync reads each synced collection in change-sequence order
+    for name in ('health_logs', 'medications', 'alerts', 'profiles', 'alert_thresholds', 'sync_tombstones'):
+        db[name].create_index([("user_id", 1), ("sync_seq", 1)])
+    db.sync_tombstones.create_index("deleted_at", expireAfterSeconds=90 * 24 * 3600)
+    # Risk history buckets, newest first per user; kept for two years
+    db.risk_history.create_index([("user_id", 1), ("end", -1)])
+    db.risk_history.create_index("end", expireAfterSeconds=730 * 24 * 3600)
+    db.reports.create_index([("user_id", 1), ("period", 1), ("period_end", 1), ("format", 1)], unique=True)
+    db.reports.create_index([("user_id", 1), ("period_end", -1)])
+    # Shared rate-limit buckets expire once a key has been idle for an hour
+    db.rate_limits.create_index("updated_at", expireAfterSeconds=3600)
+    # Last, so duplicate imported readings (which fail the unique index) hold up no other index
+    _ensure_reading_indexes(db)
+
+def is_sharded(client):
+    """Whether the client talks to a sharded cluster (through mongos)"""
+    return client.admin.command('hello').get('msg') == 'isdbgrid'
+
+def shard_tenant(tenant_id=None, primary_shard=None):
+    """
+    Shard a tenant's growing collections on SHARD_KEYS. `primary_shard` places
+    the tenant's unsharded collections, so clinics can be spread over shards.
+    Returns False (and does nothing) when the cluster is not sharded.
+    """
+    client = get_client()
+    if not is_sharded(client):
+        return False
+    name = tenant_db_name(tenant_id)
+    options = {"primaryShard": primary_shard} if primary_shard else {}
+    client.admin.command('enableSharding', name, **options)
+    for collection, key in SHARD_KEYS.items():
+        # Collections that already hold data need the shard key index first
+        client[name][collection].create_index(list(key.items()))
+        client.admin.command('shardCollection', f"{name}.{collection}", key=key)
+    return True
+
 def init_db(app):
+    if READ_ROUTING:
+        if app.config.get('CACHE_BACKEND') != 'mongo':
+            # A token in process memory is invisible to the other workers and nodes
+            raise ValueError("MONGO_READ_ROUTING=1 needs CACHE_BACKEND=mongo to keep read-your-writes")
+        app.teardown_appcontext(end_request_session)
     with app.app_context():
-        # Optional: Index creation or initial setup can go here
-        pass
+        try:
+            ensure_indexes(get_db())
+        except IndexSetupError:
+            raise  # Imports would store duplicates: don't start without it
+        except Exception as e:
+            print(f"Index Setup Error: {e}")
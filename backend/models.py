@@ -0,0 +1,233 @@
+"""
+Compact record types for the documents every layer reads.
+
+Each is parsed once from BSON (casting and validating as it goes) and uses
+__slots__, so a reading is a fixed set of attributes instead of a per-instance
+dict. `get()` mirrors dict access so code written against raw documents keeps
+working when handed a record.
+"""
+import datetime
+
+from backend.services.validation import VITAL_RULES
+
+VITALS = tuple(field for field, *_ in VITAL_RULES)
+VITAL_RANGES = {field: (low, high) for field, _label, low, high, _unit in VITAL_RULES}
+
+
+def _to_int(val):
+    try:
+        return int(val) if val is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(val):
+    try:
+        return float(val) if val is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class Record:
+    __slots__ = ()
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def to_bson(self):
+        return {field: getattr(self, field) for field in self.__slots__ if getattr(self, field) is not None}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+    @classmethod
+    def coerce(cls, doc):
+        """Pass records through; parse anything else"""
+        return doc if isinstance(doc, cls) else cls.from_bson(doc)
+
+
+class HealthReading(Record):
+    __slots__ = ('user_id', 'timestamp', 'heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar', 'image_path')
+
+    def __init__(self, user_id=None, timestamp=None, heart_rate=None, bp_systolic=None,
+                 bp_diastolic=None, blood_sugar=None, image_path=None):
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.heart_rate = heart_rate
+        self.bp_systolic = bp_systolic
+        self.bp_diastolic = bp_diastolic
+        self.blood_sugar = blood_sugar
+        self.image_path = image_path
+
+    @classmethod
+    def from_bson(cls, doc, defaults=None):
+        """
+        Parse a health_logs / latest_vitals document. Vitals that can't be
+        cast are None; `defaults` fills vitals whose key is absent altogether.
+        """
+        doc = doc or {}
+        get = doc.get
+        if defaults:
+            vitals = [get(vital, defaults.get(vital)) for vital in VITALS]
+        else:
+            vitals = [get(vital) for vital in VITALS]
+        # Stored vitals are almost always ints already; only cast the odd ones
+        for i, value in enumerate(vitals):
+            if value.__class__ is not int:
+                vitals[i] = _to_int(value)
+        reading = cls.__new__(cls)
+        reading.user_id = get('user_id')
+        reading.timestamp = get('timestamp')
+        reading.heart_rate, reading.bp_systolic, reading.bp_diastolic, reading.blood_sugar = vitals
+        reading.image_path = get('image_path')
+        return reading
+
+    def out_of_range(self):
+        """Vitals outside the accepted input ranges (corrupt or legacy data)"""
+        bad = []
+        for vital in VITALS:
+            value = getattr(self, vital)
+            low, high = VITAL_RANGES[vital]
+            if value is not None and not low <= value <= high:
+                bad.append(vital)
+        return bad
+
+    def to_bson(self):
+        # Logs always carry every vital key, even when it is empty
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class Profile(Record):
+    __slots__ = ('user_id', 'full_name', 'age', 'gender', 'height', 'weight', 'bmi', 'activity_level')
+
+    def __init__(self, user_id=None, full_name=None, age=None, gender=None, height=None,
+                 weight=None, bmi=None, activity_level='moderate'):
+        self.user_id = user_id
+        self.full_name = full_name
+        self.age = age
+        self.gender = gender
+        self.height = height
+        self.weight = weight
+        self.bmi = bmi
+        self.activity_level = activity_level
+
+    @staticmethod
+    def compute_bmi(height, weight):
+        """BMI from height in cm and weight in kg, or None"""
+        if not height or not weight or height <= 0:
+            return None
+        h = height / 100
+        return round(weight / (h * h), 2)
+
+    @classmethod
+    def from_bson(cls, doc):
+        """
+        Parse a profiles document. A stored BMI wins (empty means unknown);
+        otherwise it is derived from height and weight.
+        """
+        doc = doc or {}
+        height = _to_float(doc.get('height'))
+        weight = _to_float(doc.get('weight'))
+        if 'bmi' in doc:
+            bmi = _to_float(doc['bmi']) if doc.get('bmi') else None
+        else:
+            bmi = cls.compute_bmi(height, weight)
+        return cls(
+            doc.get('user_id'),
+            doc.get('full_name') or doc.get('name'),
+            _to_int(doc.get('age', 30)),
+            doc.get('gender'),
+            height,
+            weight,
+            bmi,
+            doc.get('activity_level', 'moderate')
+        )
+
+
+class AlertThresholds(Record):
+    __slots__ = ('user_id', 'heart_rate_min', 'heart_rate_max', 'heart_rate_enabled', 'bp_systolic_max',
+                 'bp_diastolic_max', 'bp_enabled', 'blood_sugar_min', 'blood_sugar_max', 'blood_sugar_enabled')
+
+    DEFAULTS = {
+        "heart_rate_min": 60,
+        "heart_rate_max": 100,
+        "heart_rate_enabled": True,
+        "bp_systolic_max": 140,
+        "bp_diastolic_max": 90,
+        "bp_enabled": True,
+        "blood_sugar_min": 70,
+        "blood_sugar_max": 140,
+        "blood_sugar_enabled": True
+    }
+
+    def __init__(self, user_id=None, **values):
+        self.user_id = user_id
+        for field, default in self.DEFAULTS.items():
+            setattr(self, field, values.get(field, default))
+
+    @classmethod
+    def from_bson(cls, doc):
+        doc = doc or {}
+        values = {}
+        for field, default in cls.DEFAULTS.items():
+            if isinstance(default, bool):
+                values[field] = bool(doc.get(field, default))
+            else:
+                value = _to_int(doc.get(field))
+                values[field] = default if value is None else value
+        return cls(doc.get('user_id'), **values)
+
+    def breaches(self, reading):
+        """Alert messages for a reading checked against these thresholds"""
+        messages = []
+        hr = reading.heart_rate
+        if hr and self.heart_rate_enabled:
+            if hr > self.heart_rate_max or hr < self.heart_rate_min:
+                messages.append(f"Heart Rate Alert: {hr} BPM (Range: {self.heart_rate_min}-{self.heart_rate_max})")
+
+        if reading.bp_systolic and self.bp_enabled:
+            if reading.bp_systolic > self.bp_systolic_max:
+                messages.append(f"Blood Pressure Alert: {reading.bp_systolic}/{reading.bp_diastolic} mmHg")
+
+        sugar = reading.blood_sugar
+        if sugar and self.blood_sugar_enabled:
+            if sugar > self.blood_sugar_max or sugar < self.blood_sugar_min:
+                messages.append(f"Blood Sugar Alert: {sugar} mg/dL")
+        return messages
+
+
+class Alert(Record):
+    __slots__ = ('user_id', 'timestamp', 'alerts', 'read', 'severity', 'type', 'details')
+
+    SEVERITIES = ('warning', 'critical')
+
+    def __init__(self, user_id, alerts, severity='warning', type=None, timestamp=None, read=False, details=None):
+        if severity not in self.SEVERITIES:
+            raise ValueError(f"Unknown alert severity: {severity}")
+        self.user_id = user_id
+        self.timestamp = timestamp or datetime.datetime.utcnow()
+        self.alerts = list(alerts)
+        self.read = read
+        self.severity = severity
+        self.type = type
+        self.details = details
+
+    @classmethod
+    def from_bson(cls, doc):
+        severity = doc.get('severity', 'warning')
+        return cls(
+            doc.get('user_id'),
+            doc.get('alerts') or [],
+            severity if severity in cls.SEVERITIES else 'warning',
+            doc.get('type'),
+            doc.get('timestamp'),
+            bool(doc.get('read', False)),
+            doc.get('details')
+        )
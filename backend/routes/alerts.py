@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.db import get_db
+from backend.db import get_db, get_read_db
+from backend.models import Alert, AlertThresholds, HealthReading
+from backend.services.cache import invalidate
+from backend.services.notifications import enqueue_alert
+from backend.services.sync import stamp, sync_fields
 import datetime
 
 alerts_bp = Blueprint('alerts', __name__)
@@ -59,7 +63,8 @@ def update_thresholds():
         "blood_sugar_min": data.get('blood_sugar_min', 70),
         "blood_sugar_max": data.get('blood_sugar_max', 140),
         "blood_sugar_enabled": data.get('blood_sugar_enabled', True),
-        "updated_at": datetime.datetime.utcnow()
+        "updated_at": datetime.datetime.utcnow(),
+        **sync_fields(db, user_id)
     }
     
     db.alert_thresholds.update_one(
@@ -67,6 +72,7 @@ def update_thresholds():
         {"$set": threshold_data},
         upsert=True
     )
+    invalidate(user_id, 'thresholds')
     
     return jsonify({"msg": "Thresholds updated successfully"}), 200
 
@@ -75,7 +81,7 @@ def update_thresholds():
 def get_alerts():
     """Get user's alerts"""
     user_id = get_jwt_identity()
-    db = get_db()
+    db = get_read_db('history', user_id)
     
     # Get unread alerts
     unread = list(db.alerts.find({
@@ -109,7 +115,7 @@ def mark_read(alert_id):
     
     db.alerts.update_one(
         {"_id": ObjectId(alert_id), "user_id": user_id},
-        {"$set": {"read": True, "read_at": datetime.datetime.utcnow()}}
+        {"$set": {"read": True, "read_at": datetime.datetime.utcnow(), **sync_fields(db, user_id)}}
     )
     
     return jsonify({"msg": "Alert marked as read"}), 200
@@ -125,68 +131,64 @@ def check_alerts():
     latest = db.latest_vitals.find_one({"user_id": user_id})
     if not latest:
         return jsonify({"msg": "No vitals data available"}), 400
+    latest = HealthReading.from_bson(latest)
     
     # Get thresholds
     thresholds = db.alert_thresholds.find_one({"user_id": user_id})
     if not thresholds:
         return jsonify({"msg": "No thresholds set"}), 400
+    thresholds = AlertThresholds.from_bson(thresholds)
     
     alerts = []
     
     # Check heart rate
-    if latest.get('heart_rate') and thresholds.get('heart_rate_enabled'):
-        hr = int(latest.get('heart_rate'))
-        if hr > thresholds.get('heart_rate_max', 100):
+    hr = latest.heart_rate
+    if hr and thresholds.heart_rate_enabled:
+        if hr > thresholds.heart_rate_max:
             alerts.append({
                 "type": "heart_rate",
-                "message": f"Heart Rate Alert: {hr} BPM exceeds maximum threshold ({thresholds.get('heart_rate_max')} BPM)",
-                "severity": "warning" if hr < thresholds.get('heart_rate_max', 100) + 20 else "critical"
+                "message": f"Heart Rate Alert: {hr} BPM exceeds maximum threshold ({thresholds.heart_rate_max} BPM)",
+                "severity": "warning" if hr < thresholds.heart_rate_max + 20 else "critical"
             })
-        elif hr < thresholds.get('heart_rate_min', 60):
+        elif hr < thresholds.heart_rate_min:
             alerts.append({
                 "type": "heart_rate",
-                "message": f"Heart Rate Alert: {hr} BPM below minimum threshold ({thresholds.get('heart_rate_min')} BPM)",
-                "severity": "warning" if hr > thresholds.get('heart_rate_min', 60) - 20 else "critical"
+                "message": f"Heart Rate Alert: {hr} BPM below minimum threshold ({thresholds.heart_rate_min} BPM)",
+                "severity": "warning" if hr > thresholds.heart_rate_min - 20 else "critical"
             })
     
     # Check blood pressure
-    if latest.get('bp_systolic') and thresholds.get('bp_enabled'):
-        sys = int(latest.get('bp_systolic'))
-        dia = int(latest.get('bp_diastolic', 80))
-        if sys > thresholds.get('bp_systolic_max', 140):
+    if latest.bp_systolic and thresholds.bp_enabled:
+        sys = latest.bp_systolic
+        dia = latest.get('bp_diastolic', 80)
+        if sys > thresholds.bp_systolic_max:
             alerts.append({
                 "type": "blood_pressure",
-                "message": f"Blood Pressure Alert: {sys}/{dia} mmHg exceeds threshold ({thresholds.get('bp_systolic_max')}/{thresholds.get('bp_diastolic_max', 90)} mmHg)",
-                "severity": "warning" if sys < thresholds.get('bp_systolic_max', 140) + 20 else "critical"
+                "message": f"Blood Pressure Alert: {sys}/{dia} mmHg exceeds threshold ({thresholds.bp_systolic_max}/{thresholds.bp_diastolic_max} mmHg)",
+                "severity": "warning" if sys < thresholds.bp_systolic_max + 20 else "critical"
             })
     
     # Check blood sugar
-    if latest.get('blood_sugar') and thresholds.get('blood_sugar_enabled'):
-        sugar = int(latest.get('blood_sugar'))
-        if sugar > thresholds.get('blood_sugar_max', 140):
+    sugar = latest.blood_sugar
+    if sugar and thresholds.blood_sugar_enabled:
+        if sugar > thresholds.blood_sugar_max:
             alerts.append({
                 "type": "blood_sugar",
-                "message": f"Blood Sugar Alert: {sugar} mg/dL exceeds maximum threshold ({thresholds.get('blood_sugar_max')} mg/dL)",
-                "severity": "warning" if sugar < thresholds.get('blood_sugar_max', 140) + 30 else "critical"
+                "message": f"Blood Sugar Alert: {sugar} mg/dL exceeds maximum threshold ({thresholds.blood_sugar_max} mg/dL)",
+                "severity": "warning" if sugar < thresholds.blood_sugar_max + 30 else "critical"
             })
-        elif sugar < thresholds.get('blood_sugar_min', 70):
+        elif sugar < thresholds.blood_sugar_min:
             alerts.append({
                 "type": "blood_sugar",
-                "message": f"Blood Sugar Alert: {sugar} mg/dL below minimum threshold ({thresholds.get('blood_sugar_min')} mg/dL)",
+                "message": f"Blood Sugar Alert: {sugar} mg/dL below minimum threshold ({thresholds.blood_sugar_min} mg/dL)",
                 "severity": "critical"
             })
     
     # Save alerts if any
     if alerts:
         for alert in alerts:
-            db.alerts.insert_one({
-                "user_id": user_id,
-                "timestamp": datetime.datetime.utcnow(),
-                "alerts": [alert['message']],
-                "read": False,
-                "severity": alert['severity'],
-                "type": alert['type']
-            })
+            record = Alert(user_id, [alert['message']], alert['severity'], type=alert['type'])
+            enqueue_alert(record, db.alerts.insert_one(stamp(db, user_id, record.to_bson())).inserted_id)
     
     return jsonify({
         "alerts": alerts,
@@ -206,14 +208,13 @@ def create_manual_alert():
     
     if not alert_text:
         return jsonify({"msg": "Alert text is required"}), 400
+    
+    try:
+        # Stored as list for consistency with auto alerts
+        alert = Alert(user_id, [alert_text], severity, type="manual")
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
         
-    db.alerts.insert_one({
-        "user_id": user_id,
-        "timestamp": datetime.datetime.utcnow(),
-        "alerts": [alert_text], # Stored as list for consistency with auto alerts
-        "read": False,
-        "severity": severity,
-        "type": "manual"
-    })
+    enqueue_alert(alert, db.alerts.insert_one(stamp(db, user_id, alert.to_bson())).inserted_id)
     
     return jsonify({"msg": "Manual alert created"}), 201
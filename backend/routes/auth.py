@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from backend.db import get_db
+from backend.db import current_tenant, get_db
+from backend.services.tenants import tenant_quota
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 import datetime
@@ -20,6 +21,10 @@ def register():
     if db.users.find_one({"email": email}):
         return jsonify({"msg": "User already exists"}), 409
 
+    max_users = tenant_quota('max_users')
+    if max_users and db.users.count_documents({}) >= max_users:
+        return jsonify({"msg": "This clinic has reached its user limit"}), 403
+
     hashed_password = generate_password_hash(password)
     user_id = db.users.insert_one({
         "email": email,
@@ -42,5 +47,6 @@ def login():
     if not user or not check_password_hash(user['password'], password):
         return jsonify({"msg": "Bad email or password"}), 401
 
-    access_token = create_access_token(identity=str(user['_id']))
+    # Later requests are served from the clinic the user signed in to
+    access_token = create_access_token(identity=str(user['_id']), additional_claims={"tenant": current_tenant()})
     return jsonify({"access_token": access_token, "name": user.get('name')}), 200
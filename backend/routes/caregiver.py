@@ -0,0 +1,112 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.db import get_db, get_read_db
+from backend.services.cache import get_cache
+from backend.services.caregiver import (
+    SEVERITIES, create_group, find_group, list_groups, invite_patient, remove_patient,
+    pending_invitations, respond_to_invitation, active_patient_ids, build_panel
+)
+from backend.services.metrics import span
+
+caregiver_bp = Blueprint('caregiver', __name__)
+
+MAX_PAGE_SIZE = 200
+
+@caregiver_bp.route('/groups', methods=['GET'])
+@jwt_required()
+def get_groups():
+    """Patient groups the caller looks after"""
+    return jsonify(list_groups(get_db(), get_jwt_identity())), 200
+
+@caregiver_bp.route('/groups', methods=['POST'])
+@jwt_required()
+def add_group():
+    data = request.get_json(silent=True) or {}
+    name = str(data.get('name', '')).strip()
+    if not name:
+        return jsonify({"msg": "Group name is required"}), 400
+    group_id = create_group(get_db(), get_jwt_identity(), name)
+    return jsonify({"msg": "Group created", "group_id": str(group_id)}), 201
+
+@caregiver_bp.route('/groups/<group_id>/patients', methods=['POST'])
+@jwt_required()
+def add_patient(group_id):
+    """Invite a patient by email; they show up once they accept"""
+    db = get_db()
+    if not find_group(db, group_id, get_jwt_identity()):
+        return jsonify({"msg": "Group not found"}), 404
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    if not email:
+        return jsonify({"msg": "Patient email is required"}), 400
+    try:
+        patient_id = invite_patient(db, group_id, email)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 404
+    return jsonify({"msg": "Invitation sent", "patient_id": patient_id}), 201
+
+@caregiver_bp.route('/groups/<group_id>/patients/<patient_id>', methods=['DELETE'])
+@jwt_required()
+def delete_patient(group_id, patient_id):
+    db = get_db()
+    if not find_group(db, group_id, get_jwt_identity()):
+        return jsonify({"msg": "Group not found"}), 404
+    if not remove_patient(db, group_id, patient_id):
+        return jsonify({"msg": "Patient not in group"}), 404
+    return jsonify({"msg": "Patient removed"}), 200
+
+@caregiver_bp.route('/invitations', methods=['GET'])
+@jwt_required()
+def get_invitations():
+    """Groups that want to monitor the caller"""
+    return jsonify(pending_invitations(get_db(), get_jwt_identity())), 200
+
+@caregiver_bp.route('/invitations/<membership_id>', methods=['POST'])
+@jwt_required()
+def answer_invitation(membership_id):
+    data = request.get_json(silent=True) or {}
+    accept = bool(data.get('accept'))
+    if not respond_to_invitation(get_db(), membership_id, get_jwt_identity(), accept):
+        return jsonify({"msg": "Invitation not found"}), 404
+    return jsonify({"msg": "Invitation accepted" if accept else "Invitation declined"}), 200
+
+@caregiver_bp.route('/groups/<group_id>/panel', methods=['GET'])
+@jwt_required()
+def get_panel(group_id):
+    """
+    Latest vitals, unread alerts and risk for every patient in the group,
+    most urgent first, one page at a time
+    """
+    group = find_group(get_db(), group_id, get_jwt_identity())
+    if not group:
+        return jsonify({"msg": "Group not found"}), 404
+
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = max(1, min(int(request.args.get('per_page', 50)), MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"msg": "page and per_page must be integers"}), 400
+    severity = request.args.get('severity')
+    if severity and severity not in SEVERITIES:
+        return jsonify({"msg": f"severity must be one of: {', '.join(SEVERITIES)}"}), 400
+
+    # Monitoring wants fresh vitals and alerts, so read from the primary
+    db = get_read_db('latest')
+    with span('caregiver_panel'):
+        rows = build_panel(db, active_patient_ids(db, group_id), get_cache())
+
+    summary = {name: 0 for name in SEVERITIES}
+    for row in rows:
+        summary[row['severity']] += 1
+    if severity:
+        rows = [row for row in rows if row['severity'] == severity]
+
+    start = (page - 1) * per_page
+    return jsonify({
+        "group": {"_id": str(group['_id']), "name": group['name']},
+        "summary": summary,
+        "total": len(rows),
+        "page": page,
+        "per_page": per_page,
+        "patients": rows[start:start + per_page]
+    }), 200
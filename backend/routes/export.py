@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify, send_file, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.db import get_db
+from backend.services.export import available_formats, resume_stale_job, start_export_job
+from backend.services.storage import get_export_storage
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+import datetime
+
+export_bp = Blueprint('export', __name__)
+
+def _find_job(job_id, user_id):
+    try:
+        return get_db().export_jobs.find_one({"_id": ObjectId(job_id), "user_id": user_id})
+    except InvalidId:
+        return None
+
+@export_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_export():
+    """Start a background export of the user's full vitals history"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', 'csv')
+
+    if fmt not in available_formats():
+        return jsonify({"msg": f"Format must be one of: {', '.join(available_formats())}"}), 400
+
+    job_id = start_export_job(get_db(), user_id, fmt)
+    return jsonify({
+        "msg": "Export started",
+        "job_id": str(job_id),
+        "status_url": url_for('export.get_export', job_id=str(job_id))
+    }), 202
+
+@export_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export(job_id):
+    """Export job status, with a download link once it is done"""
+    job = _find_job(job_id, get_jwt_identity())
+    if not job:
+        return jsonify({"msg": "Export not found"}), 404
+
+    job = resume_stale_job(get_db(), job)
+    job['_id'] = str(job['_id'])
+    for key in ('created_at', 'started_at', 'finished_at', 'lease_until', 'expires_at'):
+        if isinstance(job.get(key), datetime.datetime):
+            job[key] = job[key].isoformat()
+    if job['status'] == 'done':
+        job['download_url'] = url_for('export.download_export', job_id=job['_id'])
+    return jsonify(job), 200
+
+@export_bp.route('/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export(job_id):
+    job = _find_job(job_id, get_jwt_identity())
+    if not job or job['status'] != 'done':
+        return jsonify({"msg": "Export not ready"}), 404
+    if job.get('expires_at') and job['expires_at'] < datetime.datetime.utcnow():
+        return jsonify({"msg": "Export has expired"}), 404
+    found = get_export_storage().open(job['filename'])
+    if found is None:
+        return jsonify({"msg": "Export file is gone"}), 404
+    stream, content_type = found
+    return send_file(stream, mimetype=content_type, as_attachment=True, download_name=job['filename'])
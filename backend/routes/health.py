@@ -1,17 +1,36 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.db import get_db
-from backend.services.risk_model import calculate_risk_score
+from backend.db import get_db, get_read_db
+from backend.services.risk_model import calculate_risk_score, registry
+from backend.services.adherence import active_medication_ids, get_adherence, summarize_adherence
+from backend.services.trends import get_trends
+from backend.services.materializer import materialize_reading
+from backend.services.validation import validate_vitals, ValidationError
+from backend.services.importer import import_readings, detect_format
+from backend.services.rate_limit import rate_limited
+from backend.services.metrics import span
+from backend.models import Alert, AlertThresholds, HealthReading
+from backend.services.cache import cached, invalidate
+from backend.services.storage import get_storage
+from backend.services.notifications import enqueue_alert
+from backend.services.sync import stamp
+from backend.services.risk_history import DEFAULT_RANGE_DAYS, input_fingerprint, record_snapshot, risk_history
 import datetime
 
 health_bp = Blueprint('health', __name__)
 
-import os
+# Upper bound for /logs; larger histories are exported in batches
+MAX_LOG_LIMIT = 1000
+
+import csv
+import io
+import queue
 from werkzeug.utils import secure_filename
 from flask import current_app
 
 @health_bp.route('/log', methods=['POST'])
 @jwt_required()
+@rate_limited('health_log')
 def log_health_data():
     user_id = get_jwt_identity()
     
@@ -23,57 +42,29 @@ def log_health_data():
         data = request.get_json() or {}
         image_file = None
     
-    # Helper to clean input
-    def clean_input(val):
-        if val is None: return None
-        if isinstance(val, str):
-            val = val.strip()
-            if val == '' or val.lower() == 'null': return None
-            # Allow generic casting
-            try:
-                return int(val)
-            except ValueError:
-                return 'invalid'
-        return int(val)
-
     # Validate inputs
     try:
-        heart_rate = clean_input(data.get('heart_rate'))
-        bp_systolic = clean_input(data.get('bp_systolic'))
-        bp_diastolic = clean_input(data.get('bp_diastolic'))
-        blood_sugar = clean_input(data.get('blood_sugar'))
-
-        if heart_rate == 'invalid': return jsonify({"msg": "Heart rate must be a number"}), 400
-        if bp_systolic == 'invalid': return jsonify({"msg": "Systolic BP must be a number"}), 400
-        if bp_diastolic == 'invalid': return jsonify({"msg": "Diastolic BP must be a number"}), 400
-        if blood_sugar == 'invalid': return jsonify({"msg": "Blood sugar must be a number"}), 400
-
-        if heart_rate is not None and (heart_rate < 30 or heart_rate > 220):
-            return jsonify({"msg": "Heart rate must be between 30-220 BPM"}), 400
-        if bp_systolic is not None and (bp_systolic < 70 or bp_systolic > 250):
-            return jsonify({"msg": "Systolic BP must be between 70-250 mmHg"}), 400
-        if bp_diastolic is not None and (bp_diastolic < 40 or bp_diastolic > 150):
-            return jsonify({"msg": "Diastolic BP must be between 40-150 mmHg"}), 400
-        if blood_sugar is not None and (blood_sugar < 50 or blood_sugar > 500):
-            return jsonify({"msg": "Blood sugar must be between 50-500 mg/dL"}), 400
-
+        vitals = validate_vitals(data)
+    except ValidationError as e:
+        return jsonify({"msg": str(e)}), 400
     except (ValueError, TypeError) as e:
         print(f"Validation Error: {e}")
         return jsonify({"msg": "Invalid input formatting."}), 400
+
+    heart_rate = vitals['heart_rate']
+    bp_systolic = vitals['bp_systolic']
+    bp_diastolic = vitals['bp_diastolic']
+    blood_sugar = vitals['blood_sugar']
     
     # Handle Image Upload
     image_path = None
     if image_file and image_file.filename:
         try:
             filename = secure_filename(f"{user_id}_{datetime.datetime.utcnow().timestamp()}_{image_file.filename}")
-            # Ensure upload directory exists
-            upload_dir = os.path.join(current_app.static_folder, 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
+            # Local disk or shared storage, depending on STORAGE_BACKEND
+            get_storage().save(filename, image_file.stream, image_file.mimetype)
             
-            save_path = os.path.join(upload_dir, filename)
-            image_file.save(save_path)
-            
-            # Save relative path for frontend access
+            # Save relative path for frontend access (served by /uploads/<filename>)
             image_path = f"uploads/{filename}" 
         except Exception as e:
             print(f"Image Save Error: {e}")
@@ -91,94 +82,103 @@ def log_health_data():
     }
     
     db = get_db()
-    
-    # Create a copy for latest_vitals BEFORE inserting to logs (which adds _id)
-    latest_entry_base = entry.copy()
 
-    try:
-        db.health_logs.insert_one(entry)
-    except Exception as e:
-         print(f"Mongo Insert Error: {e}")
-         return jsonify({"msg": "Database insert error"}), 500
-    
-    # Update latest vitals - use the clean copy
-    try:
-        # Ensure we don't try to set _id in the update
-        if '_id' in latest_entry_base:
-            del latest_entry_base['_id']
-            
-        latest_entry_data = {
-            **latest_entry_base,
-            "updated_at": datetime.datetime.utcnow()
-        }
-        
-        db.latest_vitals.update_one(
-            {"user_id": user_id},
-            {"$set": latest_entry_data},
-            upsert=True
-        )
-            
-    except Exception as e:
-        print(f"Error updating latest_vitals: {e}")
-        # We don't block the request if this fails, but we assume the log was inserted.
-            
-    except Exception as e:
-        print(f"Error updating latest_vitals: {e}")
-        # We don't block the request if this fails, but we assume the log was inserted.
+    # With write-behind enabled the reading is acknowledged once it is in the
+    # local WAL; it reaches health_logs on the next flush (202 instead of 201)
+    # and is given its sync stamp by the flusher
+    write_behind = current_app.extensions.get('write_behind')
+    if write_behind:
+        try:
+            write_behind.submit(entry)
+        except queue.Full:
+            return jsonify({"msg": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+        except OSError as e:
+            print(f"WAL Write Error: {e}")
+            return jsonify({"msg": "Database insert error"}), 500
+    else:
+        try:
+            db.health_logs.insert_one(stamp(db, user_id, entry))
+        except Exception as e:
+             print(f"Mongo Insert Error: {e}")
+             return jsonify({"msg": "Database insert error"}), 500
     
     # Check for abnormalities using user-defined thresholds
     alerts = []
     try:
-        user_thresholds = db.alert_thresholds.find_one({"user_id": user_id})
+        reading = HealthReading.from_bson(entry)
+        user_thresholds = cached(
+            'thresholds', user_id,
+            lambda: db.alert_thresholds.find_one({"user_id": user_id}, {"_id": 0})
+        )
         
         if user_thresholds:
-            if heart_rate and user_thresholds.get('heart_rate_enabled'):
-                hr_max = user_thresholds.get('heart_rate_max', 100)
-                hr_min = user_thresholds.get('heart_rate_min', 60)
-                if int(heart_rate) > hr_max or int(heart_rate) < hr_min:
-                    alerts.append(f"Heart Rate Alert: {heart_rate} BPM (Range: {hr_min}-{hr_max})")
-            
-            if bp_systolic and user_thresholds.get('bp_enabled'):
-                bp_max = user_thresholds.get('bp_systolic_max', 140)
-                if int(bp_systolic) > bp_max:
-                    alerts.append(f"Blood Pressure Alert: {bp_systolic}/{bp_diastolic} mmHg")
-            
-            if blood_sugar and user_thresholds.get('blood_sugar_enabled'):
-                sugar_max = user_thresholds.get('blood_sugar_max', 140)
-                sugar_min = user_thresholds.get('blood_sugar_min', 70)
-                if int(blood_sugar) > sugar_max or int(blood_sugar) < sugar_min:
-                    alerts.append(f"Blood Sugar Alert: {blood_sugar} mg/dL")
+            alerts = AlertThresholds.from_bson(user_thresholds).breaches(reading)
         else:
             # Default thresholds
-            if heart_rate and (int(heart_rate) > 100 or int(heart_rate) < 60):
+            if reading.heart_rate and (reading.heart_rate > 100 or reading.heart_rate < 60):
                 alerts.append("Abnormal Heart Rate")
-            if blood_sugar and int(blood_sugar) > 140:
+            if reading.blood_sugar and reading.blood_sugar > 140:
                 alerts.append("High Blood Sugar")
             
         if alerts:
-            db.alerts.insert_one({
-                "user_id": user_id,
-                "timestamp": datetime.datetime.utcnow(),
-                "alerts": alerts,
-                "read": False,
-                "severity": "warning" if len(alerts) == 1 else "critical"
-            })
+            alert = Alert(user_id, alerts, "warning" if len(alerts) == 1 else "critical")
+            enqueue_alert(alert, db.alerts.insert_one(stamp(db, user_id, alert.to_bson())).inserted_id)
     except Exception as e:
         print(f"Alert Processing Error: {e}")
+    
+    # latest_vitals, trends, anomaly baselines and cached risk follow from the
+    # insert; the materializer keeps them up to date from the change stream
+    if not current_app.extensions.get('materializer'):
+        alerts.extend(materialize_reading(db, entry))
+        # Cached risk / insights for this user are stale now, on every node
+        invalidate(user_id, 'vitals')
+        if not write_behind:
+            # A queued reading is not in health_logs yet; its score is recorded on the next read
+            refresh_risk(user_id)
         
+    if write_behind:
+        return jsonify({"msg": "Logged successfully", "alerts": alerts, "queued": True}), 202
     return jsonify({"msg": "Logged successfully", "alerts": alerts}), 201
 
+@health_bp.route('/import', methods=['POST'])
+@jwt_required()
+@rate_limited('health_import')
+def import_health_data():
+    """Backfill historical readings from a CSV / JSON device export (no alerts are raised)"""
+    user_id = get_jwt_identity()
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"msg": "Upload a CSV or JSON file in the 'file' field"}), 400
+
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    if fmt not in ('csv', 'json', 'jsonl'):
+        return jsonify({"msg": "Format must be csv, json or jsonl"}), 400
+
+    # Decode the upload as a text stream so rows are processed as they are read
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        report = import_readings(get_db(), user_id, stream, fmt)
+    except (ValueError, UnicodeDecodeError, csv.Error, TypeError) as e:
+        print(f"Import Error: {e}")
+        return jsonify({"msg": "Could not parse the uploaded file"}), 400
+
+    if report['inserted']:
+        invalidate(user_id, 'vitals')
+        refresh_risk(user_id)
+    return jsonify({"msg": "Import complete", **report}), 201
+
 @health_bp.route('/logs', methods=['GET'])
 @jwt_required()
 def get_logs():
     user_id = get_jwt_identity()
-    db = get_db()
+    db = get_read_db('history', user_id)
     
-    # Get limit param
+    # Get limit param (full history goes through /api/export instead)
     try:
         limit = int(request.args.get('limit', 50))
     except ValueError:
         limit = 50
+    limit = max(1, min(limit, MAX_LOG_LIMIT))
         
     logs = list(db.health_logs.find({"user_id": user_id}).sort("timestamp", -1).limit(limit))
     for log in logs:
@@ -190,9 +190,9 @@ def get_logs():
 @health_bp.route('/latest', methods=['GET'])
 @jwt_required()
 def get_latest_vitals():
-    """Get the latest vitals for the user"""
+    """Get the latest vitals for the user (from the primary: usually read right after logging)"""
     user_id = get_jwt_identity()
-    db = get_db()
+    db = get_read_db('latest', user_id)
     latest = db.latest_vitals.find_one({"user_id": user_id})
     if latest:
         latest['_id'] = str(latest['_id'])
@@ -204,9 +204,15 @@ def get_latest_vitals():
 
 @health_bp.route('/risk', methods=['GET'])
 @jwt_required()
+@rate_limited('health_risk')
 def get_risk_score():
     user_id = get_jwt_identity()
-    db = get_db()
+    model = request.args.get('model')
+    result = cached('risk', user_id, lambda: compute_risk(user_id, model), variant=model)
+    return jsonify(result), 200
+
+def compute_risk(user_id, model=None):
+    db = get_read_db('trends', user_id)
     
     # Get Profile
     profile = db.profiles.find_one({"user_id": user_id})
@@ -221,7 +227,10 @@ def get_risk_score():
         # Try latest vitals
         latest_log = db.latest_vitals.find_one({"user_id": user_id})
     
-    result = calculate_risk_score(profile, latest_log)
+    adherence = summarize_adherence(get_adherence(db, user_id, active_medication_ids(db, user_id)))
+    trends = get_trends(db, user_id)
+    with span('risk_score'):
+        result = calculate_risk_score(profile, latest_log, adherence, trends, model)
     
     if len(result) == 2:
         # Old format
@@ -236,11 +245,72 @@ def get_risk_score():
     if score > 60: risk_level = "High"
     elif score > 30: risk_level = "Moderate"
     
-    return jsonify({
+    risk = {
         "score": score,
         "level": risk_level,
         "factors": factors,
         "trend_indicators": trend_indicators,
         "risk_probabilities": risk_probabilities,
-        "derived_metrics": derived_metrics
-    }), 200
+        "derived_metrics": derived_metrics,
+        "trends": trends
+    }
+
+    # Keep the default model's scores as history (a no-op unless an input changed)
+    if model is None:
+        try:
+            fingerprint = input_fingerprint(profile, latest_log, adherence, trends, score, risk_probabilities)
+            record_snapshot(get_db(), user_id, risk, fingerprint)
+        except Exception as e:
+            print(f"Risk History Error: {e}")
+    return risk
+
+def refresh_risk(user_id):
+    """Recompute the default model's score after a write, which also records it in the risk history"""
+    try:
+        # The entry was just invalidated, so this recomputes it (and caches it for the next read)
+        cached('risk', user_id, lambda: compute_risk(user_id))
+    except Exception as e:
+        print(f"Risk Refresh Error: {e}")
+
+@health_bp.route('/risk/history', methods=['GET'])
+@jwt_required()
+def get_risk_history():
+    """
+    Stored risk scores over time: ?from=&to= (ISO, UTC) or ?days= (default 30),
+    resolution raw / hour / day (default: chosen from the range)
+    """
+    user_id = get_jwt_identity()
+    try:
+        end = _parse_time(request.args.get('to')) or datetime.datetime.utcnow()
+        start = _parse_time(request.args.get('from'))
+        if start is None:
+            start = end - datetime.timedelta(days=float(request.args.get('days', DEFAULT_RANGE_DAYS)))
+        if start > end:
+            raise ValueError("from must be before to")
+        history = risk_history(get_read_db('history', user_id), user_id, start, end,
+                               request.args.get('resolution', 'auto'))
+    except (ValueError, OverflowError) as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify(history), 200
+
+def _parse_time(value):
+    """ISO timestamp from a query string as naive UTC; None when absent"""
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@health_bp.route('/risk/models', methods=['GET'])
+@jwt_required()
+def get_risk_models():
+    """Registered risk model versions with latency, throughput and shadow stats"""
+    return jsonify(registry.report()), 200
+
+@health_bp.route('/limits', methods=['GET'])
+@jwt_required()
+def get_rate_limits():
+    """Rate limit configuration and rejected request counters for this worker"""
+    limiter = current_app.extensions.get('rate_limiter')
+    return jsonify(limiter.report() if limiter else {"enabled": False}), 200
@@ -1,11 +1,25 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.db import get_db
+from backend.services.adherence import parse_dose_event, record_dose_events, get_adherence
+from backend.services.cache import invalidate
+from backend.services.sync import record_delete, stamp
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
 import datetime
 
 medication_bp = Blueprint('medication', __name__)
 
+# Fields the medication page actually renders
+MEDICATION_PROJECTION = {
+    "name": 1,
+    "dosage": 1,
+    "frequency": 1,
+    "time": 1,
+    "active": 1,
+    "created_at": 1
+}
+
 @medication_bp.route('/', methods=['POST'])
 @jwt_required()
 def add_medication():
@@ -24,7 +38,7 @@ def add_medication():
     }
     
     db = get_db()
-    db.medications.insert_one(medication)
+    db.medications.insert_one(stamp(db, user_id, medication))
     
     return jsonify({"msg": "Medication added successfully"}), 201
 
@@ -33,15 +47,80 @@ def add_medication():
 def get_medications():
     user_id = get_jwt_identity()
     db = get_db()
-    meds = list(db.medications.find({"user_id": user_id}))
+
+    query = {"user_id": user_id}
+    if request.args.get('include_inactive', '').lower() not in ('1', 'true', 'yes'):
+        query["active"] = True
+
+    meds = list(db.medications.find(query, MEDICATION_PROJECTION))
+    adherence = get_adherence(db, user_id, [str(med['_id']) for med in meds])
     for med in meds:
         med['_id'] = str(med['_id'])
+        med['adherence'] = adherence.get(med['_id'])
     return jsonify(meds), 200
 
+@medication_bp.route('/events', methods=['POST'])
+@jwt_required()
+def record_events():
+    """Record taken/skipped/late dose events in bulk"""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    raw_events = data.get('events') if isinstance(data, dict) else data
+
+    if not isinstance(raw_events, list) or not raw_events:
+        return jsonify({"msg": "events must be a non-empty list"}), 400
+
+    events = []
+    for i, raw in enumerate(raw_events):
+        try:
+            events.append(parse_dose_event(raw))
+        except ValueError as e:
+            return jsonify({"msg": f"Event {i}: {e}"}), 400
+
+    # Only accept events for medications owned by this user
+    db = get_db()
+    try:
+        med_ids = {ObjectId(med_id) for med_id in {e['medication_id'] for e in events}}
+    except (InvalidId, TypeError):
+        return jsonify({"msg": "Invalid medication_id"}), 400
+
+    owned = {str(med['_id']) for med in db.medications.find(
+        {"_id": {"$in": list(med_ids)}, "user_id": user_id}, {"_id": 1}
+    )}
+    unknown = {e['medication_id'] for e in events} - owned
+    if unknown:
+        return jsonify({"msg": "Unknown medication", "medication_ids": sorted(unknown)}), 404
+
+    adherence = record_dose_events(db, user_id, events)
+    # Adherence feeds the risk score
+    invalidate(user_id, 'medication')
+
+    return jsonify({
+        "msg": "Dose events recorded",
+        "recorded": len(events),
+        "adherence": adherence
+    }), 201
+
+@medication_bp.route('/adherence', methods=['GET'])
+@jwt_required()
+def get_medication_adherence():
+    """Precomputed 7/30/90-day adherence per medication"""
+    user_id = get_jwt_identity()
+    db = get_db()
+    return jsonify(get_adherence(db, user_id)), 200
+
 @medication_bp.route('/<med_id>', methods=['DELETE'])
 @jwt_required()
 def delete_medication(med_id):
     user_id = get_jwt_identity()
     db = get_db()
-    db.medications.delete_one({"_id": ObjectId(med_id), "user_id": user_id})
+    try:
+        oid = ObjectId(med_id)
+    except InvalidId:
+        return jsonify({"msg": "Medication not found"}), 404
+    if db.medications.delete_one({"_id": oid, "user_id": user_id}).deleted_count:
+        # Offline clients learn about the delete on their next sync
+        record_delete(db, user_id, 'medications', oid)
+        # Its adherence no longer counts towards the risk score
+        invalidate(user_id, 'medication')
     return jsonify({"msg": "Medication deleted"}), 200
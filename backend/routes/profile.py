@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.db import get_db
-from bson.objectid import ObjectId
+from backend.services.profile import update_profile as save_profile
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -24,38 +24,17 @@ def get_profile():
 @jwt_required()
 def update_profile():
     user_id = get_jwt_identity()
-    data = request.get_json()
-    db = get_db()
-    
-    # Calculate BMI if height and weight are present
-    if 'height' in data and 'weight' in data:
-        try:
-            height_m = float(data['height']) / 100
-            weight = float(data['weight'])
-            data['bmi'] = round(weight / (height_m ** 2), 2)
-        except:
-            pass
-            
-    # Simple rule-based exercise recommendation
-    exercises = []
-    if data.get('activity_level') == 'sedentary':
-        exercises = ["Walking 30 mins", "Stretching"]
-    elif data.get('activity_level') == 'moderate':
-        exercises = ["Jogging", "Cycling", "Basic Gym"]
-    else:
-        exercises = ["HIIT", "Strength Training", "Running"]
-        
-    data['recommended_exercises'] = exercises
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"msg": "Expected a JSON object"}), 400
 
-    # Explicitly handle full name
-    if 'full_name' in data:
-        data['full_name'] = data['full_name'].strip()
-        data['name'] = data['full_name'] # Sync with older 'name' field if exists
+    # Only changed fields are written; BMI / exercise plan / age band follow their inputs
+    profile, changed = save_profile(get_db(), user_id, data)
 
-    db.profiles.update_one(
-        {"user_id": user_id},
-        {"$set": data},
-        upsert=True
-    )
-    
-    return jsonify({"msg": "Profile updated successfully", "bmi": data.get('bmi'), "recommendations": exercises}), 200
+    return jsonify({
+        "msg": "Profile updated successfully" if changed else "No changes",
+        "bmi": profile.get('bmi'),
+        "recommendations": profile.get('recommended_exercises', []),
+        "changed": changed,
+        "version": profile.get('profile_version', 0)
+    }), 200
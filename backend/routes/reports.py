@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify, send_file, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.db import get_db, get_read_db
+from backend.services.storage import get_report_storage
+import datetime
+
+reports_bp = Blueprint('reports', __name__)
+
+MAX_REPORTS = 50
+# Artifacts are named after their content, so a URL never changes meaning
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@reports_bp.route('/', methods=['GET'])
+@jwt_required()
+def list_reports():
+    """The user's pre-rendered weekly / monthly reports, newest first"""
+    user_id = get_jwt_identity()
+    reports = list(get_read_db('history', user_id).reports.find(
+        {"user_id": user_id}, {"_id": 0, "user_id": 0}
+    ).sort("period_end", -1).limit(MAX_REPORTS))
+    for report in reports:
+        for key in ('period_start', 'period_end', 'generated_at'):
+            if isinstance(report.get(key), datetime.datetime):
+                report[key] = report[key].isoformat()
+        report['url'] = url_for('reports.get_report_file', filename=report['filename'])
+    return jsonify(reports), 200
+
+@reports_bp.route('/files/<filename>', methods=['GET'])
+@jwt_required()
+def get_report_file(filename):
+    """Serve a rendered report from the shared storage, cacheable for good"""
+    if not get_db().reports.find_one({"user_id": get_jwt_identity(), "filename": filename}, {"_id": 1}):
+        return jsonify({"msg": "Report not found"}), 404
+    found = get_report_storage().open(filename)
+    if found is None:
+        return jsonify({"msg": "Report not found"}), 404
+    stream, content_type = found
+    # The name is the content hash, so it doubles as the ETag
+    response = send_file(stream, mimetype=content_type, max_age=IMMUTABLE_MAX_AGE,
+                         etag=filename.rsplit('.', 1)[0], conditional=True)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
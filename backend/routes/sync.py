@@ -0,0 +1,47 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.db import get_db, get_read_db
+from backend.services.sync import (
+    DEFAULT_PAGE, MAX_PAGE, TOMBSTONE_TTL_DAYS, InvalidToken, changes_since, decode_token,
+    encode_token, ensure_backfilled
+)
+import datetime
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/', methods=['GET'])
+@jwt_required()
+def sync():
+    """
+    Changes to the user's logs, medications, alerts, profile and thresholds
+    since `since` (omit it for a full sync). Apply upserts, then deletes, and
+    keep the returned token; page on while has_more is true. reset means the
+    token was too old: drop local data and apply this response as a full sync.
+    """
+    user_id = get_jwt_identity()
+    try:
+        limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE)), MAX_PAGE))
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    now = datetime.datetime.utcnow()
+    since, reset = 0, False
+    token = request.args.get('since')
+    if token:
+        try:
+            since, issued_at = decode_token(token)
+        except InvalidToken as e:
+            return jsonify({"msg": str(e)}), 400
+        if issued_at < now - datetime.timedelta(days=TOMBSTONE_TTL_DAYS):
+            # Deletes older than the tombstones we keep would be missed
+            since, reset = 0, True
+
+    if since == 0:
+        ensure_backfilled(get_db(), user_id)
+    changes, position, has_more = changes_since(get_read_db('history', user_id), user_id, since, limit, now)
+    return jsonify({
+        "changes": changes,
+        "token": encode_token(position, now),
+        "has_more": has_more,
+        "reset": reset
+    }), 200
@@ -0,0 +1,161 @@
+import datetime
+from pymongo import ReturnDocument
+
+# Rolling windows (in days) that adherence rates are maintained for
+WINDOWS = (7, 30, 90)
+DOSE_STATUSES = ('taken', 'skipped', 'late')
+
+
+def _day_key(ts):
+    return ts.strftime('%Y-%m-%d')
+
+
+def _parse_timestamp(val):
+    if val is None or val == '':
+        return datetime.datetime.utcnow()
+    if isinstance(val, datetime.datetime):
+        return val
+    # Accept ISO strings from the browser (with or without trailing Z)
+    val = str(val).strip().replace('Z', '')
+    return datetime.datetime.fromisoformat(val)
+
+
+def parse_dose_event(raw):
+    """
+    Validate a single dose event from the API.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Each event must be an object")
+
+    med_id = raw.get('medication_id')
+    if not med_id:
+        raise ValueError("medication_id is required")
+
+    status = str(raw.get('status', '')).strip().lower()
+    if status not in DOSE_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(DOSE_STATUSES)}")
+
+    try:
+        timestamp = _parse_timestamp(raw.get('timestamp'))
+        scheduled_for = _parse_timestamp(raw['scheduled_for']) if raw.get('scheduled_for') else None
+    except (TypeError, ValueError):
+        raise ValueError("timestamp must be an ISO date-time")
+
+    return {
+        "medication_id": str(med_id),
+        "status": status,
+        "timestamp": timestamp,
+        "scheduled_for": scheduled_for
+    }
+
+
+def compute_windows(days, today=None):
+    """
+    Summarise per-day dose counts into 7/30/90-day adherence rates.
+    `days` holds at most 90 buckets so this is bounded work regardless of history.
+    """
+    today = today or datetime.datetime.utcnow().date()
+    windows = {}
+    for window in WINDOWS:
+        start = _day_key(today - datetime.timedelta(days=window - 1))
+        totals = {status: 0 for status in DOSE_STATUSES}
+        for day, counts in (days or {}).items():
+            if day >= start:
+                for status in DOSE_STATUSES:
+                    totals[status] += counts.get(status, 0)
+
+        total = sum(totals.values())
+        windows[f"{window}d"] = {
+            **totals,
+            "total": total,
+            # Late doses were still taken, so they count towards adherence
+            "rate": round((totals['taken'] + totals['late']) / total, 3) if total else None,
+            "on_time_rate": round(totals['taken'] / total, 3) if total else None
+        }
+    return windows
+
+
+def record_dose_events(db, user_id, events):
+    """
+    Store validated dose events and fold them into the per-medication adherence
+    documents. Returns the refreshed windows keyed by medication_id.
+    """
+    if not events:
+        return {}
+
+    now = datetime.datetime.utcnow()
+    docs = [{**event, "user_id": user_id, "recorded_at": now} for event in events]
+    db.medication_events.insert_many(docs, ordered=False)
+
+    # Collapse the batch into per-medication, per-day counters
+    increments = {}
+    for event in events:
+        day = _day_key(event['timestamp'])
+        med_inc = increments.setdefault(event['medication_id'], {})
+        key = f"days.{day}.{event['status']}"
+        med_inc[key] = med_inc.get(key, 0) + 1
+
+    today = now.date()
+    cutoff = _day_key(today - datetime.timedelta(days=max(WINDOWS) - 1))
+    refreshed = {}
+    for med_id, inc in increments.items():
+        doc = db.medication_adherence.find_one_and_update(
+            {"user_id": user_id, "medication_id": med_id},
+            {"$inc": {**inc, "version": 1}, "$set": {"updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        days = doc.get('days', {})
+        windows = compute_windows(days, today)
+
+        update = {"$set": {"windows": windows, "as_of": _day_key(today)}}
+        expired = {f"days.{day}": "" for day in days if day < cutoff}
+        if expired:
+            update["$unset"] = expired
+        # Only if no later batch has counted since; that batch stores its own, newer windows
+        db.medication_adherence.update_one({"_id": doc['_id'], "version": doc['version']}, update)
+        refreshed[med_id] = windows
+
+    return refreshed
+
+
+def get_adherence(db, user_id, medication_ids=None):
+    """
+    Read precomputed adherence for a user's medications, keyed by medication_id.
+    Windows are only re-derived (from the bounded day buckets) when the stored
+    summary is from an earlier day.
+    """
+    query = {"user_id": user_id}
+    if medication_ids is not None:
+        query["medication_id"] = {"$in": list(medication_ids)}
+
+    today = datetime.datetime.utcnow().date()
+    result = {}
+    for doc in db.medication_adherence.find(query, {"medication_id": 1, "windows": 1, "as_of": 1, "days": 1}):
+        if doc.get('as_of') == _day_key(today) and doc.get('windows'):
+            result[doc['medication_id']] = doc['windows']
+        else:
+            result[doc['medication_id']] = compute_windows(doc.get('days', {}), today)
+    return result
+
+
+def active_medication_ids(db, user_id):
+    """Ids of the medications the user still takes; only these count towards risk and insights"""
+    return [str(med['_id']) for med in db.medications.find({"user_id": user_id, "active": True}, {"_id": 1})]
+
+
+def summarize_adherence(adherence, window='30d'):
+    """Combine per-medication windows into a single user-level rate"""
+    taken = late = total = 0
+    for windows in adherence.values():
+        stats = windows.get(window) or {}
+        taken += stats.get('taken', 0)
+        late += stats.get('late', 0)
+        total += stats.get('total', 0)
+
+    return {
+        "window": window,
+        "total": total,
+        "rate": round((taken + late) / total, 3) if total else None
+    }
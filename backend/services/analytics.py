@@ -0,0 +1,229 @@
+import argparse
+import datetime
+import multiprocessing
+import time
+
+from backend.services.risk_model import calculate_risk_score
+
+AGE_BANDS = ((30, 'under_30'), (45, '30_44'), (60, '45_59'), (75, '60_74'))
+BP_CATEGORIES = ('normal', 'elevated', 'stage_1', 'stage_2', 'crisis', 'unknown')
+VITALS = ('heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar')
+
+PROFILE_PROJECTION = {"user_id": 1, "age": 1, "bmi": 1, "height": 1, "weight": 1, "activity_level": 1}
+LOG_PROJECTION = {"_id": 0, "user_id": 1, **{vital: 1 for vital in VITALS}}
+
+
+def cohort_age_band(profile):
+    try:
+        age = int(profile.get('age'))
+    except (TypeError, ValueError):
+        return 'unknown'
+    for upper, band in AGE_BANDS:
+        if age < upper:
+            return band
+    return '75_plus'
+
+
+def bp_stage(sys, dia):
+    """AHA blood pressure category"""
+    if sys is None or dia is None:
+        return 'unknown'
+    if sys > 180 or dia > 120:
+        return 'crisis'
+    if sys >= 140 or dia >= 90:
+        return 'stage_2'
+    if sys >= 130 or dia >= 80:
+        return 'stage_1'
+    if sys >= 120:
+        return 'elevated'
+    return 'normal'
+
+
+def _risk_level(score, factors):
+    if factors == ["Insufficient Data"]:
+        return 'Unknown'
+    if score > 60:
+        return 'High'
+    return 'Moderate' if score > 30 else 'Low'
+
+
+def partition_bounds(db, partitions):
+    """
+    Split the user_id space into roughly equal ranges using $bucketAuto on
+    profiles (one document per user). ObjectId strings share long timestamp
+    prefixes, so fixed hex ranges would be badly skewed.
+    Returns [(lower, upper)] with None meaning unbounded.
+    """
+    buckets = list(db.profiles.aggregate([
+        {"$bucketAuto": {"groupBy": "$user_id", "buckets": partitions}}
+    ]))
+    if not buckets:
+        return [(None, None)]
+
+    bounds = []
+    for i, bucket in enumerate(buckets):
+        lower = None if i == 0 else bucket['_id']['min']
+        upper = None if i == len(buckets) - 1 else buckets[i + 1]['_id']['min']
+        bounds.append((lower, upper))
+    return bounds
+
+
+def _range_query(lower, upper):
+    query = {}
+    if lower is not None:
+        query["$gte"] = lower
+    if upper is not None:
+        query["$lt"] = upper
+    return {"user_id": query} if query else {}
+
+
+def _empty_partial():
+    return {
+        "users": 0,
+        "risk_by_age_band": {},
+        "score_sum_by_age_band": {},
+        "bp_categories": {category: 0 for category in BP_CATEGORIES},
+        "readings_by_age_band": {},
+        "vital_sums_by_age_band": {}
+    }
+
+
+def _init_worker():
+    # Never reuse a client inherited from the parent process
+    from backend.db import reset_clients
+    reset_clients()
+
+
+def aggregate_partition(bounds, batch_size=1000):
+    """
+    Worker: stream one user_id range of profiles, latest_vitals and
+    health_logs and return partial cohort aggregates.
+    """
+    from backend.db import connect
+    db = connect()
+    query = _range_query(*bounds)
+    partial = _empty_partial()
+
+    bands = {}
+    for profile in db.profiles.find(query, PROFILE_PROJECTION, batch_size=batch_size):
+        bands[profile['user_id']] = (cohort_age_band(profile), profile)
+
+    latest = {
+        doc['user_id']: doc
+        for doc in db.latest_vitals.find(query, LOG_PROJECTION, batch_size=batch_size)
+    }
+
+    for user_id, (band, profile) in bands.items():
+        latest_log = latest.get(user_id)
+        score, factors = calculate_risk_score(profile, latest_log)[:2]
+        level = _risk_level(score, factors)
+
+        partial['users'] += 1
+        by_level = partial['risk_by_age_band'].setdefault(band, {})
+        by_level[level] = by_level.get(level, 0) + 1
+        partial['score_sum_by_age_band'][band] = partial['score_sum_by_age_band'].get(band, 0) + score
+
+        vitals = latest_log or {}
+        partial['bp_categories'][bp_stage(vitals.get('bp_systolic'), vitals.get('bp_diastolic'))] += 1
+
+    # Raw readings: per-band counts and sums, streamed rather than materialized
+    for log in db.health_logs.find(query, LOG_PROJECTION, batch_size=batch_size):
+        band = bands.get(log['user_id'], ('unknown',))[0]
+        partial['readings_by_age_band'][band] = partial['readings_by_age_band'].get(band, 0) + 1
+        sums = partial['vital_sums_by_age_band'].setdefault(band, {})
+        for vital in VITALS:
+            value = log.get(vital)
+            if value is not None:
+                total, count = sums.get(vital, (0, 0))
+                sums[vital] = (total + value, count + 1)
+
+    return partial
+
+
+def merge_partials(partials):
+    merged = _empty_partial()
+    for partial in partials:
+        merged['users'] += partial['users']
+        for band, levels in partial['risk_by_age_band'].items():
+            target = merged['risk_by_age_band'].setdefault(band, {})
+            for level, count in levels.items():
+                target[level] = target.get(level, 0) + count
+        for band, total in partial['score_sum_by_age_band'].items():
+            merged['score_sum_by_age_band'][band] = merged['score_sum_by_age_band'].get(band, 0) + total
+        for category, count in partial['bp_categories'].items():
+            merged['bp_categories'][category] += count
+        for band, count in partial['readings_by_age_band'].items():
+            merged['readings_by_age_band'][band] = merged['readings_by_age_band'].get(band, 0) + count
+        for band, sums in partial['vital_sums_by_age_band'].items():
+            target = merged['vital_sums_by_age_band'].setdefault(band, {})
+            for vital, (total, count) in sums.items():
+                prev_total, prev_count = target.get(vital, (0, 0))
+                target[vital] = (prev_total + total, prev_count + count)
+    return merged
+
+
+def summarize(merged):
+    """Turn merged sums into the stored cohort summary"""
+    users = merged['users']
+    known_bp = users - merged['bp_categories']['unknown']
+    risk_by_age_band = merged['risk_by_age_band']
+    return {
+        "users": users,
+        "risk_by_age_band": risk_by_age_band,
+        "mean_score_by_age_band": {
+            band: round(total / sum(risk_by_age_band[band].values()), 1)
+            for band, total in merged['score_sum_by_age_band'].items()
+        },
+        "bp_categories": merged['bp_categories'],
+        "share_hypertension_stage_2": round(merged['bp_categories']['stage_2'] / known_bp, 4) if known_bp else None,
+        "readings_by_age_band": merged['readings_by_age_band'],
+        "mean_vitals_by_age_band": {
+            band: {vital: round(total / count, 1) for vital, (total, count) in sums.items() if count}
+            for band, sums in merged['vital_sums_by_age_band'].items()
+        }
+    }
+
+
+def run_pipeline(workers=None, partitions=None, write=True):
+    """Run the partitioned aggregation across a process pool and store the summary"""
+    from backend.db import connect
+    workers = workers or multiprocessing.cpu_count()
+    partitions = partitions or workers * 4
+    db = connect()
+
+    start = time.perf_counter()
+    bounds = partition_bounds(db, partitions)
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker) as pool:
+        partials = pool.map(aggregate_partition, bounds)
+    summary = summarize(merge_partials(partials))
+    elapsed = time.perf_counter() - start
+
+    summary.update({
+        "generated_at": datetime.datetime.utcnow(),
+        "workers": workers,
+        "partitions": len(bounds),
+        "duration_seconds": round(elapsed, 3)
+    })
+    if write:
+        db.analytics_summaries.insert_one(dict(summary))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute population cohort aggregates into analytics_summaries")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--partitions', type=int, default=None, help="user_id ranges to split into (default: 4 per worker)")
+    parser.add_argument('--dry-run', action='store_true', help="Print the summary without storing it")
+    args = parser.parse_args(argv)
+
+    summary = run_pipeline(args.workers, args.partitions, write=not args.dry_run)
+    print(f"Users: {summary['users']:,} | Partitions: {summary['partitions']} | "
+          f"Workers: {summary['workers']} | {summary['duration_seconds']}s")
+    print(f"Share in hypertension stage 2: {summary['share_hypertension_stage_2']}")
+    for band, levels in sorted(summary['risk_by_age_band'].items()):
+        print(f"   {band}: {levels}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import datetime
+import math
+
+from backend.db import update_versioned
+from backend.models import Alert
+from backend.services.notifications import enqueue_alert
+from backend.services.sync import stamp
+
+# Readings needed before a personal baseline is trusted
+MIN_SAMPLES = 10
+# Cap on the effective sample count so the baseline keeps adapting to slow drift
+MAX_SAMPLES = 200
+# Standard deviations from the personal mean that count as a deviation
+Z_THRESHOLD = 3.0
+Z_CRITICAL = 5.0
+
+# Minimum absolute deviation worth alerting on, so very stable users
+# don't get alerts for clinically meaningless wobbles
+MIN_DELTA = {
+    'heart_rate': 25,
+    'bp_systolic': 25,
+    'bp_diastolic': 15,
+    'blood_sugar': 40
+}
+
+VITAL_LABELS = {
+    'heart_rate': ('Heart Rate', 'BPM'),
+    'bp_systolic': ('Systolic BP', 'mmHg'),
+    'bp_diastolic': ('Diastolic BP', 'mmHg'),
+    'blood_sugar': ('Blood Sugar', 'mg/dL')
+}
+
+VITALS = tuple(MIN_DELTA)
+
+
+def score_and_update(baseline, vital, value):
+    """
+    Score a reading against the running baseline, then fold it in (Welford).
+    `baseline` is a dict {n, mean, m2} updated in place.
+    Returns the z-score, or None while the baseline is still warming up.
+    """
+    n = baseline.get('n', 0)
+    mean = baseline.get('mean', 0.0)
+    m2 = baseline.get('m2', 0.0)
+
+    z = None
+    if n >= MIN_SAMPLES:
+        std = math.sqrt(m2 / (n - 1))
+        delta = value - mean
+        if std > 0:
+            z = delta / std
+        elif delta:
+            z = math.copysign(math.inf, delta)
+        else:
+            z = 0.0
+
+    # Welford update; past the cap the old mass is scaled down instead of growing
+    if n >= MAX_SAMPLES:
+        m2 *= (MAX_SAMPLES - 1) / n
+        n = MAX_SAMPLES - 1
+    n += 1
+    delta = value - mean
+    mean += delta / n
+    m2 += delta * (value - mean)
+
+    baseline['n'] = n
+    baseline['mean'] = mean
+    baseline['m2'] = m2
+    return z
+
+
+def detect_anomalies(state, reading):
+    """
+    Score every vital in a reading against the user's baselines.
+    `state` maps vital -> baseline and is updated in place.
+    Returns a list of anomaly dicts (empty when nothing deviates).
+    """
+    anomalies = []
+    for vital in VITALS:
+        value = reading.get(vital)
+        if value is None:
+            continue
+        value = float(value)
+        baseline = state.setdefault(vital, {})
+        expected = baseline.get('mean')
+        z = score_and_update(baseline, vital, value)
+
+        if z is None or abs(z) < Z_THRESHOLD or abs(value - expected) < MIN_DELTA[vital]:
+            continue
+
+        label, unit = VITAL_LABELS[vital]
+        direction = "above" if z > 0 else "below"
+        anomalies.append({
+            "type": vital,
+            "value": value,
+            "expected": round(expected, 1),
+            "z_score": round(z, 2) if math.isfinite(z) else None,
+            "severity": "critical" if abs(z) >= Z_CRITICAL else "warning",
+            "message": f"Unusual {label}: {value:g} {unit} is {abs(value - expected):.0f} {unit} "
+                       f"{direction} your usual {expected:.0f} {unit}"
+        })
+    return anomalies
+
+
+def process_reading(db, user_id, reading, skip_seen=False):
+    """
+    Score a newly logged reading against the user's stored baselines and
+    record any deviation in the alerts collection. Returns the alert messages.
+    With skip_seen a reading no newer than the last one scored is ignored
+    (a replayed change stream event).
+    """
+    timestamp = reading.get('timestamp')
+    anomalies = []
+
+    def apply(doc):
+        doc = doc or {"user_id": user_id}
+        last = doc.get('last_reading_at')
+        anomalies.clear()
+        if skip_seen and last and timestamp and timestamp <= last:
+            return None
+        # Scored against the baselines as written, so a retry re-scores from scratch
+        anomalies.extend(detect_anomalies(doc.setdefault('vitals', {}), reading))
+        doc['updated_at'] = datetime.datetime.utcnow()
+        if timestamp:
+            doc['last_reading_at'] = timestamp
+        return doc
+
+    # Versioned, so concurrent readings of one user don't lose each other's updates
+    update_versioned(db.vitals_baselines, {"user_id": user_id}, apply)
+
+    if anomalies:
+        alert = Alert(
+            user_id,
+            [a['message'] for a in anomalies],
+            "critical" if any(a['severity'] == 'critical' for a in anomalies) else "warning",
+            type="anomaly",
+            details=anomalies
+        )
+        enqueue_alert(alert, db.alerts.insert_one(stamp(db, user_id, alert.to_bson())).inserted_id)
+
+    return [a['message'] for a in anomalies]
+
+
+def rebuild_baselines(db, user_id):
+    """Re-seed a user's baselines from recent history without emitting alerts (after a backfill)"""
+    recent = list(db.health_logs.find(
+        {"user_id": user_id}, {"_id": 0, "timestamp": 1, **{vital: 1 for vital in VITALS}}
+    ).sort("timestamp", -1).limit(MAX_SAMPLES))
+
+    state = {}
+    for reading in reversed(recent):
+        detect_anomalies(state, reading)
+
+    def apply(doc):
+        doc = {**(doc or {}), "vitals": state, "updated_at": datetime.datetime.utcnow()}
+        if recent and recent[0].get('timestamp'):
+            # Readings up to here are in the baselines; a replay of them is skipped
+            doc['last_reading_at'] = recent[0]['timestamp']
+        return doc
+
+    update_versioned(db.vitals_baselines, {"user_id": user_id}, apply)
@@ -0,0 +1,378 @@
+"""
+Static asset pipeline.
+
+Sources under frontend/assets are bundled, minified and written to
+frontend/static/dist under content-hashed names, each with a precompressed
+.gz (and .br when brotli is installed) beside it. manifest.json maps logical
+names to the hashed files; templates call asset_url('js/app.js') and the
+/assets route serves the best encoding the client accepts with immutable
+cache headers, since a changed file always gets a new name.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # .br variants need brotli; gzip is always written
+    brotli = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SOURCE_DIR = os.path.join(BASE_DIR, 'frontend', 'assets')
+DIST_DIR = os.path.join(BASE_DIR, 'frontend', 'static', 'dist')
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Logical bundle -> sources, concatenated in order. Every page script under
+# js/pages/ is also a bundle of its own (see bundle_sources).
+BUNDLES = {
+    'css/app.css': ('css/base.css',),
+    'js/tailwind.config.js': ('js/tailwind.config.js',),
+    'js/app.js': ('js/app.js', 'js/layout.js'),
+}
+# Best first; the client's Accept-Encoding picks
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# --- Minification ---
+
+_CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.S)
+
+
+def minify_css(source):
+    """Drop comments and whitespace that carries no meaning (strings left intact)"""
+    parts = []
+    last = 0
+    for match in _CSS_TOKEN.finditer(source):
+        parts.append(_compact_css(source[last:match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        elif match.group(3):
+            parts.append(' ')
+        last = match.end()
+    parts.append(_compact_css(source[last:]))
+    css = ''.join(parts)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Only after a colon: a space before one separates a descendant pseudo-class selector
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _compact_css(text):
+    return re.sub(r'\s+', ' ', text)
+
+
+# A '/' after one of these starts a regular expression, otherwise it divides
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'instanceof', 'yield', 'await'}
+# A line break next to one of these can never end a statement
+_JOIN_AFTER = set('{;,([:')
+_JOIN_BEFORE = set('}),];:')
+
+
+def _is_word(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+def _skip_string(source, i):
+    """Index just past the quoted string starting at i"""
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    raise ValueError("Unterminated string literal")
+
+
+def _skip_template(source, i):
+    """Index just past the template literal starting at i (nested ${...} included)"""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '`':
+            return i + 1
+        if char == '$' and source.startswith('${', i):
+            i += 2
+            depth = 1
+            while depth:
+                if i >= len(source):
+                    raise ValueError("Unterminated template expression")
+                char = source[i]
+                if char in '\'"':
+                    i = _skip_string(source, i)
+                    continue
+                if char == '`':
+                    i = _skip_template(source, i)
+                    continue
+                depth += (char == '{') - (char == '}')
+                i += 1
+            continue
+        i += 1
+    raise ValueError("Unterminated template literal")
+
+
+def _skip_regex(source, i):
+    """Index just past the regular expression literal (with flags) starting at i"""
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '\n':
+            raise ValueError("Unterminated regular expression")
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            while i < len(source) and _is_word(source[i]):
+                i += 1
+            return i
+        i += 1
+    raise ValueError("Unterminated regular expression")
+
+
+def minify_js(source):
+    """
+    Conservative minifier: strips comments, indentation and blank lines but
+    renames nothing, and keeps a line break wherever one could end a
+    statement, so automatic semicolon insertion behaves exactly as before.
+    """
+    out = []
+    gap = None  # whitespace seen since the last token: None, ' ' or '\n'
+    last_word = ''
+    i, n = 0, len(source)
+
+    def emit(token):
+        nonlocal gap
+        if out:
+            prev = out[-1][-1]
+            if gap == '\n' and prev not in _JOIN_AFTER and token[0] not in _JOIN_BEFORE:
+                out.append('\n')
+            elif gap and (_is_word(prev) and (_is_word(token[0]) or token[0] == '.')
+                          or prev == token[0] and prev in '+-'):
+                out.append(' ')
+        out.append(token)
+        gap = None
+
+    while i < n:
+        char = source[i]
+        if char in ' \t\r\n\f\v\ufeff':
+            start = i
+            while i < n and source[i] in ' \t\r\n\f\v\ufeff':
+                i += 1
+            gap = '\n' if '\n' in source[start:i] or gap == '\n' else ' '
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            gap = gap or ' '
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end == -1:
+                raise ValueError("Unterminated comment")
+            gap = '\n' if '\n' in source[i:end] or gap == '\n' else (gap or ' ')
+            i = end + 2
+            continue
+        if char in '\'"':
+            end = _skip_string(source, i)
+        elif char == '`':
+            end = _skip_template(source, i)
+        elif char == '/':
+            prev = out[-1][-1] if out else ''
+            if not out or prev in _REGEX_AFTER or last_word in _REGEX_AFTER_WORDS:
+                end = _skip_regex(source, i)
+            else:
+                end = i + 1
+        elif _is_word(char) or char == '.' and source[i + 1:i + 2].isdigit():
+            end = i + 1
+            while end < n and _is_word(source[end]):
+                end += 1
+            last_word = source[i:end]
+            emit(last_word)
+            i = end
+            continue
+        else:
+            end = i + 1
+        emit(source[i:end])
+        last_word = ''
+        i = end
+    return ''.join(out) + '\n'
+
+
+# --- Build ---
+
+def bundle_sources(source_dir=SOURCE_DIR):
+    """Every bundle with its source paths (page scripts are discovered)"""
+    bundles = {name: list(sources) for name, sources in BUNDLES.items()}
+    pages = os.path.join(source_dir, 'js', 'pages')
+    if os.path.isdir(pages):
+        for filename in sorted(os.listdir(pages)):
+            if filename.endswith('.js'):
+                bundles[f'js/pages/{filename}'] = [f'js/pages/{filename}']
+    return bundles
+
+
+def hashed_name(name, content):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.part"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+
+
+def build(source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """
+    Build every bundle into dist_dir and write the manifest.
+    Files from the previous build are kept (pages cached by browsers may still
+    ask for them); anything older is removed. Returns per-bundle sizes.
+    """
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    previous = load_manifest(dist_dir)
+    manifest = {}
+    sizes = {}
+    for name, sources in bundle_sources(source_dir).items():
+        texts = []
+        for source in sources:
+            with open(os.path.join(source_dir, source), encoding='utf-8') as fh:
+                texts.append(fh.read())
+        if name.endswith('.css'):
+            raw = '\n'.join(texts)
+            minified = minify_css(raw)
+        else:
+            # Each script ends its last statement, as it did in its own <script> tag
+            raw = ';\n'.join(texts)
+            minified = ';'.join(minify_js(text).rstrip('\n;') for text in texts) + ';\n'
+        content = minified.encode('utf-8')
+        target = hashed_name(name, content)
+        path = os.path.join(dist_dir, target)
+        sizes[name] = {"raw": len(raw.encode('utf-8')), "minified": len(content)}
+        if not os.path.exists(path):
+            _write(path, content)
+            _write(path + '.gz', gzip.compress(content, 9, mtime=0))
+            if brotli is not None:
+                _write(path + '.br', brotli.compress(content, quality=11))
+        sizes[name]['gzip'] = os.path.getsize(path + '.gz')
+        if os.path.exists(path + '.br'):
+            sizes[name]['brotli'] = os.path.getsize(path + '.br')
+        manifest[name] = target
+
+    _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _prune(dist_dir, set(manifest.values()) | set(previous.values()))
+    return sizes
+
+
+def _prune(dist_dir, keep):
+    for root, _dirs, files in os.walk(dist_dir):
+        for filename in files:
+            relative = os.path.relpath(os.path.join(root, filename), dist_dir).replace(os.sep, '/')
+            base = re.sub(r'\.(gz|br)$', '', relative)
+            if relative != MANIFEST_NAME and base not in keep:
+                os.remove(os.path.join(root, filename))
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_stale(source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """True when there is no manifest or a source changed after it was written"""
+    try:
+        built = os.path.getmtime(os.path.join(dist_dir, MANIFEST_NAME))
+    except OSError:
+        return True
+    for root, _dirs, files in os.walk(source_dir):
+        if any(os.path.getmtime(os.path.join(root, filename)) > built for filename in files):
+            return True
+    return False
+
+
+# --- Serving ---
+
+def init_assets(app):
+    """
+    Build if needed (ASSET_BUILD=auto), expose asset_url() to templates and
+    serve /assets/<hashed name> with precompressed variants.
+    """
+    dist_dir = app.config.get('ASSET_DIST_DIR', DIST_DIR)
+    if app.config.get('ASSET_BUILD', 'auto') == 'auto' and is_stale(SOURCE_DIR, dist_dir):
+        try:
+            build(SOURCE_DIR, dist_dir)
+        except (OSError, ValueError) as e:
+            print(f"Asset Build Error: {e}")
+    manifest = load_manifest(dist_dir)
+
+    def asset_url(name):
+        if name not in manifest:
+            raise KeyError(f"{name} is not in the asset manifest (python -m backend.services.assets)")
+        return f"/assets/{manifest[name]}"
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.extensions['assets'] = manifest
+
+    @app.route('/assets/<path:filename>')
+    def asset(filename):
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            path = safe_join(dist_dir, filename + suffix)
+            if request.accept_encodings[encoding] and path and os.path.isfile(path):
+                response = send_from_directory(dist_dir, filename + suffix, mimetype=mimetype,
+                                               max_age=IMMUTABLE_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(dist_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bundle, minify and fingerprint the frontend assets")
+    parser.add_argument('--source', default=SOURCE_DIR)
+    parser.add_argument('--dist', default=DIST_DIR)
+    args = parser.parse_args(argv)
+
+    sizes = build(args.source, args.dist)
+    print(f"{'bundle':<32}{'source':>10}{'minified':>10}{'gzip':>8}{'brotli':>8}")
+    totals = dict.fromkeys(('raw', 'minified', 'gzip', 'brotli'), 0)
+    for name, size in sorted(sizes.items()):
+        print(f"{name:<32}{size['raw']:>10,}{size['minified']:>10,}{size['gzip']:>8,}{size.get('brotli', '-'):>8}")
+        for key in totals:
+            totals[key] += size.get(key, 0)
+    print(f"{'total':<32}{totals['raw']:>10,}{totals['minified']:>10,}{totals['gzip']:>8,}"
+          f"{totals['brotli'] or '-':>8}")
+    print(f"Manifest: {os.path.join(args.dist, MANIFEST_NAME)}")
+
+
+if __name__ == '__main__':
+    main()
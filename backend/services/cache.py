@@ -0,0 +1,231 @@
+import datetime
+import threading
+import time
+
+from flask import current_app
+from pymongo.errors import PyMongoError
+
+from backend.services.metrics import COUNTER, register_collector
+
+# Seconds cached entries live without an invalidation
+DEFAULT_TTL = 300
+# Per-user generations only need to outlive an entry being computed and stored
+GENERATION_TTL = 24 * 3600
+
+# What each kind of change drops for the user
+INVALIDATES = {
+    'profile': ('profile', 'risk', 'insights'),
+    'thresholds': ('thresholds',),
+    'vitals': ('risk', 'insights'),
+    'medication': ('risk', 'insights')
+}
+
+
+def cache_key(kind, user_id):
+    return f"{kind}:{user_id}"
+
+
+def generation_key(user_id):
+    return f"gen:{user_id}"
+
+
+class LocalCache:
+    """In-process cache; the stand-in for single-node runs and tests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, value)
+        self._generations = {}  # user_id -> invalidations so far
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.stats['hits'] += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.stats['misses'] += 1
+            return None
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and entry[0] > now:
+                    found[key] = entry[1]
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, ttl=DEFAULT_TTL, user_id=None, generation=None):
+        """Store the value; with a generation, only while the user's generation is still that one"""
+        with self._lock:
+            if generation is not None and self._generations.get(user_id, 0) != generation:
+                return False
+            self._entries[key] = (time.monotonic() + ttl, value)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def generation(self, user_id):
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def bump(self, user_id):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def close(self):
+        pass
+
+
+class MongoCache:
+    """
+    Cache shared by every app node, kept in the cache collection (expired by
+    a TTL index). Every node reads, bumps and deletes the same documents, so
+    an invalidation on one node is seen by all without any messaging.
+    """
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key):
+        doc = self.get_db().cache.find_one({"_id": key, "expires_at": {"$gt": datetime.datetime.utcnow()}})
+        if doc is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return doc['value']
+
+    def get_many(self, keys):
+        """{key: value} for the keys that are cached, in one query"""
+        docs = self.get_db().cache.find(
+            {"_id": {"$in": list(keys)}, "expires_at": {"$gt": datetime.datetime.utcnow()}}
+        )
+        found = {doc['_id']: doc['value'] for doc in docs}
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, ttl=DEFAULT_TTL, user_id=None, generation=None):
+        """
+        Store the value; with a generation, only while the user's generation
+        is still that one. The entry and the generation are separate
+        documents, so the check runs after the write: an invalidation that
+        bumped the generation first is caught here, one that bumps it later
+        deletes the entry itself.
+        """
+        cache = self.get_db().cache
+        doc = {"value": value, "expires_at": datetime.datetime.utcnow() + datetime.timedelta(seconds=ttl)}
+        if generation is not None:
+            doc['generation'] = generation
+        cache.replace_one({"_id": key}, doc, upsert=True)
+        if generation is not None and self.generation(user_id) != generation:
+            cache.delete_one({"_id": key, "generation": generation})
+            return False
+        return True
+
+    def delete(self, *keys):
+        self.get_db().cache.delete_many({"_id": {"$in": list(keys)}})
+
+    def generation(self, user_id):
+        doc = self.get_db().cache.find_one({"_id": generation_key(user_id)}, {"value": 1})
+        return doc['value'] if doc else 0
+
+    def bump(self, user_id):
+        self.get_db().cache.update_one(
+            {"_id": generation_key(user_id)},
+            {"$inc": {"value": 1},
+             "$set": {"expires_at": datetime.datetime.utcnow() + datetime.timedelta(seconds=GENERATION_TTL)}},
+            upsert=True
+        )
+
+    def ensure_collections(self):
+        self.get_db().cache.create_index("expires_at", expireAfterSeconds=0)
+
+    def close(self):
+        pass
+
+
+def get_cache():
+    return current_app.extensions.get('cache')
+
+
+def cached(kind, user_id, compute, ttl=DEFAULT_TTL, variant=None):
+    """
+    Return the cached value for (kind, user) or compute and store it.
+    `variant` distinguishes values that share an invalidation key
+    (e.g. risk scores from different model versions).
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    key = cache_key(kind, user_id)
+    # Read before the entry: an invalidation during compute() changes it and the result is not stored
+    generation = cache.generation(user_id)
+    entry = cache.get(key) or {}
+    slot = variant or 'default'
+    if slot in entry:
+        return entry[slot]
+    value = compute()
+    cache.set(key, {**entry, slot: value}, ttl, user_id=user_id, generation=generation)
+    return value
+
+
+def invalidate(user_id, event_type, kinds=None):
+    """
+    Drop the user's derived entries after a change of `event_type`. This is
+    all an invalidation is: the generation bump and the delete, both in the
+    cache itself, so with the mongo backend every node sees them at once.
+    `kinds` narrows what is dropped when the caller knows only some derived
+    values are affected.
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+    kinds = INVALIDATES[event_type] if kinds is None else kinds
+    cache.stats['invalidations'] += 1
+    if not kinds:
+        return
+    try:
+        # Bump first, so a value computed from the old data is not stored after the delete
+        cache.bump(user_id)
+        cache.delete(*(cache_key(kind, user_id) for kind in kinds))
+    except PyMongoError as e:
+        # A stale entry expires with its TTL; the write itself already succeeded
+        print(f"Cache Invalidation Error: {e}")
+
+
+def cache_metrics(cache):
+    return {f'cache_{key}_total': (f"Shared cache: {key}", COUNTER, value) for key, value in cache.stats.items()}
+
+
+def init_cache(app):
+    """Create the cache backend named by CACHE_BACKEND ('local', 'mongo' or 'off')"""
+    backend_name = app.config.get('CACHE_BACKEND', 'local')
+    if backend_name == 'off':
+        return None
+
+    if backend_name == 'mongo':
+        from backend.db import connect
+        cache = MongoCache(connect)
+        try:
+            cache.ensure_collections()
+        except PyMongoError as e:
+            print(f"Cache Setup Error: {e}")
+    elif backend_name == 'local':
+        cache = LocalCache()
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend_name}")
+
+    app.extensions['cache'] = cache
+    register_collector(app, lambda: cache_metrics(cache))
+    return cache
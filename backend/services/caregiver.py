@@ -0,0 +1,228 @@
+import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+from backend.models import AlertThresholds, HealthReading, Profile
+from backend.services.cache import cache_key
+from backend.services.insights import build_risk_data
+from backend.services.risk_model import calculate_risk_score
+
+# Panel ordering, most urgent first
+SEVERITIES = ('critical', 'warning', 'stable', 'no_data')
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+MEMBER_STATUSES = ('pending', 'active')
+
+
+def _object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def create_group(db, owner_id, name):
+    return db.patient_groups.insert_one({
+        "name": name,
+        "owner_id": owner_id,
+        "created_at": datetime.datetime.utcnow()
+    }).inserted_id
+
+
+def find_group(db, group_id, owner_id):
+    """The group when it exists and belongs to owner_id"""
+    oid = _object_id(group_id)
+    if oid is None:
+        return None
+    return db.patient_groups.find_one({"_id": oid, "owner_id": owner_id})
+
+
+def list_groups(db, owner_id):
+    groups = list(db.patient_groups.find({"owner_id": owner_id}).sort("created_at", 1))
+    counts = {
+        row['_id']: row
+        for row in db.group_members.aggregate([
+            {"$match": {"group_id": {"$in": [str(group['_id']) for group in groups]}}},
+            {"$group": {
+                "_id": "$group_id",
+                "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+                "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}}
+            }}
+        ])
+    }
+    for group in groups:
+        group['_id'] = str(group['_id'])
+        row = counts.get(group['_id'], {})
+        group['patients'] = row.get('active', 0)
+        group['pending'] = row.get('pending', 0)
+    return groups
+
+
+def invite_patient(db, group_id, email):
+    """
+    Add a pending membership for the user with this email; the patient has
+    to accept before their data shows up on the panel.
+    Raises ValueError with a user-facing message on bad input.
+    """
+    user = db.users.find_one({"email": email}, {"_id": 1})
+    if not user:
+        raise ValueError("No user with that email")
+    patient_id = str(user['_id'])
+    db.group_members.update_one(
+        {"group_id": group_id, "patient_id": patient_id},
+        {"$setOnInsert": {"status": "pending", "invited_at": datetime.datetime.utcnow()}},
+        upsert=True
+    )
+    return patient_id
+
+
+def remove_patient(db, group_id, patient_id):
+    return db.group_members.delete_one({"group_id": group_id, "patient_id": patient_id}).deleted_count
+
+
+def pending_invitations(db, patient_id):
+    memberships = list(db.group_members.find({"patient_id": patient_id, "status": "pending"}))
+    groups = {
+        str(group['_id']): group
+        for group in db.patient_groups.find(
+            {"_id": {"$in": [_object_id(m['group_id']) for m in memberships]}}, {"name": 1}
+        )
+    }
+    return [
+        {
+            "_id": str(m['_id']),
+            "group_id": m['group_id'],
+            "group_name": groups.get(m['group_id'], {}).get('name'),
+            "invited_at": m['invited_at'].isoformat() if isinstance(m.get('invited_at'), datetime.datetime) else None
+        }
+        for m in memberships
+    ]
+
+
+def respond_to_invitation(db, membership_id, patient_id, accept):
+    """Accept (activate) or decline (delete) a pending membership; False when not found"""
+    oid = _object_id(membership_id)
+    if oid is None:
+        return False
+    query = {"_id": oid, "patient_id": patient_id, "status": "pending"}
+    if accept:
+        result = db.group_members.update_one(
+            query, {"$set": {"status": "active", "joined_at": datetime.datetime.utcnow()}}
+        )
+        return result.matched_count == 1
+    return db.group_members.delete_one(query).deleted_count == 1
+
+
+def active_patient_ids(db, group_id):
+    return [m['patient_id'] for m in db.group_members.find({"group_id": group_id, "status": "active"}, {"patient_id": 1})]
+
+
+def _by_user(docs):
+    return {doc['user_id']: doc for doc in docs}
+
+
+def fetch_panel_data(db, patient_ids, cache=None):
+    """
+    Everything the panel shows for a set of patients, with one batched query
+    per collection ($in on user_id) instead of a round trip per patient.
+    """
+    in_ids = {"$in": patient_ids}
+    latest = _by_user(db.latest_vitals.find({"user_id": in_ids}))
+    profiles = _by_user(db.profiles.find({"user_id": in_ids}))
+    thresholds = _by_user(db.alert_thresholds.find({"user_id": in_ids}, {"_id": 0}))
+    alerts = {
+        row['_id']: row
+        for row in db.alerts.aggregate([
+            {"$match": {"user_id": in_ids, "read": False}},
+            {"$group": {
+                "_id": "$user_id",
+                "unread": {"$sum": 1},
+                "critical": {"$sum": {"$cond": [{"$eq": ["$severity", "critical"]}, 1, 0]}},
+                "latest": {"$max": "$timestamp"}
+            }}
+        ])
+    }
+    object_ids = [oid for oid in map(_object_id, patient_ids) if oid is not None]
+    names = {str(user['_id']): user.get('name') for user in db.users.find({"_id": {"$in": object_ids}}, {"name": 1})}
+
+    risks = {}
+    if cache is not None:
+        entries = cache.get_many([cache_key('risk', patient_id) for patient_id in patient_ids])
+        for patient_id in patient_ids:
+            entry = entries.get(cache_key('risk', patient_id))
+            if entry and 'default' in entry:
+                risks[patient_id] = entry['default']
+
+    return {
+        "latest": latest, "profiles": profiles, "thresholds": thresholds,
+        "alerts": alerts, "names": names, "risks": risks
+    }
+
+
+def panel_row(patient_id, data):
+    """One patient's panel entry with its severity"""
+    vitals = data['latest'].get(patient_id)
+    profile = Profile.from_bson(data['profiles'][patient_id]) if patient_id in data['profiles'] else None
+    reading = HealthReading.from_bson(vitals) if vitals else None
+
+    risk = data['risks'].get(patient_id)
+    if risk is not None:
+        risk = {"score": risk.get('score', 0), "level": risk.get('level', 'Low'), "source": "cached"}
+    elif reading is not None:
+        # No full score cached: estimate from profile and latest vitals only (no trends or adherence)
+        estimate = build_risk_data(calculate_risk_score(profile, reading))
+        risk = {"score": estimate['score'], "level": estimate['level'], "source": "estimated"}
+
+    breaches = AlertThresholds.from_bson(data['thresholds'].get(patient_id)).breaches(reading) if reading else []
+    alert_stats = data['alerts'].get(patient_id, {})
+    unread = alert_stats.get('unread', 0)
+    critical = alert_stats.get('critical', 0)
+
+    if reading is None:
+        severity = 'no_data'
+    elif critical or (risk and risk['level'] == 'High'):
+        severity = 'critical'
+    elif unread or breaches or (risk and risk['level'] == 'Moderate'):
+        severity = 'warning'
+    else:
+        severity = 'stable'
+
+    latest_alert = alert_stats.get('latest')
+    timestamp = reading.timestamp if reading else None
+    return {
+        "patient_id": patient_id,
+        "name": (profile.full_name if profile else None) or data['names'].get(patient_id),
+        "severity": severity,
+        "vitals": {
+            "heart_rate": reading.heart_rate,
+            "bp_systolic": reading.bp_systolic,
+            "bp_diastolic": reading.bp_diastolic,
+            "blood_sugar": reading.blood_sugar,
+            "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime.datetime) else timestamp
+        } if reading else None,
+        "breaches": breaches,
+        "alerts": {
+            "unread": unread,
+            "critical": critical,
+            "latest": latest_alert.isoformat() if isinstance(latest_alert, datetime.datetime) else latest_alert
+        },
+        "risk": risk
+    }
+
+
+def sort_key(row):
+    # Severity first, then the riskiest and noisiest patients within it
+    risk_score = row['risk']['score'] if row['risk'] else 0
+    return (SEVERITY_RANK[row['severity']], -row['alerts']['critical'], -risk_score,
+            -row['alerts']['unread'], row['name'] or '')
+
+
+def build_panel(db, patient_ids, cache=None):
+    """Panel rows for every patient, most urgent first"""
+    if not patient_ids:
+        return []
+    data = fetch_panel_data(db, patient_ids, cache)
+    rows = [panel_row(patient_id, data) for patient_id in patient_ids]
+    rows.sort(key=sort_key)
+    return rows
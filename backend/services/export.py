@@ -0,0 +1,288 @@
+import argparse
+import csv
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export needs pyarrow; CSV works without it
+    pa = None
+    pq = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(BASE_DIR, 'exports'))
+BATCH_SIZE = 5000
+FORMATS = ('parquet', 'csv')
+CONTENT_TYPES = {'parquet': 'application/vnd.apache.parquet', 'csv': 'text/csv'}
+# A job whose node stops renewing its lease for this long (e.g. it crashed) is re-queued
+EXPORT_LEASE = 10 * 60
+EXPORT_MAX_ATTEMPTS = 3
+# Finished (and failed) jobs and their files are deleted this many seconds later
+EXPORT_TTL = int(os.environ.get('EXPORT_TTL', 7 * 24 * 3600))
+
+COLUMNS = ('user_id', 'timestamp', 'heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar', 'image_path')
+PROJECTION = {"_id": 0, **{column: 1 for column in COLUMNS}}
+
+# Background export jobs; two at a time keeps exports from starving the web workers
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+
+
+def arrow_schema():
+    return pa.schema([
+        ('user_id', pa.string()),
+        ('timestamp', pa.timestamp('ms')),
+        ('heart_rate', pa.int32()),
+        ('bp_systolic', pa.int32()),
+        ('bp_diastolic', pa.int32()),
+        ('blood_sugar', pa.int32()),
+        ('image_path', pa.string())
+    ])
+
+
+def available_formats():
+    return FORMATS if pa is not None else ('csv',)
+
+
+def iter_log_batches(db, user_id=None, batch_size=BATCH_SIZE):
+    """
+    Stream health_logs as lists of at most batch_size rows.
+    A single user is exported in timestamp order (index-backed); a full
+    extract follows _id order so it never needs an in-memory sort.
+    """
+    if user_id:
+        cursor = db.health_logs.find({"user_id": user_id}, PROJECTION).sort("timestamp", 1)
+    else:
+        cursor = db.health_logs.find({}, PROJECTION).sort("_id", 1)
+    cursor = cursor.batch_size(batch_size)
+
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _to_int(val):
+    try:
+        return int(val) if val is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_record_batch(rows, schema):
+    """Column-major Arrow batch from a list of log documents"""
+    columns = {
+        'user_id': [row.get('user_id') for row in rows],
+        'timestamp': [row.get('timestamp') for row in rows],
+        'image_path': [row.get('image_path') for row in rows]
+    }
+    for column in ('heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar'):
+        columns[column] = [_to_int(row.get(column)) for row in rows]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def write_parquet(batches, path):
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_batch(to_record_batch(batch, schema))
+            rows += len(batch)
+    return rows
+
+
+def write_csv(batches, path):
+    rows = 0
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(COLUMNS)
+        for batch in batches:
+            for row in batch:
+                ts = row.get('timestamp')
+                writer.writerow([
+                    row.get('user_id'),
+                    ts.isoformat() if isinstance(ts, datetime.datetime) else ts,
+                    *(row.get(column) for column in COLUMNS[2:])
+                ])
+            rows += len(batch)
+    return rows
+
+
+def export_logs(db, path, fmt='parquet', user_id=None, batch_size=BATCH_SIZE):
+    """Write one user's (or every user's) health_logs to path. Returns the row count."""
+    return write_export(iter_log_batches(db, user_id, batch_size), path, fmt)
+
+
+def write_export(batches, path, fmt):
+    # Write to a temp name so a half-written file is never served
+    tmp_path = path + '.part'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    try:
+        rows = write_parquet(batches, tmp_path) if fmt == 'parquet' else write_csv(batches, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _expires_at(finished_at):
+    return finished_at + datetime.timedelta(seconds=EXPORT_TTL)
+
+
+def purge_expired_exports(db, storage, limit=100):
+    """Delete expired export jobs and their stored files; returns how many went"""
+    now = datetime.datetime.utcnow()
+    purged = 0
+    for job in db.export_jobs.find({"expires_at": {"$lt": now}}, {"filename": 1}).limit(limit):
+        # File first, so a failure leaves the job behind to try again
+        storage.delete(job['filename'])
+        db.export_jobs.delete_one({"_id": job['_id']})
+        purged += 1
+    return purged
+
+
+def _lease_until():
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=EXPORT_LEASE)
+
+
+def _claim_job(db, job_id):
+    """Take a queued job, or one whose lease ran out; None when another worker has it"""
+    from pymongo import ReturnDocument
+    now = datetime.datetime.utcnow()
+    return db.export_jobs.find_one_and_update(
+        {"_id": job_id, "$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": now}}]},
+        {"$set": {"status": "running", "started_at": now, "lease_until": _lease_until()}, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _renewing(batches, db, job):
+    """Pass batches through, renewing the job's lease; stops if another worker took it over"""
+    for batch in batches:
+        renewed = db.export_jobs.update_one(
+            {"_id": job['_id'], "attempts": job['attempts']}, {"$set": {"lease_until": _lease_until()}}
+        )
+        if renewed.matched_count == 0:
+            raise RuntimeError("Export lease lost")
+        yield batch
+
+
+def _run_job(app, job_id, tenant_id=None):
+    from flask import g
+    from backend.db import connect
+    from backend.services.storage import get_export_storage
+
+    with app.app_context():
+        g.tenant = tenant_id
+        db = connect(tenant_id)
+        job = _claim_job(db, job_id)
+        if job is None:
+            return
+        # Only the current attempt may finish the job
+        mine = {"_id": job_id, "attempts": job['attempts']}
+        fd, path = tempfile.mkstemp(suffix=f".{job['format']}")
+        os.close(fd)
+        try:
+            rows = write_export(_renewing(iter_log_batches(db, job['user_id']), db, job), path, job['format'])
+            # Shared storage (GridFS under MULTI_NODE), so any node can serve the download
+            with open(path, 'rb') as fh:
+                get_export_storage().save(job['filename'], fh, CONTENT_TYPES[job['format']])
+            finished_at = datetime.datetime.utcnow()
+            db.export_jobs.update_one(mine, {"$set": {
+                "status": "done",
+                "rows": rows,
+                "size_bytes": os.path.getsize(path),
+                "finished_at": finished_at,
+                "expires_at": _expires_at(finished_at)
+            }})
+        except Exception as e:
+            print(f"Export Job Error ({job_id}): {e}")
+            finished_at = datetime.datetime.utcnow()
+            db.export_jobs.update_one(mine, {"$set": {
+                "status": "failed",
+                "error": str(e),
+                "finished_at": finished_at,
+                "expires_at": _expires_at(finished_at)
+            }})
+        finally:
+            for leftover in (path, path + '.part'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        try:
+            purge_expired_exports(db, get_export_storage())
+        except Exception as e:
+            print(f"Export Cleanup Error: {e}")
+
+
+def _submit(job_id):
+    from flask import current_app
+    from backend.db import current_tenant
+    _executor.submit(_run_job, current_app._get_current_object(), job_id, current_tenant())
+
+
+def start_export_job(db, user_id, fmt):
+    """Queue a background export of a user's history; returns the job id"""
+    now = datetime.datetime.utcnow()
+    job = {
+        "user_id": user_id,
+        "format": fmt,
+        "status": "queued",
+        "created_at": now,
+        "lease_until": _lease_until(),
+        "attempts": 0,
+        "filename": f"health_logs_{user_id}_{int(now.timestamp())}.{fmt}"
+    }
+    job_id = db.export_jobs.insert_one(job).inserted_id
+    _submit(job_id)
+    return job_id
+
+
+def resume_stale_job(db, job):
+    """
+    Re-queue a job whose node died before finishing it (its lease ran out),
+    or fail it after EXPORT_MAX_ATTEMPTS. Returns the job as it stands now.
+    """
+    lease_until = job.get('lease_until')
+    if job['status'] not in ('queued', 'running') or lease_until is None or lease_until > datetime.datetime.utcnow():
+        return job
+    if job.get('attempts', 0) >= EXPORT_MAX_ATTEMPTS:
+        now = datetime.datetime.utcnow()
+        failed = {"status": "failed", "error": "Export did not finish", "finished_at": now, "expires_at": _expires_at(now)}
+        db.export_jobs.update_one({"_id": job['_id'], "attempts": job['attempts']}, {"$set": failed})
+        return {**job, **failed}
+    _submit(job['_id'])
+    return job
+
+
+def main(argv=None):
+    from backend.db import connect
+
+    parser = argparse.ArgumentParser(description="Export health_logs to Parquet or CSV with bounded memory")
+    parser.add_argument('output', help="Destination file")
+    parser.add_argument('--user', help="Only export this user_id (default: every user)")
+    parser.add_argument('--format', choices=FORMATS, help="Default: taken from the output extension")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.output.endswith('.csv') else 'parquet')
+    start = time.perf_counter()
+    rows = export_logs(connect(), args.output, fmt, args.user, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Exported {rows:,} rows to {args.output} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
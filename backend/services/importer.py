@@ -0,0 +1,249 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import time
+
+from pymongo.errors import BulkWriteError
+
+from backend.services.validation import validate_vitals, ValidationError
+from backend.services.trends import rebuild_trend_state
+from backend.services.anomaly import rebuild_baselines
+from backend.services.sync import stamp_many
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Column names used by common device / app exports, mapped to our fields
+FIELD_ALIASES = {
+    'timestamp': ('timestamp', 'date', 'datetime', 'time', 'measured_at', 'recorded_at'),
+    'heart_rate': ('heart_rate', 'hr', 'pulse', 'heartrate', 'bpm'),
+    'bp_systolic': ('bp_systolic', 'systolic', 'sys', 'sbp'),
+    'bp_diastolic': ('bp_diastolic', 'diastolic', 'dia', 'dbp'),
+    'blood_sugar': ('blood_sugar', 'glucose', 'sugar', 'blood_glucose')
+}
+VITALS = ('heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar')
+
+
+def _normalize_keys(row):
+    lowered = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+    normalized = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                normalized[field] = lowered[alias]
+                break
+    return normalized
+
+
+def parse_timestamp(val):
+    """
+    ISO-8601 strings or epoch seconds/milliseconds to naive UTC, truncated to
+    the millisecond precision Mongo stores (so dedupe compares equal values).
+    """
+    if val is None or str(val).strip() == '':
+        raise ValidationError("timestamp is required")
+
+    if isinstance(val, (int, float)) or str(val).strip().replace('.', '', 1).isdigit():
+        seconds = float(val)
+        if seconds > 1e11:  # milliseconds
+            seconds /= 1000
+        ts = datetime.datetime.utcfromtimestamp(seconds)
+    else:
+        try:
+            ts = datetime.datetime.fromisoformat(str(val).strip().replace('Z', '+00:00'))
+        except ValueError:
+            raise ValidationError(f"Unrecognised timestamp: {val}")
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+
+
+def iter_rows(stream, fmt):
+    """Yield (line_number, raw_row) from a text stream without loading it whole"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if line:
+                yield line_number, json.loads(line)
+    elif fmt == 'json':
+        # A JSON array has to be parsed in one go; use JSON lines for very large files
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get('readings') or data.get('data') or []
+        if not isinstance(data, list):
+            raise ValueError("A JSON import must be an array of readings")
+        for index, row in enumerate(data, start=1):
+            yield index, row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    if name.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+def rebuild_latest_vitals(db, user_id):
+    """Point latest_vitals at the newest stored log for a user"""
+    latest = db.health_logs.find_one({"user_id": user_id}, sort=[("timestamp", -1)])
+    if not latest:
+        return None
+    latest.pop('_id', None)
+    latest.pop('source', None)
+    latest.pop('import_id', None)
+    db.latest_vitals.update_one(
+        {"user_id": user_id},
+        {"$set": {**latest, "updated_at": datetime.datetime.utcnow()}},
+        upsert=True
+    )
+    return latest
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line, msg):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "msg": msg})
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(self.rows_read / elapsed) if elapsed else None
+        }
+
+
+def _flush(db, user_id, chunk, report):
+    """Drop readings already stored for this user, then insert the rest unordered"""
+    existing = {
+        doc['timestamp'] for doc in db.health_logs.find(
+            {"user_id": user_id, "timestamp": {"$in": [doc['timestamp'] for doc in chunk]}},
+            {"_id": 0, "timestamp": 1}
+        )
+    }
+    fresh = [doc for doc in chunk if doc['timestamp'] not in existing]
+    report.duplicates += len(chunk) - len(fresh)
+    if not fresh:
+        return
+
+    stamp_many(db, user_id, fresh)
+    try:
+        report.inserted += len(db.health_logs.insert_many(fresh, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # With ordered=False everything except the failed documents is written;
+        # the unique import_dedupe index rejects readings another import just stored
+        details = e.details
+        report.inserted += details.get('nInserted', 0)
+        duplicate_errors = [err for err in details.get('writeErrors', []) if err.get('code') == 11000]
+        report.duplicates += len(duplicate_errors)
+        if len(duplicate_errors) != len(details.get('writeErrors', [])):
+            raise
+
+
+def import_readings(db, user_id, stream, fmt='csv', chunk_size=CHUNK_SIZE):
+    """
+    Backfill historical readings for a user. Rows are validated with the
+    same rules as live logging, deduped on (user_id, timestamp) and written
+    in unordered chunks. No alerts are raised for backfilled data; derived
+    state (latest_vitals, trends, anomaly baselines) is rebuilt once at the end.
+    """
+    report = ImportReport()
+    import_id = f"{user_id}_{int(time.time())}"
+    chunk = []
+    seen = set()
+
+    for line, raw in iter_rows(stream, fmt):
+        report.rows_read += 1
+        if not isinstance(raw, dict):
+            report.error(line, "Row must be an object")
+            continue
+        row = _normalize_keys(raw)
+        try:
+            timestamp = parse_timestamp(row.get('timestamp'))
+            vitals = validate_vitals(row)
+        except ValidationError as e:
+            report.error(line, str(e))
+            continue
+        except (ValueError, TypeError):
+            report.error(line, "Invalid input formatting.")
+            continue
+
+        if all(vitals[vital] is None for vital in VITALS):
+            report.error(line, "No vitals in row")
+            continue
+        if timestamp in seen:
+            report.duplicates += 1
+            continue
+        seen.add(timestamp)
+
+        chunk.append({
+            "user_id": user_id,
+            "timestamp": timestamp,
+            **vitals,
+            "image_path": None,
+            "source": "import",
+            "import_id": import_id
+        })
+        if len(chunk) >= chunk_size:
+            _flush(db, user_id, chunk, report)
+            chunk = []
+
+    if chunk:
+        _flush(db, user_id, chunk, report)
+
+    if report.inserted:
+        rebuild_latest_vitals(db, user_id)
+        rebuild_trend_state(db, user_id)
+        rebuild_baselines(db, user_id)
+
+    result = report.as_dict()
+    result["import_id"] = import_id
+    return result
+
+
+def main(argv=None):
+    from backend.db import connect
+
+    parser = argparse.ArgumentParser(description="Backfill historical vitals from a CSV / JSON device export")
+    parser.add_argument('path', help="CSV, JSON array or JSON lines file")
+    parser.add_argument('--user', required=True, help="user_id to import the readings for")
+    parser.add_argument('--format', choices=('csv', 'json', 'jsonl'), help="Default: from the file extension")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    with io.open(args.path, newline='', encoding='utf-8-sig') as stream:
+        report = import_readings(connect(), args.user, stream, fmt, args.chunk_size)
+
+    print(f"Read {report['rows_read']:,} rows in {report['seconds']}s ({report['rows_per_sec'] or 0:,} rows/s)")
+    print(f"   Inserted: {report['inserted']:,} | Duplicates: {report['duplicates']:,} | Invalid: {report['invalid']:,}")
+    for err in report['errors'][:10]:
+        print(f"   line {err['line']}: {err['msg']}")
+
+
+if __name__ == '__main__':
+    main()
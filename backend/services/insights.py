@@ -0,0 +1,314 @@
+import argparse
+import datetime
+import json
+import sys
+from functools import lru_cache
+
+from backend.services.risk_model import calculate_risk_score
+from backend.services.adherence import compute_windows, summarize_adherence
+from backend.models import HealthReading, Profile
+
+NO_DATA_SUMMARY = "No health data available. Please log your vitals to receive personalized insights."
+DEFAULT_SUMMARY = "Based on your health data, here's your personalized summary."
+
+# Summary sentence per (vital, band); values are filled in when rendered
+SUMMARY_TEMPLATES = {
+    ('heart_rate', 'normal'): "Your heart rate of {hr} BPM is within the normal range.",
+    ('heart_rate', 'high'): "Your heart rate of {hr} BPM is elevated. Consider stress management and regular exercise.",
+    ('heart_rate', 'low'): "Your heart rate of {hr} BPM is below normal. Consult with a healthcare provider.",
+    ('bp', 'optimal'): "Your blood pressure ({sys}/{dia} mmHg) is optimal.",
+    ('bp', 'elevated'): "Your blood pressure ({sys}/{dia} mmHg) is elevated. Monitor regularly.",
+    ('bp', 'high'): "Your blood pressure ({sys}/{dia} mmHg) is high. Lifestyle changes and medical consultation recommended.",
+    ('blood_sugar', 'normal'): "Your blood sugar of {sugar} mg/dL is in the normal fasting range.",
+    ('blood_sugar', 'elevated'): "Your blood sugar of {sugar} mg/dL is slightly elevated. Monitor your diet.",
+    ('blood_sugar', 'high'): "Your blood sugar of {sugar} mg/dL is high. Consider dietary changes and medical consultation.",
+    ('blood_sugar', 'low'): "Your blood sugar of {sugar} mg/dL is low. Ensure regular meals."
+}
+
+# (intro, how many factors to list, closing) per risk level
+RISK_TEMPLATES = {
+    'High': ("HIGH", "Primary contributing factors include: ", 3,
+             "Immediate attention and lifestyle modifications are recommended."),
+    'Moderate': ("MODERATE", "Key factors: ", 2,
+                 "Proactive measures can help reduce your risk."),
+    'Low': ("LOW", None, 0,
+            "Continue maintaining healthy habits and regular monitoring.")
+}
+
+# Suggestions per risk category whose probability exceeds 0.3, in priority order
+CATEGORY_SUGGESTIONS = (
+    ('hypertension', (
+        "Reduce sodium intake to less than 2,300mg per day",
+        "Engage in at least 150 minutes of moderate exercise weekly",
+        "Practice stress-reduction techniques like meditation or yoga"
+    )),
+    ('diabetes', (
+        "Follow a balanced diet with controlled carbohydrate intake",
+        "Monitor blood sugar levels regularly",
+        "Maintain a healthy weight through diet and exercise"
+    )),
+    ('metabolic', (
+        "Aim for gradual weight loss of 5-10% of body weight",
+        "Increase daily physical activity",
+        "Focus on whole foods and reduce processed foods"
+    )),
+    ('cardiac', (
+        "Avoid smoking and limit alcohol consumption",
+        "Maintain a heart-healthy diet (Mediterranean or DASH diet)",
+        "Get regular cardiovascular exercise"
+    ))
+)
+ADHERENCE_SUGGESTION = "Use reminders to take medications on schedule and log each dose"
+GENERAL_SUGGESTIONS = (
+    "Maintain regular health check-ups",
+    "Stay hydrated and get adequate sleep (7-9 hours)",
+    "Continue monitoring your vitals regularly"
+)
+
+AGE_PREVENTIVE = {
+    'over_50': (
+        "Annual comprehensive health screening",
+        "Colonoscopy (if not done in last 10 years)",
+        "Bone density scan"
+    ),
+    '41_50': (
+        "Annual physical examination",
+        "Cholesterol and lipid panel",
+        "Diabetes screening"
+    ),
+    'under_41': (
+        "Regular health check-ups every 2-3 years",
+        "Dental check-ups twice yearly",
+        "Eye examination every 2 years"
+    )
+}
+BP_PREVENTIVE = (
+    "Regular blood pressure monitoring at home",
+    "ECG/EKG if recommended by physician"
+)
+DIABETES_PREVENTIVE = (
+    "HbA1c test every 3-6 months",
+    "Annual eye examination for diabetic retinopathy",
+    "Foot examination for diabetic neuropathy"
+)
+GENERAL_PREVENTIVE = (
+    "Annual wellness visit",
+    "Age-appropriate cancer screenings",
+    "Immunization updates"
+)
+
+MAX_SUGGESTIONS = 5
+MAX_PREVENTIVE = 5
+
+# --- Banding ---
+
+def heart_rate_band(hr):
+    if 60 <= hr <= 100:
+        return 'normal'
+    return 'high' if hr > 100 else 'low'
+
+def bp_category(sys, dia):
+    if sys < 120 and dia < 80:
+        return 'optimal'
+    if sys < 130 and dia < 80:
+        return 'elevated'
+    return 'high'
+
+def glucose_band(sugar):
+    if 70 <= sugar <= 100:
+        return 'normal'
+    if 100 < sugar <= 140:
+        return 'elevated'
+    return 'high' if sugar > 140 else 'low'
+
+def age_band(profile):
+    if not profile:
+        return None
+    if isinstance(profile, Profile):
+        age = profile.age or 0
+    else:
+        try:
+            age = int(profile.get('age') or 0)
+        except (TypeError, ValueError):
+            age = 0
+    if age > 50:
+        return 'over_50'
+    if age > 40:
+        return '41_50'
+    return 'under_41'
+
+def risk_level(score):
+    return "Low" if score <= 30 else ("Moderate" if score <= 60 else "High")
+
+# --- Memoized fragments ---
+
+@lru_cache(maxsize=4096)
+def render_summary_fragment(key, **values):
+    return SUMMARY_TEMPLATES[key].format(**values)
+
+@lru_cache(maxsize=4096)
+def render_risk_explanation(level, score, factors):
+    label, factors_intro, factor_count, closing = RISK_TEMPLATES[level]
+    text = f"Your current health risk score is {score}/100, indicating a {label} risk level. "
+    if factors_intro:
+        text += factors_intro + ", ".join(factors[:factor_count]) + ". "
+    return text + closing
+
+@lru_cache(maxsize=256)
+def render_suggestions(categories, low_adherence):
+    suggestions = []
+    for category, texts in CATEGORY_SUGGESTIONS:
+        if category in categories:
+            suggestions.extend(texts)
+    if low_adherence:
+        suggestions.insert(0, ADHERENCE_SUGGESTION)
+    if not suggestions:
+        suggestions.extend(GENERAL_SUGGESTIONS)
+    return tuple(suggestions[:MAX_SUGGESTIONS])
+
+@lru_cache(maxsize=64)
+def render_preventive(age_key, bp_flag, diabetes_flag):
+    preventive = list(AGE_PREVENTIVE.get(age_key, ()))
+    if bp_flag:
+        preventive.extend(BP_PREVENTIVE)
+    if diabetes_flag:
+        preventive.extend(DIABETES_PREVENTIVE)
+    if not preventive:
+        preventive.extend(GENERAL_PREVENTIVE)
+    return tuple(preventive[:MAX_PREVENTIVE])
+
+def generate_ai_insights(profile, latest_log, risk_data):
+    """
+    Generate AI-powered health insights based on user data
+    """
+    insights = {
+        "summary": "",
+        "risk_explanation": "",
+        "improvement_suggestions": [],
+        "preventive_care": []
+    }
+
+    if not latest_log:
+        insights["summary"] = NO_DATA_SUMMARY
+        return insights
+
+    # Personalized summary, one fragment per available vital
+    reading = HealthReading.coerce(latest_log)
+    summary_parts = []
+    hr = reading.heart_rate
+    if hr:
+        summary_parts.append(render_summary_fragment(('heart_rate', heart_rate_band(hr)), hr=hr))
+
+    sys, dia = reading.bp_systolic, reading.bp_diastolic
+    if sys and dia:
+        summary_parts.append(render_summary_fragment(('bp', bp_category(sys, dia)), sys=sys, dia=dia))
+
+    sugar = reading.blood_sugar
+    if sugar:
+        summary_parts.append(render_summary_fragment(('blood_sugar', glucose_band(sugar)), sugar=sugar))
+
+    insights["summary"] = " ".join(summary_parts) if summary_parts else DEFAULT_SUMMARY
+
+    # Risk explanation
+    factors = risk_data.get('factors', [])
+    insights["risk_explanation"] = render_risk_explanation(
+        risk_data.get('level', 'Low'), risk_data.get('score', 0), tuple(factors)
+    )
+
+    # Improvement suggestions keyed on the categories over 0.3
+    probabilities = risk_data.get('risk_probabilities', {})
+    categories = frozenset(name for name, p in probabilities.items() if p > 0.3)
+    low_adherence = any('Medication Adherence' in f for f in factors)
+    insights["improvement_suggestions"] = list(render_suggestions(categories, low_adherence))
+
+    # Preventive care by age band plus risk-factor specific checks
+    factor_text = str(factors)
+    bp_flag = 'High Blood Pressure' in factors or 'Hypertension' in factor_text
+    diabetes_flag = 'High Blood Sugar' in factors or 'Diabetes' in factor_text
+    insights["preventive_care"] = list(render_preventive(age_band(profile), bp_flag, diabetes_flag))
+
+    return insights
+
+def build_risk_data(result):
+    """Shape a calculate_risk_score result the way the insights API returns it"""
+    if len(result) == 2:
+        score, factors = result
+        return {
+            "score": score,
+            "level": risk_level(score),
+            "factors": factors,
+            "risk_probabilities": {},
+            "trend_indicators": []
+        }
+    score, factors, trend_indicators, risk_probabilities, derived_metrics = result
+    return {
+        "score": score,
+        "level": risk_level(score),
+        "factors": factors,
+        "risk_probabilities": risk_probabilities,
+        "trend_indicators": trend_indicators,
+        "derived_metrics": derived_metrics
+    }
+
+def generate_insights_bulk(db, user_ids):
+    """
+    Insights for many users with one batched query per collection,
+    e.g. for nightly email digests. Returns {user_id: {"insights", "risk_data"}}.
+    Only the command line below uses it; the API serves one user at a time.
+    """
+    user_ids = list(user_ids)
+    query = {"user_id": {"$in": user_ids}}
+
+    # Parsed once here and shared by the risk model and the insight templates
+    profiles = {doc['user_id']: Profile.from_bson(doc) for doc in db.profiles.find(query)}
+    latest = {doc['user_id']: HealthReading.from_bson(doc) for doc in db.latest_vitals.find(query)}
+    trends = {doc['user_id']: doc.get('stats', {}) for doc in db.vitals_trends.find(query, {"user_id": 1, "stats": 1})}
+
+    # Only medications still taken count, as in compute_risk
+    active = [str(doc['_id']) for doc in db.medications.find({**query, "active": True}, {"_id": 1})]
+    today = datetime.datetime.utcnow().date()
+    adherence = {}
+    for doc in db.medication_adherence.find({**query, "medication_id": {"$in": active}},
+                                            {"user_id": 1, "medication_id": 1, "days": 1}):
+        adherence.setdefault(doc['user_id'], {})[doc['medication_id']] = compute_windows(doc.get('days', {}), today)
+
+    results = {}
+    for user_id in user_ids:
+        profile = profiles.get(user_id)
+        latest_log = latest.get(user_id)
+        result = calculate_risk_score(
+            profile, latest_log,
+            summarize_adherence(adherence.get(user_id, {})),
+            trends.get(user_id, {})
+        )
+        risk_data = build_risk_data(result)
+        results[user_id] = {
+            "insights": generate_ai_insights(profile, latest_log, risk_data),
+            "risk_data": risk_data
+        }
+    return results
+
+def main(argv=None):
+    from backend.db import connect
+
+    parser = argparse.ArgumentParser(description="Generate insights for many users (e.g. nightly digests) as JSON lines")
+    parser.add_argument('user_ids', nargs='*', help="Users to include (default: every user with a profile)")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--out', help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    db = connect()
+    user_ids = args.user_ids or db.profiles.distinct('user_id')
+    out = open(args.out, 'w') if args.out else sys.stdout
+    generated_at = datetime.datetime.utcnow().isoformat()
+    try:
+        for i in range(0, len(user_ids), args.batch_size):
+            batch = generate_insights_bulk(db, user_ids[i:i + args.batch_size])
+            for user_id, data in batch.items():
+                out.write(json.dumps({"user_id": user_id, "generated_at": generated_at, **data}, default=str) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+import datetime
+import re
+import threading
+import uuid
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from backend.services.anomaly import process_reading
+from backend.services.metrics import COUNTER, GAUGE, register_collector
+from backend.services.profile import CACHE_DEPENDENCIES
+from backend.services.trends import update_trend_state
+
+LATEST_FIELDS = ('user_id', 'timestamp', 'heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar', 'image_path')
+STATE_ID = 'derived_state'
+# Only one node materializes at a time; it renews its lease well before it runs out
+LEASE_SECONDS = 30
+# Save the resume token at least this often (replays are idempotent, so it need not be after every event)
+CHECKPOINT_SECONDS = 1.0
+# Change stream history is gone: the resume token can't be used any more
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def update_latest_vitals(db, reading):
+    """
+    Point latest_vitals at this reading unless a newer one is already there.
+    Safe to apply twice or out of order.
+    """
+    latest = {field: reading.get(field) for field in LATEST_FIELDS}
+    timestamp = latest['timestamp']
+    try:
+        db.latest_vitals.update_one(
+            {"user_id": latest['user_id'],
+             "$or": [{"timestamp": {"$lte": timestamp}}, {"timestamp": {"$exists": False}}]},
+            {"$set": {**latest, "updated_at": datetime.datetime.utcnow()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The user's document holds a newer reading, so the upsert collided with it
+        pass
+
+
+def materialize_reading(db, reading, skip_seen=False):
+    """
+    Fold one stored health log into the derived collections: latest_vitals,
+    the rolling trend statistics and the personal anomaly baselines.
+    Returns the anomaly alert messages.
+    """
+    user_id = reading['user_id']
+    try:
+        update_latest_vitals(db, reading)
+    except Exception as e:
+        print(f"Error updating latest_vitals: {e}")
+
+    try:
+        update_trend_state(db, user_id, reading, skip_seen=skip_seen)
+    except Exception as e:
+        print(f"Error updating vitals_trends: {e}")
+
+    # Personal deviation alerts (e.g. a sudden jump still inside the thresholds)
+    try:
+        return process_reading(db, user_id, reading, skip_seen=skip_seen)
+    except Exception as e:
+        print(f"Anomaly Detection Error: {e}")
+        return []
+
+
+class Materializer:
+    """
+    Keeps derived state in step with health_logs and profiles by following a
+    change stream, instead of extra writes in the request.
+
+    Each new reading updates latest_vitals, trends and anomaly baselines;
+    each reading or profile change drops the user's cached risk / insights
+    and recomputes the risk score into the cache. Progress is checkpointed
+    as a resume token in materializer_state, so a restart carries on where
+    the last run stopped; every step is idempotent, so events replayed after
+    the last checkpoint do no harm. Nodes compete for a lease and only the
+    holder consumes the stream.
+
+    With `deployment` set it follows every clinic's database through one
+    deployment-wide stream and applies each event in the database it came
+    from; state and lease stay in the database of get_db.
+    """
+
+    def __init__(self, app, get_db, refresh_risk=None, deployment=False):
+        self.app = app
+        self.get_db = get_db
+        self.refresh_risk = refresh_risk
+        self.deployment = deployment
+        self.node_id = uuid.uuid4().hex[:12]
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"events": 0, "readings": 0, "profile_changes": 0, "risk_refreshes": 0,
+                      "errors": 0, "lag_seconds": 0.0}
+
+    # --- Lease and checkpoint ---
+
+    def _acquire_lease(self):
+        now = datetime.datetime.utcnow()
+        try:
+            self.get_db().materializer_state.find_one_and_update(
+                {"_id": 'lease', "$or": [{"owner": self.node_id}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"owner": self.node_id, "lease_until": now + datetime.timedelta(seconds=LEASE_SECONDS)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Another node holds a live lease
+            return False
+
+    def _load_token(self):
+        doc = self.get_db().materializer_state.find_one({"_id": STATE_ID})
+        return doc.get('resume_token') if doc else None
+
+    def _save_token(self, token):
+        self.get_db().materializer_state.update_one(
+            {"_id": STATE_ID},
+            {"$set": {"resume_token": token, "updated_at": datetime.datetime.utcnow(), "owner": self.node_id}},
+            upsert=True
+        )
+
+    # --- Event handling ---
+
+    def _tenant(self, event):
+        from backend.db import DEFAULT_TENANT, tenant_from_db_name
+        return tenant_from_db_name(event['ns']['db']) if self.deployment else DEFAULT_TENANT
+
+    def handle(self, event, dirty):
+        """Apply one change event; (tenant, user) pairs whose cached risk went stale are added to `dirty`"""
+        from backend.db import connect
+        self.stats['events'] += 1
+        tenant_id = self._tenant(event)
+        if tenant_id is None:
+            return
+        collection = event['ns']['coll']
+        doc = event.get('fullDocument')
+        if collection == 'health_logs':
+            # Imports rebuild derived state themselves once the whole file is in
+            if event['operationType'] != 'insert' or not doc or doc.get('import_id'):
+                return
+            db = connect(tenant_id) if self.deployment else self.get_db()
+            materialize_reading(db, doc, skip_seen=True)
+            self.stats['readings'] += 1
+            dirty.add((tenant_id, doc['user_id']))
+            if isinstance(doc.get('timestamp'), datetime.datetime):
+                self.stats['lag_seconds'] = (datetime.datetime.utcnow() - doc['timestamp']).total_seconds()
+        elif collection == 'profiles' and doc and doc.get('user_id'):
+            self.stats['profile_changes'] += 1
+            updated = (event.get('updateDescription') or {}).get('updatedFields')
+            # A name or gender change leaves the risk score as it was
+            if updated is None or CACHE_DEPENDENCIES['risk'] & set(updated):
+                dirty.add((tenant_id, doc['user_id']))
+
+    def _refresh(self, dirty):
+        from flask import g
+        from backend.services.cache import invalidate
+        for tenant_id in {tenant_id for tenant_id, _user_id in dirty}:
+            with self.app.app_context():
+                # Risk is recomputed from the clinic's own database
+                g.tenant = tenant_id
+                for user_id in sorted(user_id for tenant, user_id in dirty if tenant == tenant_id):
+                    invalidate(user_id, 'vitals')
+                    if self.refresh_risk:
+                        try:
+                            self.refresh_risk(user_id)
+                            self.stats['risk_refreshes'] += 1
+                        except Exception as e:
+                            print(f"Risk Refresh Error: {e}")
+
+    def run_once(self, max_events=None):
+        """Follow the stream while this node holds the lease (returns when it stops or loses it)"""
+        db = self.get_db()
+        match = {
+            "ns.coll": {"$in": ["health_logs", "profiles"]},
+            "operationType": {"$in": ["insert", "update", "replace"]}
+        }
+        source = db
+        if self.deployment:
+            from backend.db import TENANT_DB_SEPARATOR
+            match['ns.db'] = {"$regex": f"^{re.escape(db.name)}({TENANT_DB_SEPARATOR}|$)"}
+            source = db.client
+        pipeline = [{"$match": match}]
+        token = self._load_token()
+        try:
+            stream = source.watch(pipeline, full_document='updateLookup', resume_after=token, max_await_time_ms=500)
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                raise
+            print("Materializer resume token expired; continuing from now (run rebuild tools to catch up)")
+            stream = source.watch(pipeline, full_document='updateLookup', max_await_time_ms=500)
+
+        processed = 0
+        with stream:
+            last_checkpoint = datetime.datetime.utcnow()
+            dirty = set()
+            while not self._stop.is_set():
+                event = stream.try_next()
+                if event is not None:
+                    self.handle(event, dirty)
+                    processed += 1
+                now = datetime.datetime.utcnow()
+                due = (now - last_checkpoint).total_seconds() >= CHECKPOINT_SECONDS
+                # Refresh cached risk once the burst is over (or at the latest every checkpoint)
+                if dirty and (event is None or due):
+                    self._refresh(dirty)
+                    dirty = set()
+                if due:
+                    if stream.resume_token is not None:
+                        self._save_token(stream.resume_token)
+                    last_checkpoint = now
+                    if not self._acquire_lease():
+                        return processed
+                if max_events is not None and processed >= max_events:
+                    break
+            if dirty:
+                self._refresh(dirty)
+            if stream.resume_token is not None:
+                self._save_token(stream.resume_token)
+        return processed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._acquire_lease():
+                    self.run_once()
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Materializer Error: {e}")
+            self._stop.wait(LEASE_SECONDS / 3)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='materializer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def materializer_metrics(materializer):
+    metrics = {}
+    for key, value in materializer.stats.items():
+        if key == 'lag_seconds':
+            metrics['materializer_lag_seconds'] = ("Age of the last reading when it was materialized", GAUGE, value)
+        else:
+            metrics[f'materializer_{key}_total'] = (f"Materializer: {key}", COUNTER, value)
+    return metrics
+
+
+def init_materializer(app):
+    """Start the change-stream materializer when MATERIALIZER is on (needs a replica set)"""
+    if not app.config.get('MATERIALIZER'):
+        return None
+
+    import atexit
+    from backend.db import connect
+    from backend.services.cache import cached
+    from backend.routes.health import compute_risk
+
+    def refresh_risk(user_id):
+        # The entry was just invalidated, so this recomputes and stores it
+        cached('risk', user_id, lambda: compute_risk(user_id))
+
+    materializer = Materializer(app, connect, refresh_risk, deployment=app.config.get('TENANT_MODE', False))
+    materializer.start()
+    atexit.register(materializer.stop)
+    app.extensions['materializer'] = materializer
+    register_collector(app, lambda: materializer_metrics(materializer))
+    return materializer
@@ -0,0 +1,276 @@
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+
+from flask import Response, current_app, g, request
+from flask.json.provider import DefaultJSONProvider
+from pymongo import monitoring
+
+# Latency buckets in seconds (Prometheus histogram upper bounds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+# Alert-to-delivery delay buckets in seconds (includes digest windows and retries)
+DELIVERY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 3600)
+
+# Sampling interval for the per-request profiler
+PROFILE_INTERVAL = 0.001
+
+
+class Histogram:
+    """Cumulative histogram keyed by label values, rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for label_values, series in items:
+            labels = _format_labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+def _format_labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Request latency by route", ('method', 'route', 'status'))
+REQUEST_MONGO_COMMANDS = Histogram(
+    'http_request_mongo_commands', "Mongo commands issued per request", ('route',), COUNT_BUCKETS)
+REQUEST_MONGO_SECONDS = Histogram(
+    'http_request_mongo_seconds', "Time per request spent waiting on Mongo", ('route',))
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongo_command_duration_seconds', "Mongo command latency by command", ('command', 'outcome'))
+SPAN_LATENCY = Histogram(
+    'span_duration_seconds', "Timed sections inside request handlers", ('span',))
+NOTIFICATION_DELAY = Histogram(
+    'notification_delivery_seconds', "Time from alert to delivered notification", ('channel',), DELIVERY_BUCKETS)
+
+HISTOGRAMS = (REQUEST_LATENCY, REQUEST_MONGO_COMMANDS, REQUEST_MONGO_SECONDS, MONGO_COMMAND_LATENCY, SPAN_LATENCY,
+              NOTIFICATION_DELAY)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+
+
+def register_collector(app, fn):
+    """
+    Add a callable returning {metric_name: (help, COUNTER or GAUGE, value)} for
+    metrics owned elsewhere; a value may be {"label": ..., "values": {...}}.
+    Collectors belong to the app, so a second app in the process has its own.
+    """
+    app.extensions.setdefault('metrics_collectors', []).append(fn)
+    return fn
+
+
+# --- Per-request state ---
+
+_local = threading.local()
+
+
+def _request_stats():
+    return getattr(_local, 'stats', None)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time a section of work; recorded globally and in the request's Server-Timing header"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_LATENCY.observe(elapsed, name)
+        stats = _request_stats()
+        if stats is not None:
+            stats['spans'][name] = stats['spans'].get(name, 0.0) + elapsed
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Mongo command monitoring. Events fire on the thread that ran the
+    command, so they can be attributed to the request being served there.
+    """
+
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_LATENCY.observe(seconds, event.command_name, outcome)
+        stats = _request_stats()
+        if stats is not None:
+            stats['mongo_commands'] += 1
+            stats['mongo_seconds'] += seconds
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+
+command_timer = CommandTimer()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with response serialization recorded as a span"""
+
+    def response(self, *args, **kwargs):
+        with span('json'):
+            return super().response(*args, **kwargs)
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack at a fixed interval and aggregates the
+    samples as folded stacks (the input format of flamegraph tools).
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def write(self, path):
+        with open(path, 'w') as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+# --- Flask wiring ---
+
+def _route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def _before_request():
+    _local.stats = {"mongo_commands": 0, "mongo_seconds": 0.0, "spans": {}}
+    g.metrics_start = time.perf_counter()
+    if current_app.config.get('PROFILING_ENABLED') and request.headers.get('X-Profile') == '1':
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    stats = _request_stats()
+    _local.stats = None
+    if start is None or stats is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = _route_label()
+    REQUEST_LATENCY.observe(elapsed, request.method, route, response.status_code)
+    REQUEST_MONGO_COMMANDS.observe(stats['mongo_commands'], route)
+    REQUEST_MONGO_SECONDS.observe(stats['mongo_seconds'], route)
+
+    timings = [f"total;dur={elapsed * 1000:.1f}",
+               f'db;dur={stats["mongo_seconds"] * 1000:.1f};desc="{stats["mongo_commands"]} commands"']
+    timings.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stats['spans'].items())
+    response.headers['Server-Timing'] = ", ".join(timings)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        profile_dir = current_app.config['PROFILE_DIR']
+        os.makedirs(profile_dir, exist_ok=True)
+        filename = f"{route.strip('/').replace('/', '_') or 'root'}_{int(time.time() * 1000)}.folded"
+        profiler.write(os.path.join(profile_dir, filename))
+        response.headers['X-Profile-File'] = filename
+    return response
+
+
+def render_metrics(app=None):
+    app = app or current_app
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for collector in app.extensions.get('metrics_collectors', ()):
+        for name, (help_text, kind, value) in collector().items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(value, dict):
+                label, values = value['label'], value['values']
+                for label_value, count in sorted(values.items()):
+                    lines.append(f'{name}{{{label}="{_escape(label_value)}"}} {count}')
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Request timing hooks, JSON and JWT spans and the /metrics endpoint; subsystems add collectors"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.json = TimedJSONProvider(app)
+    jwt_manager = app.extensions.get('flask-jwt-extended')
+    if jwt_manager is not None:
+        # Every verification (jwt_required, verify_jwt_in_request, decode_token) goes through this call
+        decode = jwt_manager._decode_jwt_from_config
+
+        def timed_decode(*args, **kwargs):
+            with span('jwt'):
+                return decode(*args, **kwargs)
+        jwt_manager._decode_jwt_from_config = timed_decode
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(app), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,417 @@
+import json
+import math
+import operator
+import os
+import random
+import threading
+import time
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up batch scoring of linear models
+    np = None
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_models')
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+
+def _lookup(name, features, probabilities):
+    # "prob.<category>" reads probabilities assigned by earlier rule groups
+    if name.startswith('prob.'):
+        return probabilities.get(name[5:], 0)
+    return features.get(name)
+
+
+def compile_condition(cond):
+    """
+    Turn a declarative condition into a predicate(features, probabilities).
+    Forms: ["feature", "op", value], {"all": [...]}, {"any": [...]}
+    A condition on a missing (None) feature is false.
+    """
+    if isinstance(cond, dict):
+        if 'all' in cond:
+            parts = [compile_condition(c) for c in cond['all']]
+            return lambda f, p: all(part(f, p) for part in parts)
+        if 'any' in cond:
+            parts = [compile_condition(c) for c in cond['any']]
+            return lambda f, p: any(part(f, p) for part in parts)
+        raise ValueError(f"Unknown condition: {cond}")
+
+    name, op, value = cond
+    compare = OPERATORS[op]
+
+    def predicate(features, probabilities):
+        actual = _lookup(name, features, probabilities)
+        if actual is None:
+            return False
+        return compare(actual, value)
+    return predicate
+
+
+def _sigmoid(x):
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1 + z)
+
+
+class RuleTableModel:
+    """
+    Banded scoring table. Each group is an if/elif chain: the first rule whose
+    condition holds applies its points, factor, probabilities and indicators.
+    """
+    kind = 'rule_table'
+
+    def __init__(self, spec):
+        self.version = spec['version']
+        self.description = spec.get('description', '')
+        self.base_score = spec.get('base_score', 0)
+        self.groups = []
+        for group in spec['groups']:
+            rules = []
+            for rule in group['rules']:
+                rules.append((
+                    compile_condition(rule['when']),
+                    rule.get('points', 0),
+                    rule.get('factor'),
+                    rule.get('probabilities', {}),
+                    rule.get('probabilities_mode', 'set'),
+                    rule.get('indicators', []),
+                    rule.get('floor')
+                ))
+            self.groups.append((tuple(group.get('requires', [])), rules))
+
+    def score(self, features):
+        score = self.base_score
+        factors = []
+        indicators = []
+        probabilities = {}
+
+        for requires, rules in self.groups:
+            if any(features.get(name) is None for name in requires):
+                continue
+            for predicate, points, factor, probs, mode, rule_indicators, floor in rules:
+                if not predicate(features, probabilities):
+                    continue
+                score += points
+                if floor is not None:
+                    score = max(floor, score)
+                if factor:
+                    factors.append(factor.format(**features))
+                for category, value in probs.items():
+                    if mode == 'max':
+                        value = max(probabilities.get(category, 0), value)
+                    probabilities[category] = value
+                indicators.extend(text.format(**features) for text in rule_indicators)
+                break
+
+        return {
+            "score": score,
+            "factors": factors,
+            "trend_indicators": indicators,
+            "risk_probabilities": probabilities
+        }
+
+    def score_batch(self, rows):
+        return [self.score(features) for features in rows]
+
+
+class LogisticModel:
+    """
+    Logistic regression exported as data. The "score" head gives the 0-100
+    score, any other heads become risk_probabilities.
+    Missing features are imputed with the training mean.
+    """
+    kind = 'logistic'
+
+    def __init__(self, spec):
+        self.version = spec['version']
+        self.description = spec.get('description', '')
+        self.feature_names = spec['features']
+        self.means = [spec['means'][name] for name in self.feature_names]
+        self.labels = spec.get('labels', {})
+        self.max_factors = spec.get('max_factors', 3)
+        self.heads = {
+            name: (head['intercept'], [head['coefficients'][f] for f in self.feature_names])
+            for name, head in spec['heads'].items()
+        }
+        if np is not None:
+            self._np_heads = {
+                name: (intercept, np.array(coef, dtype=float))
+                for name, (intercept, coef) in self.heads.items()
+            }
+
+    def vectorize(self, features):
+        row = []
+        for name, mean in zip(self.feature_names, self.means):
+            value = features.get(name)
+            row.append(mean if value is None else float(value))
+        return row
+
+    def _result(self, row, logits):
+        intercept, coef = self.heads['score']
+        contributions = sorted(
+            ((c * (x - m), name) for c, x, m, name in zip(coef, row, self.means, self.feature_names)),
+            reverse=True
+        )
+        factors = [
+            f"Elevated {self.labels.get(name, name)}"
+            for contribution, name in contributions[:self.max_factors] if contribution > 0.25
+        ]
+        return {
+            "score": int(round(100 * _sigmoid(logits['score']))),
+            "factors": factors,
+            "trend_indicators": [],
+            "risk_probabilities": {
+                name: round(_sigmoid(logit), 2) for name, logit in logits.items() if name != 'score'
+            }
+        }
+
+    def score(self, features):
+        row = self.vectorize(features)
+        logits = {
+            name: intercept + sum(c * x for c, x in zip(coef, row))
+            for name, (intercept, coef) in self.heads.items()
+        }
+        return self._result(row, logits)
+
+    def score_batch(self, rows):
+        matrix = [self.vectorize(features) for features in rows]
+        if np is None or not matrix:
+            return [self.score(features) for features in rows]
+
+        X = np.array(matrix, dtype=float)
+        logits = {name: X @ coef + intercept for name, (intercept, coef) in self._np_heads.items()}
+        return [
+            self._result(row, {name: float(values[i]) for name, values in logits.items()})
+            for i, row in enumerate(matrix)
+        ]
+
+
+class TreeEnsembleModel:
+    """
+    Gradient-boosted trees in flat-array form (one array per node attribute,
+    as exported by most GBT libraries). Leaves have feature index -1.
+    """
+    kind = 'tree_ensemble'
+
+    def __init__(self, spec):
+        self.version = spec['version']
+        self.description = spec.get('description', '')
+        self.feature_names = spec['features']
+        self.means = [spec['means'][name] for name in self.feature_names]
+        self.base_margin = spec.get('base_margin', 0.0)
+        self.trees = [
+            (tree['feature'], tree['threshold'], tree['left'], tree['right'], tree['value'])
+            for tree in spec['trees']
+        ]
+
+    def score(self, features):
+        row = [
+            mean if features.get(name) is None else float(features[name])
+            for name, mean in zip(self.feature_names, self.means)
+        ]
+        margin = self.base_margin
+        for feature, threshold, left, right, value in self.trees:
+            node = 0
+            while feature[node] >= 0:
+                node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+            margin += value[node]
+        return {
+            "score": int(round(100 * _sigmoid(margin))),
+            "factors": [],
+            "trend_indicators": [],
+            "risk_probabilities": {}
+        }
+
+    def score_batch(self, rows):
+        return [self.score(features) for features in rows]
+
+
+MODEL_KINDS = {
+    RuleTableModel.kind: RuleTableModel,
+    LogisticModel.kind: LogisticModel,
+    TreeEnsembleModel.kind: TreeEnsembleModel
+}
+
+
+class ModelStats:
+    """Latency/throughput counters for one model version"""
+
+    def __init__(self, sample_size=1000):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent = deque(maxlen=sample_size)
+        self.shadow_calls = 0
+        self.shadow_abs_delta = 0.0
+        self.shadow_level_matches = 0
+
+    def record(self, seconds):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+
+    def report(self):
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1e6, 1) if recent else None
+
+        report = {
+            "calls": self.calls,
+            "mean_us": round(self.total_seconds / self.calls * 1e6, 1) if self.calls else None,
+            "p50_us": pct(0.50),
+            "p95_us": pct(0.95),
+            "p99_us": pct(0.99),
+            "max_us": round(self.max_seconds * 1e6, 1),
+            "throughput_per_sec": round(self.calls / self.total_seconds) if self.total_seconds else None
+        }
+        if self.shadow_calls:
+            report["shadow"] = {
+                "calls": self.shadow_calls,
+                "mean_abs_score_delta": round(self.shadow_abs_delta / self.shadow_calls, 2),
+                "level_agreement": round(self.shadow_level_matches / self.shadow_calls, 3)
+            }
+        return report
+
+
+def risk_level(score):
+    if score > 60:
+        return "High"
+    if score > 30:
+        return "Moderate"
+    return "Low"
+
+
+class ModelRegistry:
+    """
+    Holds every compiled risk model plus the routing config
+    (default version, per-cohort overrides and shadow versions).
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.stats = {}
+        self.default_version = None
+        self.cohorts = []
+        self.shadow_versions = []
+        self.shadow_sample_rate = 1.0
+        self._lock = threading.Lock()
+
+    def register(self, model):
+        self.models[model.version] = model
+        self.stats[model.version] = ModelStats()
+
+    def configure(self, config):
+        self.default_version = config['default']
+        self.cohorts = [
+            (cohort.get('name', cohort['model']), compile_condition(cohort['when']), cohort['model'])
+            for cohort in config.get('cohorts', [])
+        ]
+        self.shadow_versions = config.get('shadow', [])
+        self.shadow_sample_rate = config.get('shadow_sample_rate', 1.0)
+
+        for version in [self.default_version, *self.shadow_versions, *(c[2] for c in self.cohorts)]:
+            if version not in self.models:
+                raise ValueError(f"Risk model '{version}' is referenced in the registry config but not loaded")
+
+    def select(self, features, requested=None):
+        """Pick a model version: explicit request, then cohort rules, then the default"""
+        if requested and requested in self.models:
+            return requested
+        for _name, predicate, version in self.cohorts:
+            if predicate(features, {}):
+                return version
+        return self.default_version
+
+    def score(self, features, version=None):
+        version = self.select(features, version)
+        model = self.models[version]
+
+        start = time.perf_counter()
+        result = model.score(features)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats[version].record(elapsed)
+
+        if self.shadow_versions and random.random() < self.shadow_sample_rate:
+            self._shadow(features, version, result)
+
+        result['model_version'] = version
+        return result
+
+    def _shadow(self, features, primary_version, primary):
+        for version in self.shadow_versions:
+            if version == primary_version:
+                continue
+            start = time.perf_counter()
+            try:
+                shadow = self.models[version].score(features)
+            except Exception as e:
+                print(f"Shadow Model Error ({version}): {e}")
+                continue
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                stats = self.stats[version]
+                stats.record(elapsed)
+                stats.shadow_calls += 1
+                stats.shadow_abs_delta += abs(min(shadow['score'], 100) - min(primary['score'], 100))
+                if risk_level(shadow['score']) == risk_level(primary['score']):
+                    stats.shadow_level_matches += 1
+
+    def score_batch(self, rows, version=None):
+        """Score many feature rows with one model version (no shadowing)"""
+        version = version or self.default_version
+        start = time.perf_counter()
+        results = self.models[version].score_batch(rows)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self.stats[version]
+            stats.calls += len(rows)
+            stats.total_seconds += elapsed
+        return results
+
+    def report(self):
+        return {
+            "default": self.default_version,
+            "shadow": self.shadow_versions,
+            "cohorts": [{"name": name, "model": version} for name, _p, version in self.cohorts],
+            "models": {
+                version: {
+                    "kind": model.kind,
+                    "description": model.description,
+                    **self.stats[version].report()
+                }
+                for version, model in self.models.items()
+            }
+        }
+
+
+def load_registry(models_dir=MODELS_DIR):
+    """Load and compile every model declared in models_dir plus its registry.json"""
+    registry = ModelRegistry()
+    for filename in sorted(os.listdir(models_dir)):
+        if not filename.endswith('.json') or filename == 'registry.json':
+            continue
+        with open(os.path.join(models_dir, filename)) as fh:
+            spec = json.load(fh)
+        kind = spec.get('kind')
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"{filename}: unknown model kind '{kind}'")
+        registry.register(MODEL_KINDS[kind](spec))
+
+    with open(os.path.join(models_dir, 'registry.json')) as fh:
+        registry.configure(json.load(fh))
+    return registry
@@ -0,0 +1,424 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from flask import current_app, has_app_context
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from backend.services.metrics import COUNTER, GAUGE, NOTIFICATION_DELAY, register_collector
+
+# Jobs for one user and channel that are due together go out as one digest
+MAX_DIGEST = 50
+# Warnings wait this long so a burst becomes one digest; critical alerts go out at once
+DIGEST_WINDOW = 60
+# Retry schedule: RETRY_BASE * 2^attempt seconds (with jitter), capped, then give up
+RETRY_BASE = 5
+RETRY_CAP = 900
+MAX_ATTEMPTS = 6
+# A claimed job not finished within this many seconds is picked up again (crashed worker)
+LEASE_SECONDS = 120
+
+
+class FileChannel:
+    """Appends each delivery as a JSON line; the local stand-in for email / SMS"""
+
+    name = 'file'
+    concurrency = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, payload):
+        line = json.dumps(payload, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(line + '\n')
+
+
+class HttpChannel:
+    """POSTs each delivery as JSON to a webhook URL; any non-2xx answer is a failure"""
+
+    name = 'http'
+    concurrency = 4
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, payload):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload, default=str).encode('utf-8'),
+            headers={"Content-Type": "application/json"}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"HTTP {e.code} from {self.url}") from e
+
+
+def retry_delay(attempt, base=RETRY_BASE, cap=RETRY_CAP):
+    """Seconds before retry number `attempt` (1-based): exponential, jittered over its upper half"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def build_payload(jobs):
+    """One delivery for the claimed jobs: a single alert, or a digest of several"""
+    jobs = sorted(jobs, key=lambda job: job['created_at'])
+    messages = [message for job in jobs for message in job['alerts']]
+    return {
+        "user_id": jobs[0]['user_id'],
+        "severity": 'critical' if any(job['severity'] == 'critical' for job in jobs) else 'warning',
+        "digest": len(jobs) > 1,
+        "count": len(jobs),
+        "alerts": messages,
+        "alert_ids": [str(job['alert_id']) for job in jobs if job.get('alert_id')],
+        "first_at": jobs[0]['created_at'].isoformat(),
+        "last_at": jobs[-1]['created_at'].isoformat()
+    }
+
+
+class Notifier:
+    """
+    Outbound alert notifications backed by the notification_jobs collection.
+
+    enqueue() only inserts one job per channel, so alert-producing requests
+    never wait on a mail server or webhook. Each channel has its own worker
+    threads (channel.concurrency of them) that claim due jobs with
+    find_one_and_update, sweep the user's other due jobs on that channel into
+    the same delivery (a digest), and retry failures with exponential
+    backoff. Jobs are leased, so any node running workers can take over the
+    jobs of one that died mid-delivery.
+    """
+
+    def __init__(self, get_db, channels, digest_window=DIGEST_WINDOW, max_digest=MAX_DIGEST,
+                 max_attempts=MAX_ATTEMPTS, retry_base=RETRY_BASE, poll_interval=1.0, concurrency=None):
+        self.get_db = get_db
+        self.channels = {channel.name: channel for channel in channels}
+        self.digest_window = digest_window
+        self.max_digest = max_digest
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.concurrency = {name: (concurrency or {}).get(name, channel.concurrency)
+                            for name, channel in self.channels.items()}
+        self.worker_id = uuid.uuid4().hex[:12]
+
+        self._stop = threading.Event()
+        self._wake = {name: threading.Event() for name in self.channels}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._started_at = None
+        self.stats = {name: {"enqueued": 0, "deliveries": 0, "delivered_jobs": 0, "digested_jobs": 0,
+                             "retries": 0, "failed_jobs": 0}
+                      for name in self.channels}
+
+    def ensure_indexes(self):
+        jobs = self.get_db().notification_jobs
+        jobs.create_index([("channel", 1), ("status", 1), ("next_attempt_at", 1)])
+        jobs.create_index([("user_id", 1), ("channel", 1), ("status", 1)])
+        jobs.create_index("claim", sparse=True)
+        # Finished jobs are kept for a week for troubleshooting
+        jobs.create_index("finished_at", expireAfterSeconds=7 * 24 * 3600)
+
+    # --- Producer side ---
+
+    def enqueue(self, alert, alert_id=None):
+        """Queue delivery of an Alert record on every channel"""
+        now = datetime.datetime.utcnow()
+        delay = 0 if alert.severity == 'critical' else self.digest_window
+        jobs = [{
+            "user_id": alert.user_id,
+            "channel": name,
+            "alert_id": alert_id,
+            "alerts": alert.alerts,
+            "severity": alert.severity,
+            "status": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now + datetime.timedelta(seconds=delay)
+        } for name in self.channels]
+        if not jobs:
+            return
+        self.get_db().notification_jobs.insert_many(jobs)
+        with self._lock:
+            for name in self.channels:
+                self.stats[name]['enqueued'] += 1
+        if delay == 0:
+            for event in self._wake.values():
+                event.set()
+
+    # --- Workers ---
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for name, count in self.concurrency.items():
+            for i in range(count):
+                thread = threading.Thread(target=self._run, args=(name,), name=f'notify-{name}-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for event in self._wake.values():
+            event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, channel_name):
+        wake = self._wake[channel_name]
+        while not self._stop.is_set():
+            try:
+                delivered = self.process_one(channel_name)
+            except Exception as e:
+                # Keep the worker alive; leased jobs are picked up again once the lease runs out
+                print(f"Notification Queue Error: {e}")
+                delivered = False
+            if not delivered:
+                wake.wait(self.poll_interval)
+                wake.clear()
+
+    def _claim(self, channel_name):
+        """Claim the next due job plus the same user's other queued jobs; returns them or []"""
+        jobs = self.get_db().notification_jobs
+        now = datetime.datetime.utcnow()
+        claim = uuid.uuid4().hex
+        lease = {"status": "sending", "claim": claim, "claimed_by": self.worker_id,
+                 "lease_until": now + datetime.timedelta(seconds=LEASE_SECONDS)}
+        first = jobs.find_one_and_update(
+            {"channel": channel_name, "$or": [
+                {"status": "queued", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lt": now}}
+            ]},
+            {"$set": lease},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if first is None:
+            return []
+
+        # Coalesce: warnings still waiting out their digest window ride along too.
+        # Jobs backing off after a failure keep their own schedule.
+        others = [doc['_id'] for doc in jobs.find(
+            {"user_id": first['user_id'], "channel": channel_name, "status": "queued", "_id": {"$ne": first['_id']},
+             "attempts": 0, "next_attempt_at": {"$lte": now + datetime.timedelta(seconds=self.digest_window)}},
+            {"_id": 1}
+        ).sort("created_at", 1).limit(self.max_digest - 1)]
+        if others:
+            jobs.update_many({"_id": {"$in": others}, "status": "queued"}, {"$set": lease})
+            return list(jobs.find({"claim": claim}))
+        return [first]
+
+    def process_one(self, channel_name):
+        """Deliver one batch from the queue; False when nothing was due"""
+        batch = self._claim(channel_name)
+        if not batch:
+            return False
+
+        jobs = self.get_db().notification_jobs
+        ids = [job['_id'] for job in batch]
+        channel = self.channels[channel_name]
+        try:
+            channel.send(build_payload(batch))
+        except Exception as e:
+            now = datetime.datetime.utcnow()
+            counts = {'failed_jobs': 0, 'retries': 0}
+            # Each job backs off (and gives up) on its own attempt count
+            for job in batch:
+                attempts = job.get('attempts', 0) + 1
+                if attempts >= self.max_attempts:
+                    update = {"status": "failed", "finished_at": now}
+                    counter = 'failed_jobs'
+                else:
+                    update = {"status": "queued",
+                              "next_attempt_at": now + datetime.timedelta(seconds=retry_delay(attempts, self.retry_base))}
+                    counter = 'retries'
+                jobs.update_one({"_id": job['_id'], "claim": job['claim']},
+                                {"$set": {**update, "last_error": str(e)}, "$inc": {"attempts": 1},
+                                 "$unset": {"claim": "", "claimed_by": "", "lease_until": ""}})
+                counts[counter] += 1
+            with self._lock:
+                for counter, count in counts.items():
+                    self.stats[channel_name][counter] += count
+            return True
+
+        now = datetime.datetime.utcnow()
+        jobs.update_many({"_id": {"$in": ids}},
+                         {"$set": {"status": "sent", "finished_at": now, "digest_size": len(batch)},
+                          "$unset": {"claim": "", "claimed_by": "", "lease_until": ""}})
+        for job in batch:
+            NOTIFICATION_DELAY.observe((now - job['created_at']).total_seconds(), channel_name)
+        with self._lock:
+            stats = self.stats[channel_name]
+            stats['deliveries'] += 1
+            stats['delivered_jobs'] += len(batch)
+            if len(batch) > 1:
+                stats['digested_jobs'] += len(batch)
+        return True
+
+    def queue_depth(self):
+        """{channel: jobs waiting}"""
+        depth = {name: 0 for name in self.channels}
+        for row in self.get_db().notification_jobs.aggregate([
+            {"$match": {"status": {"$in": ["queued", "sending"]}}},
+            {"$group": {"_id": "$channel", "count": {"$sum": 1}}}
+        ]):
+            if row['_id'] in depth:
+                depth[row['_id']] = row['count']
+        return depth
+
+    def report(self):
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        with self._lock:
+            stats = {name: dict(values) for name, values in self.stats.items()}
+        for values in stats.values():
+            values['deliveries_per_second'] = round(values['deliveries'] / elapsed, 2) if elapsed else 0.0
+        return stats
+
+
+def get_notifier():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('notifier')
+
+
+def enqueue_alert(alert, alert_id=None):
+    """Hand a freshly stored Alert to the notifier, when notifications are enabled"""
+    notifier = get_notifier()
+    if notifier is None:
+        return
+    try:
+        notifier.enqueue(alert, alert_id)
+    except PyMongoError as e:
+        # The alert itself is stored; only its notification is lost
+        print(f"Notification Enqueue Error: {e}")
+
+
+def build_channels(names, file_path=None, http_url=None):
+    channels = []
+    for name in names:
+        if name == 'file':
+            channels.append(FileChannel(file_path))
+        elif name == 'http':
+            if not http_url:
+                raise ValueError("NOTIFY_HTTP_URL is required for the http channel")
+            channels.append(HttpChannel(http_url))
+        else:
+            raise ValueError(f"Unknown notification channel: {name}")
+    return channels
+
+
+def _parse_concurrency(spec):
+    """'http=8,file=1' -> {'http': 8, 'file': 1}"""
+    limits = {}
+    for part in filter(None, (spec or '').split(',')):
+        name, _, value = part.partition('=')
+        limits[name.strip()] = int(value)
+    return limits
+
+
+def notifier_metrics(notifier):
+    report = notifier.report()
+    metrics = {}
+    for key in ('enqueued', 'deliveries', 'delivered_jobs', 'digested_jobs', 'retries', 'failed_jobs'):
+        metrics[f'notification_{key}_total'] = (
+            f"Notifications: {key}", COUNTER, {"label": "channel", "values": {name: r[key] for name, r in report.items()}})
+    metrics['notification_queue_depth'] = (
+        "Notification jobs not yet delivered", GAUGE, {"label": "channel", "values": notifier.queue_depth()})
+    return metrics
+
+
+def init_notifications(app):
+    """Create the notifier for NOTIFY_CHANNELS (empty = off); workers run when NOTIFY_WORKERS is set"""
+    names = [name.strip() for name in app.config.get('NOTIFY_CHANNELS', '').split(',') if name.strip()]
+    if not names:
+        return None
+
+    import atexit
+    from backend.db import connect
+
+    notifier = Notifier(
+        connect,
+        build_channels(names, app.config.get('NOTIFY_FILE_PATH'), app.config.get('NOTIFY_HTTP_URL')),
+        digest_window=app.config.get('NOTIFY_DIGEST_WINDOW', DIGEST_WINDOW),
+        concurrency=_parse_concurrency(app.config.get('NOTIFY_CONCURRENCY'))
+    )
+    try:
+        notifier.ensure_indexes()
+    except PyMongoError as e:
+        print(f"Notification Setup Error: {e}")
+    if app.config.get('NOTIFY_WORKERS', True):
+        notifier.start()
+        atexit.register(notifier.stop)
+    app.extensions['notifier'] = notifier
+    register_collector(app, lambda: notifier_metrics(notifier))
+    return notifier
+
+
+# --- Local HTTP sink for trying the http channel ---
+
+def serve_sink(port=8099, fail_rate=0.0, delay=0.0, out=None):
+    """
+    Minimal webhook receiver: accepts POSTed deliveries, optionally failing a
+    share of them with 503 or answering slowly. Returns the server; the
+    `received` attribute counts accepted deliveries.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class SinkHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if delay:
+                time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            with server.lock:
+                server.received += 1
+                if out:
+                    out.write(body.decode('utf-8') + '\n')
+                    out.flush()
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), SinkHandler)
+    server.lock = threading.Lock()
+    server.received = 0
+    return server
+
+
+def main(argv=None):
+    import sys
+
+    parser = argparse.ArgumentParser(description="Local webhook sink for the http notification channel")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Share of deliveries answered with 503")
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before answering")
+    args = parser.parse_args(argv)
+
+    server = serve_sink(args.port, args.fail_rate, args.delay, out=sys.stdout)
+    print(f"Notification sink on http://127.0.0.1:{args.port}/ (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Profile writes that only touch what changed.
+
+An update is diffed against the stored profile and only changed fields are
+$set. Derived fields are recomputed only when one of their inputs changed.
+Each effective change bumps profile_version and invalidates only the
+cached kinds that read the changed fields.
+"""
+import datetime
+
+from pymongo import ReturnDocument
+
+from backend.models import Profile, _to_float
+from backend.services.cache import invalidate
+from backend.services.insights import age_band
+from backend.services.sync import sync_fields
+
+# Never taken from the request body
+PROTECTED_FIELDS = frozenset(('_id', 'user_id', 'sync_seq', 'sync_at', 'profile_version', 'updated_at'))
+
+# Cached kinds (see services.cache) and the profile fields they are computed from
+CACHE_DEPENDENCIES = {
+    'risk': frozenset(('age', 'height', 'weight', 'bmi', 'activity_level')),
+    'insights': frozenset(('age', 'height', 'weight', 'bmi', 'activity_level', 'age_band')),
+}
+
+_MISSING = object()
+
+
+def derive_bmi(height, weight):
+    return Profile.compute_bmi(_to_float(height), _to_float(weight))
+
+
+def exercise_plan(activity_level):
+    """Simple rule-based exercise recommendation"""
+    if activity_level == 'sedentary':
+        return ["Walking 30 mins", "Stretching"]
+    if activity_level == 'moderate':
+        return ["Jogging", "Cycling", "Basic Gym"]
+    return ["HIIT", "Strength Training", "Running"]
+
+
+def derive_age_band(age):
+    age = _to_float(age)
+    return age_band({"age": age}) if age is not None else None
+
+
+# Derived field -> (input fields, function of those inputs)
+DERIVED_FIELDS = {
+    'bmi': (('height', 'weight'), derive_bmi),
+    'recommended_exercises': (('activity_level',), exercise_plan),
+    'age_band': (('age',), derive_age_band),
+}
+
+
+def normalize(data):
+    """The writable part of a request body"""
+    fields = {
+        key: value for key, value in (data or {}).items()
+        if key not in PROTECTED_FIELDS and key not in DERIVED_FIELDS
+    }
+    if isinstance(fields.get('full_name'), str):
+        fields['full_name'] = fields['full_name'].strip()
+        fields['name'] = fields['full_name']  # Sync with older 'name' field if exists
+    return fields
+
+
+def diff_profile(stored, data):
+    """Fields to $set: changed inputs plus derived fields whose inputs changed"""
+    changes = {
+        key: value for key, value in normalize(data).items()
+        if stored.get(key, _MISSING) != value
+    }
+    merged = {**stored, **changes}
+    for field, (inputs, derive) in DERIVED_FIELDS.items():
+        if field in stored and not any(name in changes for name in inputs):
+            continue
+        value = derive(*(merged.get(name) for name in inputs))
+        if value is None and field not in stored:
+            continue
+        if stored.get(field, _MISSING) != value:
+            changes[field] = value
+    return changes
+
+
+def stale_kinds(changed):
+    """Cached kinds to drop after these profile fields changed"""
+    changed = set(changed)
+    return ('profile',) + tuple(kind for kind, fields in CACHE_DEPENDENCIES.items() if fields & changed)
+
+
+def update_profile(db, user_id, data):
+    """
+    Apply a profile update. Returns (profile, changed field names); nothing
+    is written and nothing is invalidated when the update changes nothing.
+    """
+    stored = db.profiles.find_one({"user_id": user_id}) or {}
+    changes = diff_profile(stored, data)
+    if not changes:
+        return stored, []
+
+    profile = db.profiles.find_one_and_update(
+        {"user_id": user_id},
+        {
+            "$set": {**changes, **sync_fields(db, user_id), "updated_at": datetime.datetime.utcnow()},
+            "$inc": {"profile_version": 1}
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    changed = sorted(changes)
+    invalidate(user_id, 'profile', kinds=stale_kinds(changed))
+    return profile, changed
@@ -0,0 +1,178 @@
+import functools
+import threading
+import time
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from pymongo import ReturnDocument
+
+from backend.services.metrics import COUNTER, GAUGE, register_collector
+
+# Token-bucket limits per endpoint: sustained requests per second and burst size.
+# risk.html polls every 30s, so a few open tabs fit comfortably inside the burst.
+DEFAULT_LIMITS = {
+    'health_log': {"rate": 0.5, "burst": 20},
+    'health_risk': {"rate": 0.2, "burst": 10},
+    # Each import rebuilds the user's derived state; a few files, then one a minute
+    'health_import': {"rate": 1 / 60, "burst": 5}
+}
+
+# Operations waiting for a pooled Mongo connection before requests are shed
+DEFAULT_SHED_QUEUE = 50
+
+
+class LocalBackend:
+    """Token buckets held in this process; fine for a single worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, last refill time)
+
+    def take(self, key, rate, burst, cost=1):
+        """
+        Refill the bucket for the time elapsed and try to take `cost` tokens.
+        Returns (allowed, retry_after_seconds).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return allowed, 0 if allowed else (cost - tokens) / rate
+
+
+class MongoBackend:
+    """
+    Buckets shared by every worker, stored in the rate_limits collection.
+    The refill and take happen in one pipeline update, so concurrent
+    workers cannot both spend the same token.
+    """
+
+    def __init__(self, get_collection):
+        self.get_collection = get_collection
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.time()
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$ts", now]}]}]}
+        refilled = {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]}
+        doc = self.get_collection().find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now, "updated_at": "$$NOW"}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc['allowed']:
+            return True, 0
+        return False, (cost - doc['tokens']) / rate
+
+
+class RateLimiter:
+    def __init__(self, backend, limits=None, shed_queue=DEFAULT_SHED_QUEUE, pool=None):
+        self.backend = backend
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.shed_queue = shed_queue
+        self.pool = pool
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "limited": {}, "shed": {}}
+
+    def _count(self, kind, endpoint):
+        with self._lock:
+            if kind == 'allowed':
+                self.stats['allowed'] += 1
+            else:
+                self.stats[kind][endpoint] = self.stats[kind].get(endpoint, 0) + 1
+
+    def check(self, endpoint, identity):
+        """
+        Returns None when the request may proceed, otherwise the
+        (status, retry_after) to reject it with.
+        """
+        if self.pool is not None and self.shed_queue and self.pool.waiting >= self.shed_queue:
+            # The database is the bottleneck; queueing more work only adds latency
+            self._count('shed', endpoint)
+            return 503, 1
+
+        limit = self.limits[endpoint]
+        allowed, retry_after = self.backend.take(f"{endpoint}:{identity}", limit['rate'], limit['burst'])
+        if not allowed:
+            self._count('limited', endpoint)
+            return 429, max(1, int(retry_after + 0.999))
+
+        self._count('allowed', endpoint)
+        return None
+
+    def report(self):
+        with self._lock:
+            return {
+                "allowed": self.stats['allowed'],
+                "limited": dict(self.stats['limited']),
+                "shed": dict(self.stats['shed']),
+                "limits": self.limits,
+                "pool_waiting": self.pool.waiting if self.pool is not None else None
+            }
+
+
+def rate_limited(endpoint):
+    """
+    Apply the per-user bucket for `endpoint`. Goes below @jwt_required so
+    the identity is known; a no-op when rate limiting is disabled.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter:
+                rejected = limiter.check(endpoint, get_jwt_identity() or request.remote_addr)
+                if rejected:
+                    status, retry_after = rejected
+                    msg = "Too many requests" if status == 429 else "Server busy, please retry"
+                    return jsonify({"msg": msg}), status, {"Retry-After": str(retry_after)}
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def limiter_metrics(limiter):
+    report = limiter.report()
+    return {
+        'rate_limit_allowed_total': ("Requests admitted by the rate limiter", COUNTER, report['allowed']),
+        'rate_limit_rejected_total': (
+            "Requests rejected with 429", COUNTER, {"label": "endpoint", "values": report['limited']}),
+        'load_shed_total': (
+            "Requests shed with 503 while the Mongo pool was saturated", COUNTER,
+            {"label": "endpoint", "values": report['shed']}),
+        'mongo_pool_waiting': ("Operations waiting for a pooled connection", GAUGE, report['pool_waiting'] or 0),
+    }
+
+
+def init_rate_limiter(app):
+    """Create the limiter unless RATE_LIMIT_BACKEND is 'off'; it lives in app.extensions"""
+    backend_name = app.config.get('RATE_LIMIT_BACKEND', 'local')
+    if backend_name == 'off':
+        return None
+
+    from backend.db import connect, pool_monitor
+
+    if backend_name == 'mongo':
+        backend = MongoBackend(lambda: connect().rate_limits)
+    elif backend_name == 'local':
+        backend = LocalBackend()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend_name}")
+
+    limiter = RateLimiter(
+        backend,
+        limits=app.config.get('RATE_LIMITS'),
+        shed_queue=app.config.get('MONGO_SHED_QUEUE', DEFAULT_SHED_QUEUE),
+        pool=pool_monitor
+    )
+    app.extensions['rate_limiter'] = limiter
+    register_collector(app, lambda: limiter_metrics(limiter))
+    return limiter
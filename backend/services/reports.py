@@ -0,0 +1,447 @@
+"""
+Weekly and monthly health reports, rendered ahead of time.
+
+A scheduled run collects each active user's trends, risk, adherence and
+alerts for the period and renders them across a process pool. Artifacts go
+to the storage backend (GridFS under MULTI_NODE, so every node can serve
+them) named after a hash of their content, so an unchanged report is never
+written twice and a file can be cached forever once served.
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.models import HealthReading, Profile
+from backend.services.adherence import active_medication_ids, get_adherence, summarize_adherence
+from backend.services.analytics import _init_worker
+from backend.services.insights import build_risk_data, generate_ai_insights
+from backend.services.risk_history import risk_history
+from backend.services.risk_model import calculate_risk_score
+from backend.services.trends import get_trends
+
+try:
+    from weasyprint import HTML
+except ImportError:  # PDF reports need weasyprint; HTML works without it
+    HTML = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+REPORT_DIR = os.environ.get('REPORT_DIR', os.path.join(BASE_DIR, 'reports'))
+# For the CLI; the app passes its STORAGE_BACKEND setting
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'gridfs' if os.environ.get('MULTI_NODE') == '1' else 'local')
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'frontend', 'templates', 'reports')
+PERIODS = ('weekly', 'monthly')
+FORMATS = ('html', 'pdf')
+CONTENT_TYPES = {'html': 'text/html; charset=utf-8', 'pdf': 'application/pdf'}
+VITALS = ('heart_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar')
+LOG_PROJECTION = {"_id": 0, "timestamp": 1, **{vital: 1 for vital in VITALS}}
+RECENT_ALERTS = 10
+# How often the in-app scheduler looks for a period that has just closed
+SCHEDULE_INTERVAL = 3600
+# A run whose lease isn't renewed for this many seconds is taken to be dead and claimed again
+RUN_LEASE = 15 * 60
+# A run that failed (or died) this many times is left for an operator
+MAX_RUN_ATTEMPTS = 3
+
+_env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+
+
+def available_formats():
+    return FORMATS if HTML is not None else ('html',)
+
+
+def period_bounds(period, now=None):
+    """[start, end) of the last complete week (Monday to Monday) or calendar month, UTC"""
+    now = now or datetime.datetime.utcnow()
+    today = datetime.datetime(now.year, now.month, now.day)
+    if period == 'weekly':
+        end = today - datetime.timedelta(days=today.weekday())
+        return end - datetime.timedelta(days=7), end
+    if period == 'monthly':
+        end = today.replace(day=1)
+        start = (end - datetime.timedelta(days=1)).replace(day=1)
+        return start, end
+    raise ValueError(f"Unknown report period: {period}")
+
+
+def active_users(db, start, end):
+    """Users who logged at least one reading in the period"""
+    return [doc['_id'] for doc in db.health_logs.aggregate([
+        {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": "$user_id"}},
+        {"$sort": {"_id": 1}}
+    ])]
+
+
+def summarize_vitals(logs):
+    """count / min / mean / max per vital, plus daily means for the charts"""
+    summary = {}
+    daily = {}
+    for log in logs:
+        day = log['timestamp'].strftime('%Y-%m-%d')
+        for vital in VITALS:
+            value = log.get(vital)
+            if value is None:
+                continue
+            stats = summary.setdefault(vital, {"count": 0, "min": value, "max": value, "total": 0})
+            stats['count'] += 1
+            stats['min'] = min(stats['min'], value)
+            stats['max'] = max(stats['max'], value)
+            stats['total'] += value
+            total, count = daily.setdefault(day, {}).get(vital, (0, 0))
+            daily[day][vital] = (total + value, count + 1)
+
+    for stats in summary.values():
+        stats['mean'] = round(stats.pop('total') / stats['count'], 1)
+    days = [
+        {"day": day, **{vital: round(total / count, 1) for vital, (total, count) in values.items()}}
+        for day, values in sorted(daily.items())
+    ]
+    return summary, days
+
+
+def sparkline(values, width=320, height=60):
+    """SVG polyline points for a series (None values skipped)"""
+    points = [(i, value) for i, value in enumerate(values) if value is not None]
+    if len(points) < 2:
+        return ""
+    low = min(value for _, value in points)
+    high = max(value for _, value in points)
+    span = (high - low) or 1
+    step = width / (len(values) - 1)
+    return " ".join(
+        f"{i * step:.1f},{height - (value - low) / span * height:.1f}" for i, value in points
+    )
+
+
+def collect_report_data(db, user_id, period, start, end):
+    """Everything one report shows, read with a handful of indexed queries"""
+    profile = db.profiles.find_one({"user_id": user_id})
+    logs = list(db.health_logs.find(
+        {"user_id": user_id, "timestamp": {"$gte": start, "$lt": end}}, LOG_PROJECTION
+    ).sort("timestamp", 1))
+    latest_log = logs[-1] if logs else None
+
+    profile = Profile.from_bson(profile) if profile else None
+    reading = HealthReading.from_bson(latest_log) if latest_log else None
+    adherence = summarize_adherence(get_adherence(db, user_id, active_medication_ids(db, user_id)))
+    trends = get_trends(db, user_id)
+    risk_data = build_risk_data(calculate_risk_score(profile, reading, adherence, trends))
+    insights = generate_ai_insights(profile, reading, risk_data)
+
+    alerts = list(db.alerts.find(
+        {"user_id": user_id, "timestamp": {"$gte": start, "$lt": end}},
+        {"_id": 0, "timestamp": 1, "alerts": 1, "severity": 1}
+    ).sort("timestamp", -1))
+    alert_counts = {}
+    for alert in alerts:
+        severity = alert.get('severity', 'warning')
+        alert_counts[severity] = alert_counts.get(severity, 0) + 1
+
+    vitals, days = summarize_vitals(logs)
+    history = risk_history(db, user_id, start, end, 'day')['points']
+    return {
+        "user_id": user_id,
+        "name": profile.full_name if profile and profile.full_name else None,
+        "period": period,
+        "first_day": start,
+        "last_day": end - datetime.timedelta(days=1),
+        "readings": len(logs),
+        "vitals": vitals,
+        "days": days,
+        "charts": {vital: sparkline([day.get(vital) for day in days]) for vital in VITALS},
+        "risk": risk_data,
+        "risk_history": history,
+        "risk_chart": sparkline([point['score'] for point in history]),
+        "insights": insights,
+        "adherence": adherence,
+        "alert_counts": alert_counts,
+        "recent_alerts": alerts[:RECENT_ALERTS]
+    }
+
+
+def render_html(data):
+    return _env.get_template('health_report.html').render(**data)
+
+
+def report_storage(tenant_id=None, backend_name=None):
+    """Storage for rendered reports, bound to the clinic so pool workers can use it"""
+    from backend.services.storage import make_storage
+    return make_storage(backend_name or STORAGE_BACKEND, 'reports', REPORT_DIR, tenant_id)
+
+
+def write_artifact(content, fmt, storage):
+    """Store rendered bytes under their content hash; returns (filename, hash, size)"""
+    digest = hashlib.sha256(content).hexdigest()
+    filename = f"{digest[:32]}.{fmt}"
+    if not storage.exists(filename):
+        storage.save(filename, io.BytesIO(content), CONTENT_TYPES[fmt])
+    return filename, digest, len(content)
+
+
+def render_user_reports(task, db=None):
+    """
+    Worker: collect and render one user's report in every requested format.
+    Returns the report records for the parent to store.
+    """
+    user_id, period, start, end, formats, storage, tenant_id = task
+    if db is None:
+        from backend.db import connect
+        db = connect(tenant_id)
+    data = collect_report_data(db, user_id, period, start, end)
+    html = render_html(data)
+
+    records = []
+    for fmt in formats:
+        content = html.encode('utf-8') if fmt == 'html' else HTML(string=html).write_pdf()
+        filename, digest, size = write_artifact(content, fmt, storage)
+        records.append({
+            "user_id": user_id,
+            "period": period,
+            "period_start": start,
+            "period_end": end,
+            "format": fmt,
+            "filename": filename,
+            "content_hash": digest,
+            "size_bytes": size,
+            "generated_at": datetime.datetime.utcnow()
+        })
+    return records
+
+
+def store_records(db, records):
+    for record in records:
+        db.reports.update_one(
+            {key: record[key] for key in ('user_id', 'period', 'period_end', 'format')},
+            {"$set": record},
+            upsert=True
+        )
+
+
+def run_reports(period, now=None, workers=None, formats=('html',), user_ids=None, db=None, storage=None,
+                tenant_id=None, heartbeat=None):
+    """
+    Render every active user's report for the last complete period.
+    workers=0 renders in this process (with `db`), otherwise a spawn pool
+    whose workers connect to `tenant_id`'s database. `heartbeat` is called
+    as each user's reports are stored.
+    """
+    from backend.db import connect
+    db = db if db is not None else connect(tenant_id)
+    for fmt in formats:
+        if fmt not in available_formats():
+            raise ValueError(f"Report format must be one of: {', '.join(available_formats())}")
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    start, end = period_bounds(period, now)
+    user_ids = user_ids if user_ids is not None else active_users(db, start, end)
+    storage = storage if storage is not None else report_storage(tenant_id)
+    tasks = [(user_id, period, start, end, tuple(formats), storage, tenant_id) for user_id in user_ids]
+
+    began = time.perf_counter()
+    if workers == 0:
+        reports, failed = _store_results(db, (_safe_render(task, db) for task in tasks), heartbeat)
+    else:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(workers, initializer=_init_worker) as pool:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            reports, failed = _store_results(db, pool.imap_unordered(_safe_render, tasks, chunksize), heartbeat)
+    elapsed = time.perf_counter() - began
+
+    cores = max(1, workers)
+    return {
+        "period": period,
+        "period_start": start,
+        "period_end": end,
+        "users": len(tasks),
+        "reports": reports,
+        "failed": failed,
+        "workers": workers,
+        "duration_seconds": round(elapsed, 3),
+        "reports_per_min_per_core": round(reports / (elapsed / 60) / cores, 1) if elapsed else None
+    }
+
+
+def _safe_render(task, db=None):
+    try:
+        return render_user_reports(task, db)
+    except Exception as e:
+        print(f"Report Error ({task[0]}): {e}")
+        return None
+
+
+def _store_results(db, results, heartbeat=None):
+    reports = failed = 0
+    for records in results:
+        if heartbeat:
+            heartbeat()
+        if records is None:
+            failed += 1
+            continue
+        store_records(db, records)
+        reports += len(records)
+    return reports, failed
+
+
+def claim_run(db, run_id):
+    """
+    Claim a period's run for this node. A run is claimed once, unless it failed
+    or its node stopped renewing the lease (e.g. crashed); then it is retried,
+    up to MAX_RUN_ATTEMPTS times. Returns the attempt number, or None.
+    """
+    now = datetime.datetime.utcnow()
+    claim = {"status": "running", "started_at": now, "lease_until": now + datetime.timedelta(seconds=RUN_LEASE)}
+    try:
+        db.report_runs.insert_one({"_id": run_id, **claim, "attempts": 1})
+        return 1
+    except DuplicateKeyError:
+        pass
+    run = db.report_runs.find_one_and_update(
+        {"_id": run_id, "attempts": {"$lt": MAX_RUN_ATTEMPTS},
+         "$or": [{"status": "failed"}, {"status": "running", "lease_until": {"$lt": now}}]},
+        {"$set": claim, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    return run['attempts'] if run else None
+
+
+def _lease_renewer(db, run):
+    """Heartbeat that extends the run's lease (at most once a minute) while it is still ours"""
+    renewed_at = [time.monotonic()]
+
+    def renew():
+        if time.monotonic() - renewed_at[0] < min(60, RUN_LEASE / 3):
+            return
+        lease_until = datetime.datetime.utcnow() + datetime.timedelta(seconds=RUN_LEASE)
+        if not db.report_runs.update_one(run, {"$set": {"lease_until": lease_until}}).matched_count:
+            raise RuntimeError("Report run lease lost to another node")
+        renewed_at[0] = time.monotonic()
+    return renew
+
+
+def run_due_reports(db, now=None, workers=None, formats=('html',), tenant_id=None, storage_backend=None):
+    """
+    Run every period that has closed and not been claimed yet. The claim is
+    keyed on period and end date, so only one node runs each.
+    """
+    summaries = []
+    for period in PERIODS:
+        start, end = period_bounds(period, now)
+        run_id = f"{period}:{end:%Y-%m-%d}"
+        attempt = claim_run(db, run_id)
+        if attempt is None:
+            continue
+        # Only this attempt may renew or finish the run
+        run = {"_id": run_id, "attempts": attempt}
+        try:
+            summary = run_reports(period, now, workers, formats, db=db, tenant_id=tenant_id,
+                                  storage=report_storage(tenant_id, storage_backend),
+                                  heartbeat=_lease_renewer(db, run))
+        except Exception as e:
+            # Left for the next pass (on any node) to retry
+            db.report_runs.update_one(run, {"$set": {
+                "status": "failed", "error": str(e), "finished_at": datetime.datetime.utcnow()
+            }})
+            print(f"Report Run Error ({run_id}): {e}")
+            continue
+        db.report_runs.update_one(
+            run,
+            {"$set": {**summary, "status": "done", "finished_at": datetime.datetime.utcnow()}}
+        )
+        summaries.append(summary)
+    return summaries
+
+
+class ReportScheduler:
+    """
+    Background thread that renders reports as each week / month closes, for
+    every active clinic when `tenant_mode` is set (get_db takes the tenant id)
+    """
+
+    def __init__(self, get_db, workers=None, formats=('html',), interval=SCHEDULE_INTERVAL, tenant_mode=False,
+                 storage_backend=None):
+        self.get_db = get_db
+        self.storage_backend = storage_backend
+        self.workers = workers
+        self.formats = formats
+        self.interval = interval
+        self.tenant_mode = tenant_mode
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _tenants(self):
+        if not self.tenant_mode:
+            return [None]
+        from backend.db import DEFAULT_TENANT
+        active = self.get_db(None).tenants.find({"status": "active", "_id": {"$ne": DEFAULT_TENANT}}, {"_id": 1})
+        return [DEFAULT_TENANT] + sorted(tenant['_id'] for tenant in active)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                for tenant_id in self._tenants():
+                    for summary in run_due_reports(self.get_db(tenant_id), workers=self.workers,
+                                                   formats=self.formats, tenant_id=tenant_id,
+                                                   storage_backend=self.storage_backend):
+                        self.last_run = summary
+                        print(f"Reports ({tenant_id or 'default'}, {summary['period']}): {summary['reports']} rendered, "
+                              f"{summary['reports_per_min_per_core']} reports/min/core")
+            except Exception as e:
+                print(f"Report Scheduler Error: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='report-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def init_reports(app):
+    """Start the report scheduler when REPORT_SCHEDULE is on"""
+    if not app.config.get('REPORT_SCHEDULE'):
+        return None
+
+    import atexit
+    from backend.db import connect
+
+    formats = tuple(fmt for fmt in app.config.get('REPORT_FORMATS', 'html').split(',') if fmt)
+    scheduler = ReportScheduler(connect, app.config.get('REPORT_WORKERS'), formats,
+                                tenant_mode=app.config.get('TENANT_MODE', False),
+                                storage_backend=app.config.get('STORAGE_BACKEND'))
+    scheduler.start()
+    atexit.register(scheduler.stop)
+    app.extensions['report_scheduler'] = scheduler
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the last complete period's health reports")
+    parser.add_argument('--period', choices=PERIODS, default='weekly')
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--format', dest='formats', choices=FORMATS, nargs='+', default=['html'])
+    parser.add_argument('--user', dest='users', action='append', help="Only this user_id (repeatable)")
+    parser.add_argument('--tenant', help="Clinic to render (default: the default clinic)")
+    args = parser.parse_args(argv)
+
+    summary = run_reports(args.period, workers=args.workers, formats=args.formats, user_ids=args.users,
+                          tenant_id=args.tenant)
+    print(f"{summary['period']} {summary['period_start']:%Y-%m-%d} to {summary['period_end']:%Y-%m-%d}: "
+          f"{summary['reports']:,} reports for {summary['users']:,} users ({summary['failed']} failed) "
+          f"in {summary['duration_seconds']}s")
+    print(f"Throughput: {summary['reports_per_min_per_core']} reports/min/core on {summary['workers']} workers")
+
+
+if __name__ == '__main__':
+    main()
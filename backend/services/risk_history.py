@@ -0,0 +1,115 @@
+"""
+Risk score history in per-user time buckets.
+
+Each computed risk score is appended to the user's newest bucket in
+risk_history (up to BUCKET_POINTS points per document), but only when its
+inputs differ from the last snapshot, so polling the risk endpoint does not
+grow the history. Charts read whole buckets for a range and downsample them
+instead of rerunning the model over past readings.
+"""
+import datetime
+import hashlib
+import json
+
+BUCKET_POINTS = 200
+RESOLUTIONS = {'raw': None, 'hour': 3600, 'day': 86400}
+DEFAULT_RANGE_DAYS = 30
+MAX_RAW_POINTS = 5000
+
+
+def input_fingerprint(*inputs):
+    """Stable hash of whatever went into (and came out of) a score"""
+    raw = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def record_snapshot(db, user_id, result, fingerprint, now=None):
+    """
+    Append a score to the user's newest bucket (or start a new one).
+    Returns False when the last snapshot already has this fingerprint.
+    """
+    now = now or datetime.datetime.utcnow()
+    last = db.risk_history.find_one({"user_id": user_id}, {"last_inputs": 1, "count": 1}, sort=[("end", -1)])
+    if last and last.get('last_inputs') == fingerprint:
+        return False
+
+    point = {"t": now, "s": result.get('score', 0), "p": result.get('risk_probabilities') or {}}
+    if last and last.get('count', 0) < BUCKET_POINTS:
+        updated = db.risk_history.update_one(
+            {"_id": last['_id'], "count": {"$lt": BUCKET_POINTS}},
+            {"$push": {"points": point}, "$inc": {"count": 1}, "$set": {"end": now, "last_inputs": fingerprint}}
+        )
+        if updated.matched_count:
+            return True
+    db.risk_history.insert_one({
+        "user_id": user_id, "start": now, "end": now, "count": 1,
+        "points": [point], "last_inputs": fingerprint
+    })
+    return True
+
+
+def _downsample(points, seconds):
+    """Average score and probabilities per period of `seconds`"""
+    periods = {}
+    for point in points:
+        epoch = int(point['t'].replace(tzinfo=datetime.timezone.utc).timestamp())
+        periods.setdefault(epoch - epoch % seconds, []).append(point)
+
+    result = []
+    for start in sorted(periods):
+        group = periods[start]
+        categories = {}
+        for point in group:
+            for category, value in point['p'].items():
+                categories.setdefault(category, []).append(value)
+        result.append({
+            "timestamp": datetime.datetime.utcfromtimestamp(start).isoformat(),
+            "score": round(sum(point['s'] for point in group) / len(group), 1),
+            "max_score": max(point['s'] for point in group),
+            "risk_probabilities": {
+                category: round(sum(values) / len(values), 4) for category, values in categories.items()
+            },
+            "samples": len(group)
+        })
+    return result
+
+
+def auto_resolution(start, end):
+    span = (end - start).total_seconds()
+    if span <= 2 * 86400:
+        return 'raw'
+    return 'hour' if span <= 60 * 86400 else 'day'
+
+
+def risk_history(db, user_id, start, end, resolution='auto'):
+    """Snapshots between start and end (UTC), oldest first, at the requested resolution"""
+    if resolution == 'auto':
+        resolution = auto_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of: auto, {', '.join(RESOLUTIONS)}")
+
+    points = []
+    buckets = db.risk_history.find(
+        {"user_id": user_id, "end": {"$gte": start}, "start": {"$lte": end}},
+        {"points": 1}
+    ).sort("end", 1)
+    for bucket in buckets:
+        points.extend(point for point in bucket.get('points', []) if start <= point['t'] <= end)
+    points.sort(key=lambda point: point['t'])
+
+    truncated = False
+    if RESOLUTIONS[resolution]:
+        series = _downsample(points, RESOLUTIONS[resolution])
+    else:
+        if len(points) > MAX_RAW_POINTS:
+            # Keep the most recent points; a coarser resolution covers the full range
+            points = points[-MAX_RAW_POINTS:]
+            truncated = True
+        series = [
+            {"timestamp": point['t'].isoformat(), "score": point['s'], "risk_probabilities": point['p']}
+            for point in points
+        ]
+    return {
+        "from": start.isoformat(), "to": end.isoformat(), "resolution": resolution,
+        "points": series, "truncated": truncated
+    }
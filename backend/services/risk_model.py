@@ -1,174 +1,124 @@
-import random
-import math
+from backend.services.trends import NORMAL_RANGES
+from backend.services.model_registry import load_registry
+from backend.models import HealthReading, Profile
 
-def calculate_risk_score(profile, latest_health_log):
+# Compiled once at import; models are declared as data in services/risk_models/
+registry = load_registry()
+
+VITAL_DEFAULTS = {
+    'bp_systolic': 120,
+    'bp_diastolic': 80,
+    'blood_sugar': 100,
+    'heart_rate': 70
+}
+
+def analyze_trends(trends):
+    """
+    Classify rolling trend statistics (from services.trends) into
+    worsening / improving vitals. Vitals with fewer than 3 readings are ignored.
+    """
+    worsening = []
+    improving = []
+    for vital, stats in (trends or {}).items():
+        if not stats or stats.get('n', 0) < 3 or vital not in NORMAL_RANGES:
+            continue
+        low, high = NORMAL_RANGES[vital]
+        ewma = stats['ewma']
+        direction = stats['direction']
+        if (direction == 'rising' and ewma > high) or (direction == 'falling' and ewma < low):
+            worsening.append(vital)
+        elif (direction == 'falling' and ewma > high) or (direction == 'rising' and ewma < low):
+            # Still out of range but heading back towards it
+            improving.append(vital)
+    return worsening, improving
+
+def extract_features(profile, latest_health_log, adherence=None, trends=None):
+    """
+    Flatten the profile / log / adherence / trend data into the feature dict
+    every risk model scores. Profile and log may be raw documents or the
+    parsed records from backend.models. Unusable values become None.
+    """
+    profile = Profile.coerce(profile)
+    if isinstance(latest_health_log, HealthReading):
+        reading = latest_health_log
+    else:
+        reading = HealthReading.from_bson(latest_health_log, defaults=VITAL_DEFAULTS)
+
+    features = {"age": 30 if profile.age is None else profile.age, "bmi": profile.bmi}
+
+    for vital in VITAL_DEFAULTS:
+        features[vital] = getattr(reading, vital)
+
+    activity = profile.activity_level
+    features['activity_level'] = activity
+    features['sedentary'] = 1 if activity == 'sedentary' else 0
+    # Low resting HR is expected for anyone describing themselves as active
+    features['active_label'] = 1 if 'active' in str(activity) else 0
+
+    rate = (adherence or {}).get('rate')
+    features['adherence_rate'] = rate
+    features['adherence_total'] = (adherence or {}).get('total', 0) if rate is not None else None
+    features['adherence_pct'] = int(rate * 100) if rate is not None else None
+    features['adherence_gap'] = round(1 - rate, 3) if rate is not None else 0
+
+    worsening, improving = analyze_trends(trends)
+    for vital in NORMAL_RANGES:
+        stats = (trends or {}).get(vital)
+        state = 'worsening' if vital in worsening else ('improving' if vital in improving else None)
+        features[f'{vital}_trend'] = state
+        if state:
+            features[f'{vital}_trend_n'] = stats['n']
+            features[f'{vital}_trend_ewma'] = stats['ewma']
+            features[f'{vital}_trend_direction'] = stats['direction']
+            features[f'{vital}_trend_tir_pct'] = int(stats['time_in_range'] * 100)
+
+    return features
+
+def calculate_risk_score(profile, latest_health_log, adherence=None, trends=None, model_version=None):
     """
     Enhanced ML-based risk score calculation with trend indicators
+    `adherence` is the optional user-level summary from services.adherence.summarize_adherence
+    `trends` is the optional rolling statistics document from services.trends.get_trends
+    `model_version` requests a specific registered model; otherwise cohort rules / the default apply
     """
-    base_score = 10
-    factors = []
-    trend_indicators = []
-    risk_probabilities = {}
-    
     if not profile or not latest_health_log:
         derived_metrics = {
             'overall_risk': 0,
             'trend': 'unknown',
             'recommendation_priority': 'low'
         }
-        return 0, ["Insufficient Data"], trend_indicators, risk_probabilities, derived_metrics
-    
-    # 1. Profile Analysis (Age & BMI)
-    age = 30 # Default
-    if profile:
-        try:
-            age = int(profile.get('age', 30))
-        except: pass
-        
-        # Calculate BMI if missing but height/weight available
-        if 'bmi' not in profile and profile.get('height') and profile.get('weight'):
-            try:
-                h = float(profile['height']) / 100 # assume cm
-                w = float(profile['weight'])
-                if h > 0:
-                    profile['bmi'] = round(w / (h * h), 2)
-            except: pass
-
-    # Age Risk
-    if age > 70:
-        base_score += 25
-        factors.append(f"Advanced Age ({age})")
-        risk_probabilities['cardiovascular'] = 0.45
-    elif age > 60:
-        base_score += 15
-        factors.append(f"Senior Age ({age})")
-        risk_probabilities['cardiovascular'] = 0.35
-    elif age > 45:
-        base_score += 10
-        risk_probabilities['cardiovascular'] = 0.20
-    
-    # BMI Risk
-    bmi = 22.0
-    if profile and profile.get('bmi'):
-        try:
-            bmi = float(profile['bmi'])
-            if bmi > 40:
-                base_score += 35
-                factors.append(f"Class III Obesity (BMI {bmi})")
-                risk_probabilities['metabolic'] = 0.60
-                trend_indicators.append("Critical metabolic risk")
-            elif bmi > 35:
-                base_score += 25
-                factors.append(f"Class II Obesity (BMI {bmi})")
-                risk_probabilities['metabolic'] = 0.45
-            elif bmi > 30:
-                base_score += 15
-                factors.append(f"Obesity (BMI {bmi})")
-                risk_probabilities['metabolic'] = 0.35
-            elif bmi > 25:
-                base_score += 8
-                factors.append(f"Overweight (BMI {bmi})")
-                risk_probabilities['metabolic'] = 0.20
-            elif bmi < 18.5:
-                base_score += 5
-                factors.append(f"Underweight (BMI {bmi})")
-        except: pass
-    
-    # 2. Vitals Analysis (Weighted Model)
-    # Systolic BP
-    try:
-        sys = int(latest_health_log.get('bp_systolic', 120))
-        dia = int(latest_health_log.get('bp_diastolic', 80))
-        
-        # Mean Arterial Pressure (approx) for better risk
-        map_val = (sys + 2*dia) / 3
-        
-        if sys > 180 or dia > 120:
-            base_score += 40
-            factors.append(f"Hypertensive Crisis ({sys}/{dia})")
-            risk_probabilities['hypertension'] = 0.85
-            trend_indicators.append("Urgent: BP critical")
-        elif sys >= 140 or dia >= 90:
-            base_score += 20
-            factors.append("Hypertension Stage 2")
-            risk_probabilities['hypertension'] = 0.60
-        elif sys >= 130 or dia >= 80:
-            base_score += 10
-            factors.append("Hypertension Stage 1")
-            risk_probabilities['hypertension'] = 0.40
-        elif sys < 90 or dia < 60:
-            base_score += 10
-            factors.append("Hypotension")
-            trend_indicators.append("Low blood pressure")
-            
-    except: pass
-    
-    # Blood Sugar
-    try:
-        sugar = int(latest_health_log.get('blood_sugar', 100))
-        if sugar > 300:
-            base_score += 40
-            factors.append(f"Dangerous Glucose ({sugar})")
-            risk_probabilities['diabetes'] = 0.90
-            trend_indicators.append("Urgent: Glucose critical")
-        elif sugar > 200:
-            base_score += 25
-            factors.append("Diabetes Range")
-            risk_probabilities['diabetes'] = 0.70
-        elif sugar > 140:
-            base_score += 15
-            factors.append("Prediabetes Range")
-            risk_probabilities['diabetes'] = 0.40
-        elif sugar < 70:
-            base_score += 15
-            factors.append("Hypoglycemia")
-            trend_indicators.append("Low glucose")
-    except: pass
-    
-    # Heart Rate
-    try:
-        hr = int(latest_health_log.get('heart_rate', 70))
-        if hr > 120:
-            base_score += 20
-            factors.append(f"High Tachycardia ({hr})")
-            risk_probabilities['cardiac'] = 0.50
-        elif hr > 100:
-            base_score += 10
-            factors.append("Tachycardia")
-            risk_probabilities['cardiac'] = 0.30
-        elif hr < 40 and 'active' not in str(profile.get('activity_level','')): 
-            # Low HR is bad unless athlete
-            base_score += 15
-            factors.append("Bradycardia")
-            risk_probabilities['cardiac'] = 0.30
-    except: pass
-    
-    # 3. Combined Risk Adjustments
-    # If High BP AND High Sugar -> Metabolic Syndrome Risk
-    if risk_probabilities.get('hypertension', 0) > 0.4 and risk_probabilities.get('diabetes', 0) > 0.4:
-        base_score += 15
-        factors.append("Metabolic Syndrome Risk")
-        risk_probabilities['metabolic'] = max(risk_probabilities.get('metabolic',0), 0.75)
-
-    # 4. Activity Level Mitigation
-    try:
-        activity = profile.get('activity_level', 'moderate')
-        if activity == 'sedentary':
-            base_score += 5
-        elif activity == 'active':
-            base_score = max(0, base_score - 10)  # Exercise allows reduction
-            if 'Overweight' in factors: base_score -= 5 # Active overweight is less risky
-    except: pass
-    
+        return 0, ["Insufficient Data"], [], {}, derived_metrics
+
+    features = extract_features(profile, latest_health_log, adherence, trends)
+    result = registry.score(features, model_version)
+
+    base_score = result['score']
+    factors = result['factors']
+    trend_indicators = result['trend_indicators']
+    risk_probabilities = result['risk_probabilities']
+
     # Calculate derived metrics
+    worsening, improving = analyze_trends(trends)
+    if worsening:
+        trend = 'increasing'
+    elif improving:
+        trend = 'decreasing'
+    elif any(stats and stats.get('n', 0) >= 3 for stats in (trends or {}).values()):
+        trend = 'stable'
+    else:
+        # Not enough history for real trends, fall back to the static estimate
+        trend = 'stable' if base_score < 30 else ('increasing' if len(trend_indicators) > 0 else 'moderate')
+
     derived_metrics = {
         'overall_risk': min(base_score, 100),
-        'trend': 'stable' if base_score < 30 else ('increasing' if len(trend_indicators) > 0 else 'moderate'),
+        'trend': trend,
         'recommendation_priority': 'high' if base_score > 50 else 'low',
-        'key_vitals_summary': f"BP: {latest_health_log.get('bp_systolic','-')}/{latest_health_log.get('bp_diastolic','-')}, HR: {latest_health_log.get('heart_rate','-')}"
+        'key_vitals_summary': f"BP: {latest_health_log.get('bp_systolic','-')}/{latest_health_log.get('bp_diastolic','-')}, HR: {latest_health_log.get('heart_rate','-')}",
+        'time_in_range': {vital: stats['time_in_range'] for vital, stats in (trends or {}).items() if stats},
+        'model_version': result['model_version']
     }
-    
+
     # Cap at 100
     total_score = min(base_score, 100)
-    
+
     return total_score, factors, trend_indicators, risk_probabilities, derived_metrics
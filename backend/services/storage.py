@@ -0,0 +1,117 @@
+import functools
+import mimetypes
+import os
+
+from flask import current_app
+
+
+class LocalStorage:
+    """Files on this node's disk (frontend/static/uploads by default)"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def save(self, name, stream, content_type=None):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        # Write to a temp name so a half-written file is never served
+        tmp_path = f"{path}.{os.getpid()}.part"
+        with open(tmp_path, 'wb') as fh:
+            while True:
+                chunk = stream.read(64 * 1024)
+                if not chunk:
+                    break
+                fh.write(chunk)
+        os.replace(tmp_path, path)
+        return name
+
+    def exists(self, name):
+        return os.path.isfile(os.path.join(self.root, name))
+
+    def open(self, name):
+        """(readable stream, content type) or None when missing"""
+        path = os.path.join(self.root, name)
+        if not os.path.isfile(path):
+            return None
+        return open(path, 'rb'), mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    def delete(self, name):
+        path = os.path.join(self.root, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+class GridFSStorage:
+    """Files in Mongo GridFS, so every app node can serve every upload"""
+
+    def __init__(self, get_db, bucket='uploads'):
+        self.get_db = get_db
+        self.bucket_name = bucket
+
+    def _bucket(self):
+        import gridfs
+        return gridfs.GridFSBucket(self.get_db(), bucket_name=self.bucket_name)
+
+    def save(self, name, stream, content_type=None):
+        self._bucket().upload_from_stream(
+            name, stream,
+            metadata={"content_type": content_type or mimetypes.guess_type(name)[0]}
+        )
+        return name
+
+    def exists(self, name):
+        return self.get_db()[f"{self.bucket_name}.files"].find_one({"filename": name}, {"_id": 1}) is not None
+
+    def open(self, name):
+        import gridfs
+        try:
+            grid_out = self._bucket().open_download_stream_by_name(name)
+        except gridfs.errors.NoFile:
+            return None
+        content_type = (grid_out.metadata or {}).get('content_type') or 'application/octet-stream'
+        return grid_out, content_type
+
+    def delete(self, name):
+        bucket = self._bucket()
+        # Every revision saved under the name
+        for grid_out in bucket.find({"filename": name}):
+            bucket.delete(grid_out._id)
+
+
+def get_storage():
+    return current_app.extensions['storage']
+
+
+def get_export_storage():
+    """Where finished export files are kept (not reachable through /uploads)"""
+    return current_app.extensions['export_storage']
+
+
+def get_report_storage():
+    return current_app.extensions['report_storage']
+
+
+def make_storage(backend_name, bucket, local_root, tenant_id=None):
+    """
+    A storage backend. With a tenant_id it is bound to that clinic's database
+    (and picklable), for use outside a request, e.g. in pool workers.
+    """
+    if backend_name == 'gridfs':
+        from backend.db import connect
+        return GridFSStorage(connect if tenant_id is None else functools.partial(connect, tenant_id), bucket=bucket)
+    if backend_name == 'local':
+        return LocalStorage(local_root)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend_name}")
+
+
+def init_storage(app):
+    """Create the upload, export and report storage named by STORAGE_BACKEND ('local' or 'gridfs')"""
+    from backend.services.export import EXPORT_DIR
+    from backend.services.reports import REPORT_DIR
+
+    backend_name = app.config.get('STORAGE_BACKEND', 'local')
+    storage = make_storage(backend_name, 'uploads', os.path.join(app.static_folder, 'uploads'))
+    app.extensions['storage'] = storage
+    app.extensions['export_storage'] = make_storage(backend_name, 'exports', EXPORT_DIR)
+    app.extensions['report_storage'] = make_storage(backend_name, 'reports', REPORT_DIR)
+    return storage
@@ -0,0 +1,169 @@
+"""
+Per-user change sequence for delta sync.
+
+Every write to a synced collection stamps the document with the next value
+of the user's counter (sync_seq) and the write time (sync_at); deletes leave
+a tombstone carrying a sequence number of its own. A client keeps the token
+from its last sync and receives only what changed after it.
+
+Sequence numbers are allocated just before the write lands (readings held
+by the write-behind buffer are stamped by its flusher), so for a moment
+a later number can be visible while an earlier one is not. The returned
+token therefore only covers changes that are SETTLE_SECONDS old; newer ones
+are sent now and again on the next sync, so clients apply changes
+idempotently, keyed on _id.
+"""
+import base64
+import datetime
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+SYNCED_COLLECTIONS = ('health_logs', 'medications', 'alerts', 'profiles', 'alert_thresholds')
+# Tombstones are kept this long; older tokens get a full resync
+TOMBSTONE_TTL_DAYS = 90
+# Longest a write may take between taking its sequence number and landing
+SETTLE_SECONDS = 15
+DEFAULT_PAGE = 500
+MAX_PAGE = 5000
+BACKFILL_BATCH = 1000
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def encode_token(seq, issued_at):
+    raw = f"{seq}.{int(issued_at.timestamp())}".encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """(seq, issued_at) from a token; raises InvalidToken"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('ascii')
+        seq, issued = raw.split('.')
+        return int(seq), datetime.datetime.utcfromtimestamp(int(issued))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidToken("Invalid sync token")
+
+
+def allocate(db, user_id, count=1):
+    """Reserve `count` consecutive sequence numbers for the user; returns the first"""
+    counter = db.sync_counters.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq'] - count + 1
+
+
+def sync_fields(db, user_id):
+    """Fields to $set (or merge into a new document) on any change to a synced document"""
+    return {"sync_seq": allocate(db, user_id), "sync_at": datetime.datetime.utcnow()}
+
+
+def stamp(db, user_id, doc):
+    """Stamp a document about to be inserted; returns it"""
+    doc.update(sync_fields(db, user_id))
+    return doc
+
+
+def stamp_many(db, user_id, docs):
+    if not docs:
+        return docs
+    first = allocate(db, user_id, len(docs))
+    now = datetime.datetime.utcnow()
+    for offset, doc in enumerate(docs):
+        doc['sync_seq'] = first + offset
+        doc['sync_at'] = now
+    return docs
+
+
+def stamp_batch(db, docs):
+    """Stamp documents of any number of users, just before a bulk insert"""
+    by_user = {}
+    for doc in docs:
+        by_user.setdefault(doc['user_id'], []).append(doc)
+    for user_id, user_docs in by_user.items():
+        stamp_many(db, user_id, user_docs)
+    return docs
+
+
+def record_delete(db, user_id, collection, doc_id):
+    """Leave a tombstone so clients learn about the delete"""
+    db.sync_tombstones.insert_one({
+        "user_id": user_id,
+        "collection": collection,
+        "doc_id": str(doc_id),
+        **sync_fields(db, user_id),
+        "deleted_at": datetime.datetime.utcnow()
+    })
+
+
+def ensure_backfilled(db, user_id):
+    """Give documents written before sync existed a sequence number (once per user)"""
+    counter = db.sync_counters.find_one({"_id": user_id}, {"backfilled": 1})
+    if counter and counter.get('backfilled'):
+        return
+    for name in SYNCED_COLLECTIONS:
+        collection = db[name]
+        while True:
+            ids = [doc['_id'] for doc in collection.find(
+                {"user_id": user_id, "sync_seq": {"$exists": False}}, {"_id": 1}
+            ).sort("_id", 1).limit(BACKFILL_BATCH)]
+            if not ids:
+                break
+            first = allocate(db, user_id, len(ids))
+            now = datetime.datetime.utcnow()
+            collection.bulk_write([
+                UpdateOne({"_id": doc_id, "sync_seq": {"$exists": False}},
+                          {"$set": {"sync_seq": first + offset, "sync_at": now}})
+                for offset, doc_id in enumerate(ids)
+            ], ordered=False)
+    db.sync_counters.update_one({"_id": user_id}, {"$set": {"backfilled": True}}, upsert=True)
+
+
+def _serialize(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: _serialize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_serialize(item) for item in value]
+    return value
+
+
+def changes_since(db, user_id, since=0, limit=DEFAULT_PAGE, now=None):
+    """
+    Up to `limit` changes after sequence number `since`, oldest first.
+    Returns (changes by collection, new sequence position, has_more).
+    """
+    now = now or datetime.datetime.utcnow()
+    query = {"user_id": user_id, "sync_seq": {"$gt": since}}
+    # Each source is index-ordered on (user_id, sync_seq); take the first `limit` overall
+    entries = []
+    for name in SYNCED_COLLECTIONS:
+        for doc in db[name].find(query).sort("sync_seq", 1).limit(limit + 1):
+            entries.append((doc['sync_seq'], name, doc, False))
+    for tombstone in db.sync_tombstones.find(query).sort("sync_seq", 1).limit(limit + 1):
+        entries.append((tombstone['sync_seq'], tombstone['collection'], tombstone, True))
+    entries.sort(key=lambda entry: entry[0])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changes = {name: {"upserts": [], "deletes": []} for name in SYNCED_COLLECTIONS}
+    position = since
+    settled_before = now - datetime.timedelta(seconds=SETTLE_SECONDS)
+    for seq, name, doc, deleted in entries:
+        if doc.get('sync_at', now) <= settled_before:
+            position = seq
+        if deleted:
+            changes[name]['deletes'].append(doc['doc_id'])
+        else:
+            changes[name]['upserts'].append(_serialize(doc))
+    # A full page of changes too new to settle: come back later rather than page in place
+    return changes, position, has_more and position > since
@@ -0,0 +1,268 @@
+"""
+Clinics (tenants) sharing one deployment.
+
+Each clinic's data lives in a database of its own (see backend.db), so the
+blueprints keep querying by user_id and never see another clinic's
+documents. The registry of clinics is the `tenants` collection in the
+default database. Every API request is resolved to a clinic, from the
+`tenant` claim of its token or, before login, the X-Tenant header, and is
+admitted against that clinic's quotas: a request-rate token bucket, a
+bound on its connection pool's queue and a maximum number of users.
+"""
+import argparse
+import datetime
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from pymongo.errors import PyMongoError
+
+from backend.services.metrics import COUNTER, GAUGE, register_collector
+from backend.services.rate_limit import LocalBackend, MongoBackend
+
+TENANT_HEADER = 'X-Tenant'
+# Registry entries are re-read this often, so quota changes apply without a restart
+REGISTRY_TTL = 30
+DEFAULT_QUOTAS = {"rate": 50.0, "burst": 200, "max_users": None, "shed_queue": 20}
+
+
+class TenantRegistry:
+    """Registered clinics and their quotas, cached in this process"""
+
+    def __init__(self, get_db, backend, quotas=None, ttl=REGISTRY_TTL):
+        self.get_db = get_db
+        self.backend = backend
+        self.quotas = {**DEFAULT_QUOTAS, **(quotas or {})}
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # tenant id -> (loaded at, registry doc)
+        self.stats = {"admitted": {}, "throttled": {}, "shed": {}}
+
+    def get(self, tenant_id):
+        """The clinic's registry entry, or None when it is not registered"""
+        from backend.db import DEFAULT_TENANT, TENANT_ID_PATTERN, get_client
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+        if tenant_id == DEFAULT_TENANT:
+            # Always exists: it is the database single-clinic deployments already use
+            doc = self.get_db().tenants.find_one({"_id": tenant_id}) or {"_id": tenant_id, "status": "active"}
+        elif TENANT_ID_PATTERN.match(tenant_id or ''):
+            doc = self.get_db().tenants.find_one({"_id": tenant_id})
+        else:
+            doc = None
+        if doc is None:
+            return None  # Not cached, so arbitrary header values can't fill the cache
+        # Creates the clinic's pool on first use, sized from its entry
+        get_client(tenant_id, doc.get('max_pool_size'))
+        with self._lock:
+            self._entries[tenant_id] = (now, doc)
+        return doc
+
+    def quota(self, tenant, name):
+        return (tenant.get('quotas') or {}).get(name, self.quotas.get(name))
+
+    def _count(self, kind, tenant_id):
+        with self._lock:
+            self.stats[kind][tenant_id] = self.stats[kind].get(tenant_id, 0) + 1
+
+    def admit(self, tenant):
+        """
+        Returns None when a request of this clinic may proceed, otherwise
+        the (status, retry_after) to reject it with.
+        """
+        from backend.db import tenant_pools
+
+        tenant_id = tenant['_id']
+        shed_queue = self.quota(tenant, 'shed_queue')
+        monitor = tenant_pools.get(tenant_id)
+        if shed_queue and monitor is not None and monitor.waiting >= shed_queue:
+            # Only this clinic's pool is saturated; the others are unaffected
+            self._count('shed', tenant_id)
+            return 503, 1
+
+        rate, burst = self.quota(tenant, 'rate'), self.quota(tenant, 'burst')
+        if rate:
+            allowed, retry_after = self.backend.take(f"tenant:{tenant_id}", rate, burst)
+            if not allowed:
+                self._count('throttled', tenant_id)
+                return 429, max(1, int(retry_after + 0.999))
+
+        self._count('admitted', tenant_id)
+        return None
+
+    def report(self):
+        from backend.db import tenant_pools
+
+        with self._lock:
+            stats = {kind: dict(values) for kind, values in self.stats.items()}
+        stats['pool_waiting'] = {tenant_id: monitor.waiting for tenant_id, monitor in tenant_pools.items()}
+        stats['pool_checked_out'] = {tenant_id: monitor.checked_out for tenant_id, monitor in tenant_pools.items()}
+        return stats
+
+
+def get_registry():
+    return current_app.extensions.get('tenants')
+
+
+def tenant_quota(name):
+    """A quota of the current request's clinic (None = unlimited or tenants are off)"""
+    registry = get_registry()
+    tenant = g.get('tenant_entry')
+    if registry is None or tenant is None:
+        return None
+    return registry.quota(tenant, name)
+
+
+def _resolve_tenant():
+    """Pick the clinic of an API request and apply its quotas"""
+    from backend.db import DEFAULT_TENANT
+
+    if not request.path.startswith('/api/'):
+        return None
+    tenant_id = None
+    try:
+        if verify_jwt_in_request(optional=True):
+            # The clinic a token was issued for wins over any header
+            tenant_id = get_jwt().get('tenant')
+    except Exception:
+        pass  # Invalid or expired token: the route itself rejects it
+    tenant_id = tenant_id or request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+
+    registry = get_registry()
+    try:
+        tenant = registry.get(tenant_id)
+    except PyMongoError as e:
+        print(f"Tenant Lookup Error: {e}")
+        return jsonify({"msg": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+    if tenant is None:
+        return jsonify({"msg": "Unknown clinic"}), 404
+    if tenant.get('status', 'active') != 'active':
+        return jsonify({"msg": "Clinic is suspended"}), 403
+
+    g.tenant = tenant_id
+    g.tenant_entry = tenant
+    rejected = registry.admit(tenant)
+    if rejected:
+        status, retry_after = rejected
+        msg = "Too many requests" if status == 429 else "Server busy, please retry"
+        return jsonify({"msg": msg}), status, {"Retry-After": str(retry_after)}
+    return None
+
+
+# --- Provisioning ---
+
+def provision_tenant(tenant_id, name=None, max_pool_size=None, quotas=None, primary_shard=None):
+    """
+    Register a clinic (or update its settings), create its indexes and, on a
+    sharded cluster, shard its collections. Returns the registry entry.
+    """
+    from backend.db import connect, ensure_indexes, shard_tenant, tenant_db_name
+
+    database = tenant_db_name(tenant_id)  # Validates the id
+    fields = {"database": database, "updated_at": datetime.datetime.utcnow()}
+    if name:
+        fields['name'] = name
+    if max_pool_size:
+        fields['max_pool_size'] = max_pool_size
+    for key, value in (quotas or {}).items():
+        if value is not None:
+            fields[f"quotas.{key}"] = value
+    registry = connect().tenants
+    registry.update_one(
+        {"_id": tenant_id},
+        {"$set": fields, "$setOnInsert": {
+            "status": "active", "created_at": datetime.datetime.utcnow(), **({} if name else {"name": tenant_id})
+        }},
+        upsert=True
+    )
+    ensure_indexes(connect(tenant_id))
+    if shard_tenant(tenant_id, primary_shard):
+        registry.update_one({"_id": tenant_id}, {"$set": {"sharded": True, "primary_shard": primary_shard}})
+    return registry.find_one({"_id": tenant_id})
+
+
+def set_status(tenant_id, status):
+    from backend.db import connect
+    return connect().tenants.update_one({"_id": tenant_id}, {"$set": {"status": status}}).matched_count == 1
+
+
+def tenant_metrics(registry):
+    report = registry.report()
+    metrics = {}
+    for key, help_text in (('admitted', "Requests admitted under the clinic's quota"),
+                           ('throttled', "Requests rejected with 429 by the clinic's rate quota"),
+                           ('shed', "Requests shed with 503 while the clinic's pool was saturated")):
+        metrics[f'tenant_{key}_total'] = (help_text, COUNTER, {"label": "tenant", "values": report[key]})
+    metrics['tenant_pool_waiting'] = (
+        "Operations waiting for a connection of the clinic's pool", GAUGE,
+        {"label": "tenant", "values": report['pool_waiting']})
+    metrics['tenant_pool_checked_out'] = (
+        "Connections of the clinic's pool in use", GAUGE, {"label": "tenant", "values": report['pool_checked_out']})
+    return metrics
+
+
+def init_tenants(app):
+    """Resolve every API request to a clinic when TENANT_MODE is on; the registry lives in app.extensions"""
+    if not app.config.get('TENANT_MODE'):
+        return None
+
+    from backend.db import connect, ensure_indexes
+
+    if app.config.get('RATE_LIMIT_BACKEND') == 'mongo':
+        backend = MongoBackend(lambda: connect().rate_limits)
+    else:
+        backend = LocalBackend()
+    registry = TenantRegistry(connect, backend, quotas=app.config.get('TENANT_QUOTAS'))
+    try:
+        for tenant in connect().tenants.find({}, {"_id": 1}):
+            ensure_indexes(connect(tenant['_id']))
+    except PyMongoError as e:
+        print(f"Tenant Setup Error: {e}")
+
+    app.before_request(_resolve_tenant)
+    app.extensions['tenants'] = registry
+    register_collector(app, lambda: tenant_metrics(registry))
+    return registry
+
+
+def main(argv=None):
+    from backend.db import connect
+
+    parser = argparse.ArgumentParser(description="Manage the clinics sharing this deployment")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="Register a clinic or update its settings")
+    add.add_argument('tenant_id')
+    add.add_argument('--name')
+    add.add_argument('--pool-size', type=int, help="Connections in the clinic's pool")
+    add.add_argument('--rate', type=float, help="Sustained requests per second")
+    add.add_argument('--burst', type=int, help="Requests allowed in a burst")
+    add.add_argument('--max-users', type=int)
+    add.add_argument('--primary-shard', help="Shard holding the clinic's unsharded collections")
+    commands.add_parser('list', help="Show registered clinics")
+    for command in ('suspend', 'activate'):
+        commands.add_parser(command).add_argument('tenant_id')
+    args = parser.parse_args(argv)
+
+    if args.command == 'add':
+        tenant = provision_tenant(
+            args.tenant_id, args.name, args.pool_size,
+            {"rate": args.rate, "burst": args.burst, "max_users": args.max_users},
+            args.primary_shard
+        )
+        print(f"{tenant['_id']}: database {tenant['database']}"
+              f"{', sharded' if tenant.get('sharded') else ''}")
+    elif args.command == 'list':
+        for tenant in connect().tenants.find().sort("_id", 1):
+            print(f"{tenant['_id']:<32}{tenant.get('status', 'active'):<11}{tenant.get('database', '')}")
+    else:
+        if not set_status(args.tenant_id, 'suspended' if args.command == 'suspend' else 'active'):
+            parser.exit(1, f"Unknown clinic: {args.tenant_id}\n")
+
+
+if __name__ == '__main__':
+    main()
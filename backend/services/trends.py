@@ -0,0 +1,185 @@
+import datetime
+import math
+
+from backend.db import update_versioned
+
+# Number of most recent readings each rolling statistic covers
+WINDOW_SIZE = 20
+# Smoothing factor for the exponentially weighted moving average
+EWMA_ALPHA = 0.3
+
+# Normal ranges used for time-in-range
+NORMAL_RANGES = {
+    'heart_rate': (60, 100),
+    'bp_systolic': (90, 129),
+    'bp_diastolic': (60, 80),
+    'blood_sugar': (70, 140)
+}
+
+# Change across the window (in the vital's unit) before a trend counts as rising/falling
+TREND_TOLERANCE = {
+    'heart_rate': 8,
+    'bp_systolic': 8,
+    'bp_diastolic': 5,
+    'blood_sugar': 15
+}
+
+VITALS = tuple(NORMAL_RANGES)
+
+
+def _new_series():
+    return {
+        "values": [],
+        "count": 0,
+        "sum": 0.0,
+        "sum_sq": 0.0,
+        "sum_xy": 0.0,
+        "in_range": 0,
+        "ewma": None
+    }
+
+
+def _in_range(vital, value):
+    low, high = NORMAL_RANGES[vital]
+    return 1 if low <= value <= high else 0
+
+
+def _recompute_sums(series):
+    # Rebuild running sums from the window to stop float drift accumulating
+    values = series['values']
+    first_x = series['count'] - len(values)
+    series['sum'] = float(sum(values))
+    series['sum_sq'] = float(sum(v * v for v in values))
+    series['sum_xy'] = float(sum((first_x + i) * v for i, v in enumerate(values)))
+
+
+def update_series(series, vital, value, window_size=WINDOW_SIZE):
+    """
+    Push one reading into a rolling series. Work is constant per reading:
+    the running sums are adjusted for the value entering and the one leaving.
+    """
+    x = series['count']
+    value = float(value)
+
+    series['values'].append(value)
+    series['sum'] += value
+    series['sum_sq'] += value * value
+    series['sum_xy'] += x * value
+    series['in_range'] += _in_range(vital, value)
+
+    if len(series['values']) > window_size:
+        old = series['values'].pop(0)
+        old_x = x - window_size
+        series['sum'] -= old
+        series['sum_sq'] -= old * old
+        series['sum_xy'] -= old_x * old
+        series['in_range'] -= _in_range(vital, old)
+
+    series['count'] = x + 1
+    if series['ewma'] is None:
+        series['ewma'] = value
+    else:
+        series['ewma'] = EWMA_ALPHA * value + (1 - EWMA_ALPHA) * series['ewma']
+
+    if series['count'] % window_size == 0:
+        _recompute_sums(series)
+
+    return series
+
+
+def series_stats(series, vital):
+    """Summary statistics for a rolling series"""
+    n = len(series['values'])
+    if n == 0:
+        return None
+
+    mean = series['sum'] / n
+    variance = max(0.0, series['sum_sq'] / n - mean * mean)
+
+    slope = 0.0
+    if n > 1:
+        # x runs over consecutive reading indices, so its spread has a closed form
+        mean_x = series['count'] - (n + 1) / 2
+        sxx = n * (n * n - 1) / 12
+        slope = (series['sum_xy'] - n * mean_x * mean) / sxx
+
+    change = slope * (n - 1)
+    tolerance = TREND_TOLERANCE[vital]
+    if n < 3 or abs(change) < tolerance:
+        direction = 'stable'
+    else:
+        direction = 'rising' if change > 0 else 'falling'
+
+    return {
+        "n": n,
+        "ewma": round(series['ewma'], 1),
+        "mean": round(mean, 1),
+        "std": round(math.sqrt(variance), 2),
+        "slope": round(slope, 3),
+        "change": round(change, 1),
+        "direction": direction,
+        "time_in_range": round(series['in_range'] / n, 3)
+    }
+
+
+def apply_reading(state, reading, window_size=WINDOW_SIZE):
+    """Fold a health log entry into a user's trend state (mutates and returns it)"""
+    series_map = state.setdefault('series', {})
+    stats = state.setdefault('stats', {})
+    for vital in VITALS:
+        value = reading.get(vital)
+        if value is None:
+            continue
+        series = series_map.setdefault(vital, _new_series())
+        update_series(series, vital, value, window_size)
+        stats[vital] = series_stats(series, vital)
+    return state
+
+
+def update_trend_state(db, user_id, reading, skip_seen=False):
+    """
+    Update the per-user trend document after a health log insert.
+    With skip_seen a reading no newer than the last one applied is ignored,
+    so replaying a change stream does not count readings twice.
+    """
+    timestamp = reading.get('timestamp')
+
+    def apply(state):
+        state = state or {"user_id": user_id}
+        last = state.get('last_reading_at')
+        if skip_seen and last and timestamp and timestamp <= last:
+            return None
+        apply_reading(state, reading)
+        if timestamp:
+            state['last_reading_at'] = timestamp
+        state['updated_at'] = datetime.datetime.utcnow()
+        return state
+
+    # Versioned, so concurrent readings of one user don't lose each other's updates
+    state = update_versioned(db.vitals_trends, {"user_id": user_id}, apply)
+    return (state or {}).get('stats', {})
+
+
+def get_trends(db, user_id):
+    """Read the precomputed trend statistics without the raw windows"""
+    doc = db.vitals_trends.find_one({"user_id": user_id}, {"stats": 1})
+    return doc.get('stats', {}) if doc else {}
+
+
+def rebuild_trend_state(db, user_id, window_size=WINDOW_SIZE):
+    """Recompute a user's trend document from their most recent logs (after a backfill)"""
+    recent = list(db.health_logs.find(
+        {"user_id": user_id}, {"_id": 0, "timestamp": 1, **{vital: 1 for vital in VITALS}}
+    ).sort("timestamp", -1).limit(window_size))
+
+    state = {"user_id": user_id}
+    for reading in reversed(recent):
+        apply_reading(state, reading, window_size)
+    if recent and recent[0].get('timestamp'):
+        # So the materializer's skip_seen recognises readings it replays after the rebuild
+        state['last_reading_at'] = recent[0]['timestamp']
+    state['updated_at'] = datetime.datetime.utcnow()
+
+    # Bumps the version, so an update that read the old state retries on top of this one
+    update_versioned(db.vitals_trends, {"user_id": user_id}, lambda current: dict(state))
+    return state.get('stats', {})
@@ -0,0 +1,41 @@
+# Accepted range and user-facing label for each vital
+VITAL_RULES = (
+    ('heart_rate', "Heart rate", 30, 220, "BPM"),
+    ('bp_systolic', "Systolic BP", 70, 250, "mmHg"),
+    ('bp_diastolic', "Diastolic BP", 40, 150, "mmHg"),
+    ('blood_sugar', "Blood sugar", 50, 500, "mg/dL")
+)
+
+class ValidationError(ValueError):
+    """Input rejected with a message that can be shown to the user"""
+
+def clean_input(val):
+    if val is None: return None
+    if isinstance(val, str):
+        val = val.strip()
+        if val == '' or val.lower() == 'null': return None
+        # Allow generic casting
+        try:
+            return int(val)
+        except ValueError:
+            return 'invalid'
+    return int(val)
+
+def validate_vitals(data):
+    """
+    Clean and range-check the vitals in a mapping.
+    Returns {vital: int or None}. Raises ValidationError for bad values, and
+    lets ValueError/TypeError through for input that can't be cast at all.
+    """
+    values = {field: clean_input(data.get(field)) for field, *_ in VITAL_RULES}
+
+    for field, label, *_ in VITAL_RULES:
+        if values[field] == 'invalid':
+            raise ValidationError(f"{label} must be a number")
+
+    for field, label, low, high, unit in VITAL_RULES:
+        value = values[field]
+        if value is not None and (value < low or value > high):
+            raise ValidationError(f"{label} must be between {low}-{high} {unit}")
+
+    return values
@@ -0,0 +1,405 @@
+import datetime
+import glob
+import os
+import queue
+import threading
+import time
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from backend.services.metrics import COUNTER, GAUGE, register_collector
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, assume a single process
+    fcntl = None
+
+# fsync policies for the write-ahead log
+FSYNC_ALWAYS = 'always'      # every accepted reading is on disk before it is acknowledged
+FSYNC_INTERVAL = 'interval'  # the flusher syncs once per flush interval (group commit)
+FSYNC_NEVER = 'never'        # leave it to the OS page cache
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue in front of one collection.
+
+    submit() appends the document to a local write-ahead log and queues it;
+    a flusher thread drains the queue with batched insert_many. A document
+    that has been submitted survives a process crash: on start() any WAL
+    segments left behind by a dead process are replayed (by the flusher, if
+    Mongo is down at that point). Every document gets
+    its _id before it is logged, so replaying an already-flushed document is
+    a harmless duplicate-key error.
+
+    WAL entries are grouped in segments; a segment file is deleted once it is
+    no longer being written and all of its documents have been flushed.
+
+    A document the server rejects for good (e.g. a second reading with the
+    same user and timestamp) is moved to the <collection>_dead_letter
+    collection with its error, so it can't hold up the rest of the queue.
+    """
+
+    def __init__(self, get_collection, wal_dir, max_queue=10000, flush_interval=0.5,
+                 flush_size=500, fsync=FSYNC_INTERVAL, segment_size=10000, prepare=None):
+        self.get_collection = get_collection
+        # Called with each batch right before every insert attempt (e.g. sync stamps)
+        self.prepare = prepare
+        self.wal_dir = wal_dir
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.fsync = fsync
+        self.segment_size = segment_size
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._segment_no = 0
+        self._segment_file = None
+        self._segment_entries = 0
+        self._outstanding = {}  # segment number -> documents not yet flushed
+        self._abandoned = []  # segments of dead processes still to be replayed
+
+        self.stats = {"accepted": 0, "rejected": 0, "flushed": 0, "flushes": 0,
+                      "flush_errors": 0, "replayed": 0, "dead_lettered": 0}
+
+    # --- WAL ---
+
+    def _segment_path(self, number):
+        return os.path.join(self.wal_dir, f"health_logs.{os.getpid()}.{number:08d}.wal")
+
+    def _open_segment(self):
+        self._segment_no += 1
+        # An unreplayed segment of a dead process with our pid must not be appended to
+        while os.path.exists(self._segment_path(self._segment_no)):
+            self._segment_no += 1
+        path = self._segment_path(self._segment_no)
+        self._segment_file = open(path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            # Held for the life of the segment so other processes never replay it
+            fcntl.flock(self._segment_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._segment_entries = 0
+        self._outstanding[self._segment_no] = 0
+
+    def _close_segment(self):
+        if self.fsync == FSYNC_INTERVAL:
+            # The flusher's group commit won't see this file again
+            self._segment_file.flush()
+            os.fsync(self._segment_file.fileno())
+        self._segment_file.close()
+
+    def _rotate_if_full(self):
+        if self._segment_entries >= self.segment_size:
+            self._close_segment()
+            finished = self._segment_no
+            self._open_segment()
+            self._drop_flushed_segments(finished)
+
+    def _drop_flushed_segments(self, *candidates):
+        for number in candidates or list(self._outstanding):
+            if number != self._segment_no and self._outstanding.get(number) == 0:
+                del self._outstanding[number]
+                try:
+                    os.remove(self._segment_path(number))
+                except FileNotFoundError:
+                    pass
+
+    def _wal_segments(self):
+        return sorted(glob.glob(os.path.join(self.wal_dir, 'health_logs.*.wal')))
+
+    def replay(self, paths=None):
+        """Insert documents from WAL segments abandoned by crashed processes"""
+        replayed = 0
+        for path in self._wal_segments() if paths is None else sorted(paths):
+            try:
+                fh = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # replayed by an earlier attempt or another process
+            with fh:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # still owned by a live process
+                docs = []
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        docs.append(json_util.loads(line))
+                    except ValueError:
+                        # A torn final line from the crash was never acknowledged
+                        print(f"WAL Replay: skipping corrupt entry in {path}")
+                for i in range(0, len(docs), self.flush_size):
+                    self._insert(docs[i:i + self.flush_size])
+                replayed += len(docs)
+            os.remove(path)
+        self.stats['replayed'] += replayed
+        return replayed
+
+    def _replay_abandoned(self):
+        """
+        Replay the segments found at start. When Mongo is unavailable they
+        are kept and the flusher retries, so startup never fails on it.
+        """
+        try:
+            replayed = self.replay(self._abandoned)
+        except PyMongoError as e:
+            print(f"Write-behind Replay Error: {e}")
+            return False
+        self._abandoned = []
+        if replayed:
+            print(f"Write-behind: replayed {replayed} readings from the WAL")
+        return True
+
+    # --- Lifecycle ---
+
+    def start(self):
+        os.makedirs(self.wal_dir, exist_ok=True)
+        self._abandoned = self._wal_segments()
+        self._replay_abandoned()
+        with self._lock:
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='health-logs-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Flush whatever is queued and stop the flusher"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._lock:
+            if self._segment_file:
+                self._close_segment()
+                self._segment_file = None
+            # Nothing is active any more, so fully flushed segments can all go
+            self._segment_no = None
+            self._drop_flushed_segments()
+
+    # --- Producer side ---
+
+    def submit(self, doc):
+        """
+        Accept a document for asynchronous insertion. Returns its _id once it
+        is in the WAL (and on disk when fsync='always').
+        Raises queue.Full when the buffer is saturated.
+        """
+        doc.setdefault('_id', ObjectId())
+        line = json_util.dumps(doc) + "\n"
+        with self._lock:
+            if self._queue.full():
+                self.stats['rejected'] += 1
+                raise queue.Full
+            self._segment_file.write(line)
+            self._segment_file.flush()
+            if self.fsync == FSYNC_ALWAYS:
+                os.fsync(self._segment_file.fileno())
+            segment = self._segment_no
+            self._segment_entries += 1
+            self._outstanding[segment] += 1
+            self._queue.put_nowait((segment, doc))
+            self.stats['accepted'] += 1
+            self._rotate_if_full()
+        return doc['_id']
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # --- Flusher ---
+
+    @staticmethod
+    def _is_replayed(collection, doc, error):
+        """A duplicate _id: the document was already written before a crash or retry"""
+        if error.get('code') != 11000:
+            return False
+        if 'keyPattern' in error:
+            return error['keyPattern'] == {'_id': 1}
+        return collection.find_one({"_id": doc['_id']}, {"_id": 1}) is not None
+
+    def _insert(self, docs):
+        """
+        Insert a batch. Unordered, so one rejected document doesn't stop the
+        others; rejected documents are dead-lettered instead of retried.
+        """
+        collection = self.get_collection()
+        if self.prepare:
+            self.prepare(docs)
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if e.details.get('writeConcernErrors'):
+                raise  # Written but not acknowledged as durable: retry, the duplicate _ids are ignored
+            failures = [(docs[err['index']], err) for err in e.details.get('writeErrors', [])]
+            rejected = [(doc, err) for doc, err in failures if not self._is_replayed(collection, doc, err)]
+            if rejected:
+                self._dead_letter(collection, rejected)
+
+    def _dead_letter(self, collection, failures):
+        dead_letter = collection.database[f"{collection.name}_dead_letter"]
+        now = datetime.datetime.utcnow()
+        for doc, error in failures:
+            print(f"Write-behind: dead-lettering {doc['_id']}: {error.get('errmsg')}")
+            # Keyed on the document's _id, so a replay doesn't file it twice
+            dead_letter.replace_one({"_id": doc['_id']}, {
+                "_id": doc['_id'], "doc": doc, "code": error.get('code'),
+                "error": error.get('errmsg'), "failed_at": now
+            }, upsert=True)
+        self.stats['dead_lettered'] += len(failures)
+
+    def _drain(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        backoff = self.flush_interval
+        batch = []
+        while True:
+            if self._abandoned and not self._stop.is_set():
+                self._replay_abandoned()
+
+            if not batch:
+                if self._stop.is_set() and self._queue.empty():
+                    break
+                batch = self._drain()
+
+            if self.fsync == FSYNC_INTERVAL:
+                with self._lock:
+                    if self._segment_file:
+                        os.fsync(self._segment_file.fileno())
+
+            if not batch:
+                continue
+
+            try:
+                self._insert([doc for _segment, doc in batch])
+            except PyMongoError as e:
+                # Keep the batch and retry; the bounded queue pushes back on producers meanwhile
+                self.stats['flush_errors'] += 1
+                print(f"Write-behind Flush Error: {e}")
+                if self._stop.is_set() and backoff >= 30:
+                    break  # give up on shutdown, the WAL still has the documents
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            backoff = self.flush_interval
+            with self._lock:
+                for segment, _doc in batch:
+                    self._outstanding[segment] -= 1
+                self._drop_flushed_segments(*{segment for segment, _doc in batch})
+            self.stats['flushed'] += len(batch)
+            self.stats['flushes'] += 1
+            batch = []
+
+
+class TenantWriteBehind:
+    """
+    One WriteBehindBuffer per clinic, so each reading is flushed into its
+    clinic's database. The default clinic logs to wal_dir itself, the others
+    to wal_dir/tenants/<id>. Has the interface of a single buffer.
+    """
+
+    def __init__(self, make_buffer, wal_dir):
+        self.make_buffer = make_buffer  # (tenant_id, wal_dir) -> WriteBehindBuffer
+        self.wal_dir = wal_dir
+        self._lock = threading.Lock()
+        self._buffers = {}
+
+    def _wal_dir(self, tenant_id):
+        from backend.db import DEFAULT_TENANT
+        if tenant_id == DEFAULT_TENANT:
+            return self.wal_dir
+        return os.path.join(self.wal_dir, 'tenants', tenant_id)
+
+    def buffer(self, tenant_id):
+        with self._lock:
+            buffer = self._buffers.get(tenant_id)
+            if buffer is None:
+                buffer = self._buffers[tenant_id] = self.make_buffer(tenant_id, self._wal_dir(tenant_id))
+                buffer.start()
+        return buffer
+
+    def start(self):
+        from backend.db import DEFAULT_TENANT
+        self.buffer(DEFAULT_TENANT)
+        # Replay what crashed processes left behind for any other clinic
+        tenants_dir = os.path.join(self.wal_dir, 'tenants')
+        for tenant_id in sorted(os.listdir(tenants_dir)) if os.path.isdir(tenants_dir) else ():
+            if glob.glob(os.path.join(tenants_dir, tenant_id, 'health_logs.*.wal')):
+                self.buffer(tenant_id)
+
+    def stop(self, timeout=10):
+        with self._lock:
+            buffers = list(self._buffers.values())
+        for buffer in buffers:
+            buffer.stop(timeout)
+
+    def submit(self, doc):
+        from backend.db import current_tenant
+        return self.buffer(current_tenant()).submit(doc)
+
+    def pending(self):
+        with self._lock:
+            return sum(buffer.pending() for buffer in self._buffers.values())
+
+    @property
+    def stats(self):
+        totals = {}
+        with self._lock:
+            for buffer in self._buffers.values():
+                for key, value in buffer.stats.items():
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+def buffer_metrics(buffer):
+    metrics = {f'write_behind_{key}_total': (f"Write-behind buffer: {key}", COUNTER, value)
+               for key, value in buffer.stats.items()}
+    metrics['write_behind_pending'] = ("Readings queued but not yet flushed", GAUGE, buffer.pending())
+    return metrics
+
+
+def init_write_behind(app):
+    """Start the buffer when HEALTH_WRITE_BEHIND is enabled; it lives in app.extensions"""
+    if not app.config.get('HEALTH_WRITE_BEHIND'):
+        return None
+
+    import atexit
+    from backend.db import connect
+    from backend.services.sync import stamp_batch
+
+    def make_buffer(tenant_id, wal_dir):
+        return WriteBehindBuffer(
+            lambda: connect(tenant_id).health_logs,
+            wal_dir,
+            # Stamped when the reading lands, not when it was accepted, so a
+            # flush delayed by an outage can't fall behind clients' sync tokens
+            prepare=lambda docs: stamp_batch(connect(tenant_id), docs),
+            max_queue=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+            flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+            flush_size=app.config['WRITE_BEHIND_FLUSH_SIZE'],
+            fsync=app.config['WRITE_BEHIND_FSYNC']
+        )
+
+    if app.config.get('TENANT_MODE'):
+        buffer = TenantWriteBehind(make_buffer, app.config['WRITE_BEHIND_WAL_DIR'])
+    else:
+        buffer = make_buffer(None, app.config['WRITE_BEHIND_WAL_DIR'])
+    buffer.start()
+    atexit.register(buffer.stop)
+    app.extensions['write_behind'] = buffer
+    register_collector(app, lambda: buffer_metrics(buffer))
+    return buffer
@@ -0,0 +1,36 @@
+// Sidebar & Auth Logic
+document.addEventListener('DOMContentLoaded', () => {
+    const token = localStorage.getItem('token');
+    const sidebar = document.getElementById('sidebar');
+    const topNav = document.getElementById('top-nav');
+    const mainContent = document.getElementById('main-content');
+
+    if (token) {
+        if (sidebar) sidebar.classList.remove('hidden');
+        if (topNav) topNav.classList.add('hidden');
+        mainContent.classList.add('main-content-with-sidebar');
+    } else {
+        if (sidebar) sidebar.classList.add('hidden');
+        if (topNav) topNav.classList.remove('hidden');
+        mainContent.classList.remove('main-content-with-sidebar');
+        mainContent.classList.add('pt-20'); // Add padding for fixed top nav
+    }
+
+    // Highlight active link
+    const currentPath = window.location.pathname;
+    const sidebarLinks = document.querySelectorAll('.sidebar-item');
+    sidebarLinks.forEach(link => {
+        if (link.getAttribute('href') === currentPath) {
+            link.classList.add('active');
+            link.style.background = 'rgba(99, 102, 241, 0.15)';
+            link.querySelector('i').style.color = '#818cf8';
+        }
+    });
+});
+
+// Theme Init
+if (localStorage.getItem('theme') === 'dark' || (!('theme' in localStorage) && window.matchMedia('(prefers-color-scheme: dark)').matches)) {
+    document.documentElement.classList.add('dark');
+} else {
+    document.documentElement.classList.remove('dark');
+}
@@ -0,0 +1,74 @@
+const token = localStorage.getItem('token');
+if (!token) window.location.href = '/login';
+
+document.addEventListener('DOMContentLoaded', loadAlerts);
+
+document.getElementById('manual-alert-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const btn = e.target.querySelector('button');
+    btn.disabled = true;
+
+    try {
+        const desc = document.getElementById('m-desc').value;
+        const severity = document.getElementById('m-severity').value;
+
+        const res = await fetch('/api/alerts/manual', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${token}`
+            },
+            body: JSON.stringify({ alert_text: desc, severity })
+        });
+
+        if (res.ok) {
+            document.getElementById('manual-alert-form').reset();
+            loadAlerts(); // Refresh list
+        } else {
+            alert('Failed to create alert');
+        }
+    } catch (err) { console.error(err); }
+    finally { btn.disabled = false; }
+});
+
+async function loadAlerts() {
+    try {
+        const res = await fetch('/api/alerts/', {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        const data = await res.json();
+        const list = document.getElementById('alerts-list');
+        list.innerHTML = '';
+
+        const all = [...(data.unread || []), ...(data.read || [])];
+
+        if (all.length === 0) {
+            list.innerHTML = '<p class="text-slate-500 text-center py-4">No alerts found.</p>';
+            return;
+        }
+
+        all.forEach(a => {
+            const color = a.severity === 'critical' ? 'rose' : (a.severity === 'info' ? 'blue' : 'yellow');
+            const icon = a.severity === 'critical' ? 'triangle-exclamation' : 'info-circle';
+
+            const div = document.createElement('div');
+            div.className = `p-4 rounded-xl bg-${color}-500/10 border border-${color}-500/20 flex items-start gap-4`;
+
+            // Handle potentially different alert structures (string vs object vs list)
+            let msg = "Alert";
+            if (Array.isArray(a.alerts)) msg = a.alerts.join(', ');
+            else if (typeof a.alerts === 'string') msg = a.alerts;
+
+            div.innerHTML = `
+             <div class="mt-1"><i class="fa-solid fa-${icon} text-${color}-500"></i></div>
+             <div>
+                <h4 class="text-white font-semibold capitalize">${a.type || 'System'} Alert</h4>
+                <p class="text-slate-400 text-sm mt-1">${msg}</p>
+                <p class="text-slate-500 text-xs mt-2">${new Date(a.timestamp).toLocaleString()}</p>
+             </div>
+        `;
+            list.appendChild(div);
+        });
+
+    } catch (err) { console.error(err); }
+}
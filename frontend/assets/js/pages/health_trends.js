@@ -0,0 +1,186 @@
+const state = {
+    token: localStorage.getItem('token')
+};
+
+if (!state.token) {
+    window.location.href = '/login';
+}
+
+let hrChart, bpChart, sugarChart, combinedChart;
+
+// Load data on page load
+document.addEventListener('DOMContentLoaded', () => {
+    fetchHealthLogs();
+});
+
+async function fetchHealthLogs() {
+    try {
+        const res = await fetch('/api/health/logs', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+        updateCharts(data);
+        updateStats(data);
+        updateTable(data);
+    } catch (err) {
+        console.error('Failed to fetch health logs:', err);
+    }
+}
+
+function updateStats(data) {
+    if (data.length === 0) return;
+
+    const heartRates = data.filter(d => d.heart_rate).map(d => parseInt(d.heart_rate));
+    const bpSys = data.filter(d => d.bp_systolic).map(d => parseInt(d.bp_systolic));
+    const bpDia = data.filter(d => d.bp_diastolic).map(d => parseInt(d.bp_diastolic));
+    const sugars = data.filter(d => d.blood_sugar).map(d => parseInt(d.blood_sugar));
+
+    if (heartRates.length > 0) {
+        const avg = Math.round(heartRates.reduce((a, b) => a + b, 0) / heartRates.length);
+        document.getElementById('avg-hr').textContent = avg + ' bpm';
+    }
+
+    if (bpSys.length > 0 && bpDia.length > 0) {
+        const avgSys = Math.round(bpSys.reduce((a, b) => a + b, 0) / bpSys.length);
+        const avgDia = Math.round(bpDia.reduce((a, b) => a + b, 0) / bpDia.length);
+        document.getElementById('avg-bp').textContent = `${avgSys}/${avgDia}`;
+    }
+
+    if (sugars.length > 0) {
+        const avg = Math.round(sugars.reduce((a, b) => a + b, 0) / sugars.length);
+        document.getElementById('avg-sugar').textContent = avg + ' mg/dL';
+    }
+
+    document.getElementById('total-records').textContent = data.length;
+}
+
+function updateCharts(data) {
+    const reversedData = [...data].reverse();
+    const labels = reversedData.map(d => {
+        const date = new Date(d.timestamp);
+        return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
+    });
+
+    // Heart Rate Chart
+    const ctxHr = document.getElementById('chart-hr');
+    if (ctxHr) {
+        if (hrChart) hrChart.destroy();
+        hrChart = new Chart(ctxHr, {
+            type: 'line',
+            data: {
+                labels: labels,
+                datasets: [{
+                    label: 'Heart Rate (bpm)',
+                    data: reversedData.map(d => d.heart_rate),
+                    borderColor: '#ef4444',
+                    backgroundColor: 'rgba(239, 68, 68, 0.1)',
+                    tension: 0.4,
+                    fill: true
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: { labels: { color: 'white' } }
+                },
+                scales: {
+                    x: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } },
+                    y: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } }
+                }
+            }
+        });
+    }
+
+    // Blood Pressure Chart
+    const ctxBp = document.getElementById('chart-bp');
+    if (ctxBp) {
+        if (bpChart) bpChart.destroy();
+        bpChart = new Chart(ctxBp, {
+            type: 'line',
+            data: {
+                labels: labels,
+                datasets: [
+                    {
+                        label: 'Systolic',
+                        data: reversedData.map(d => d.bp_systolic),
+                        borderColor: '#3b82f6',
+                        backgroundColor: 'rgba(59, 130, 246, 0.1)',
+                        tension: 0.4,
+                        fill: true
+                    },
+                    {
+                        label: 'Diastolic',
+                        data: reversedData.map(d => d.bp_diastolic),
+                        borderColor: '#60a5fa',
+                        backgroundColor: 'rgba(96, 165, 250, 0.1)',
+                        tension: 0.4,
+                        fill: true
+                    }
+                ]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: { labels: { color: 'white' } }
+                },
+                scales: {
+                    x: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } },
+                    y: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } }
+                }
+            }
+        });
+    }
+
+    // Blood Sugar Chart
+    const ctxSugar = document.getElementById('chart-sugar');
+    if (ctxSugar) {
+        if (sugarChart) sugarChart.destroy();
+        sugarChart = new Chart(ctxSugar, {
+            type: 'line',
+            data: {
+                labels: labels,
+                datasets: [{
+                    label: 'Blood Sugar (mg/dL)',
+                    data: reversedData.map(d => d.blood_sugar),
+                    borderColor: '#10b981',
+                    backgroundColor: 'rgba(16, 185, 129, 0.1)',
+                    tension: 0.4,
+                    fill: true
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: { labels: { color: 'white' } }
+                },
+                scales: {
+                    x: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } },
+                    y: { ticks: { color: 'gray' }, grid: { color: 'rgba(255,255,255,0.1)' } }
+                }
+            }
+        });
+    }
+}
+
+function updateTable(data) {
+    const tbody = document.getElementById('logs-table-body');
+    tbody.innerHTML = '';
+
+    if (data.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="4" class="text-center p-8 text-gray-400">No health logs available</td></tr>';
+        return;
+    }
+
+    data.slice(0, 10).forEach(log => {
+        const tr = document.createElement('tr');
+        tr.className = 'border-b border-gray-700 hover:bg-gray-800/50 transition';
+        const date = new Date(log.timestamp);
+        tr.innerHTML = `
+            <td class="p-3 text-gray-300">${date.toLocaleDateString()}</td>
+            <td class="p-3 text-gray-300">${log.heart_rate || '--'} bpm</td>
+            <td class="p-3 text-gray-300">${log.bp_systolic || '--'}/${log.bp_diastolic || '--'}</td>
+            <td class="p-3 text-gray-300">${log.blood_sugar || '--'} mg/dL</td>
+        `;
+        tbody.appendChild(tr);
+    });
+}
@@ -0,0 +1,109 @@
+// Digital Clock Logic
+function updateClock() {
+    const now = new Date();
+
+    // Time 12hr format with seconds
+    let hours = now.getHours();
+    const ampm = hours >= 12 ? 'PM' : 'AM';
+    // hours = hours % 12;
+    // hours = hours ? hours : 12; // the hour '0' should be '12'
+    // Keeping 24hr format as per commonly used digital clock style in prompts, or 12? 
+    // Let's do 12hr as it's friendlier.
+
+    const timeString = now.toLocaleTimeString('en-US', { hour12: true, hour: '2-digit', minute: '2-digit', second: '2-digit' });
+
+    // Date
+    const options = { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' };
+    const dateString = now.toLocaleDateString('en-US', options);
+
+    const clockEl = document.getElementById('digital-clock');
+    const dateEl = document.getElementById('current-date');
+
+    if (clockEl) clockEl.innerText = timeString;
+    if (dateEl) dateEl.innerText = dateString;
+}
+
+setInterval(updateClock, 1000);
+updateClock(); // Initial call
+
+// Auth Check
+document.addEventListener('DOMContentLoaded', () => {
+    const token = localStorage.getItem('token');
+    const dashboard = document.getElementById('dashboard-content');
+    const landing = document.getElementById('landing-content');
+
+    if (token) {
+        dashboard.classList.remove('hidden');
+        // Fade in
+        setTimeout(() => dashboard.classList.remove('opacity-0'), 100);
+        landing.classList.add('hidden');
+
+        // Load User Data
+        loadDashboardData(token);
+    } else {
+        landing.classList.remove('hidden');
+        dashboard.classList.add('hidden');
+    }
+});
+
+async function loadDashboardData(token) {
+    try {
+        // Get specific profile/health endpoints if needed, 
+        // but for now relying on risk/latest endpoints
+
+        // Fetch Latest Vitals
+        const resVitals = await fetch('/api/health/latest', {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        const vitals = await resVitals.json();
+
+        if (vitals) {
+            if (vitals.heart_rate) document.getElementById('display-hr').innerText = vitals.heart_rate;
+            if (vitals.bp_systolic) document.getElementById('display-bp').innerText = `${vitals.bp_systolic}/${vitals.bp_diastolic}`;
+        }
+
+        // Fetch Risk Score (simplified fetch)
+        const resRisk = await fetch('/api/health/risk', {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        const riskData = await resRisk.json();
+
+        if (riskData && riskData.score !== undefined) {
+            const scoreEl = document.getElementById('risk-score-display');
+            const labelEl = document.getElementById('risk-label');
+            scoreEl.innerText = riskData.score;
+
+            // Color coding
+            if (riskData.score > 60) {
+                scoreEl.classList.add('text-rose-500');
+                scoreEl.classList.remove('text-white');
+                labelEl.innerText = 'High Risk';
+                labelEl.className = 'ml-2 text-sm text-rose-500 font-medium';
+            } else if (riskData.score > 30) {
+                scoreEl.classList.add('text-yellow-500');
+                scoreEl.classList.remove('text-white');
+                labelEl.innerText = 'Moderate Risk';
+                labelEl.className = 'ml-2 text-sm text-yellow-500 font-medium';
+            } else {
+                scoreEl.classList.add('text-emerald-500');
+                scoreEl.classList.remove('text-white');
+                labelEl.innerText = 'Low Risk';
+                labelEl.className = 'ml-2 text-sm text-emerald-500 font-medium';
+            }
+        }
+
+        // Get Username (Profile)
+        const resProfile = await fetch('/api/profile', {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (resProfile.ok) {
+            const profile = await resProfile.json();
+            if (profile.name) {
+                document.getElementById('user-display-name').innerText = profile.name;
+            }
+        }
+
+    } catch (err) {
+        console.error(err);
+    }
+}
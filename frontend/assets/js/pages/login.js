@@ -0,0 +1,41 @@
+// Clinic to sign in to, from /login?clinic=<id>; remembered for later visits
+const clinic = new URLSearchParams(window.location.search).get('clinic') || localStorage.getItem('clinic');
+
+document.getElementById('login-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const email = document.getElementById('email').value;
+    const password = document.getElementById('password').value;
+    const btn = e.target.querySelector('button');
+    const originalText = btn.innerHTML;
+
+    // Loading state
+    btn.disabled = true;
+    btn.innerHTML = '<i class="fa-solid fa-circle-notch fa-spin mr-2"></i>Signing In...';
+
+    try {
+        const res = await fetch('/api/auth/login', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', ...(clinic ? { 'X-Tenant': clinic } : {}) },
+            body: JSON.stringify({ email, password })
+        });
+
+        const data = await res.json();
+
+        if (res.ok) {
+            localStorage.setItem('token', data.access_token);
+            if (clinic) localStorage.setItem('clinic', clinic);
+            // Redirect
+            window.location.href = '/';
+        } else {
+            alert('Login Failed: ' + (data.msg || 'Invalid credentials'));
+            btn.disabled = false;
+            btn.innerHTML = originalText;
+        }
+    } catch (err) {
+        console.error(err);
+        alert('Network error occurred');
+        btn.disabled = false;
+        btn.innerHTML = originalText;
+    }
+});
@@ -0,0 +1,165 @@
+const state = {
+    token: localStorage.getItem('token')
+};
+
+if (!state.token) {
+    window.location.href = '/login';
+}
+
+// Load medications on page load
+document.addEventListener('DOMContentLoaded', () => {
+    fetchMedications();
+});
+
+// Form submission
+document.getElementById('medication-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const data = {
+        name: document.getElementById('m-name').value,
+        dosage: document.getElementById('m-dosage').value,
+        frequency: document.getElementById('m-frequency').value,
+        time: document.getElementById('m-time').value
+    };
+
+    const submitBtn = e.target.querySelector('button[type="submit"]');
+    const originalBtnText = submitBtn.innerHTML;
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<i class="fa-solid fa-spinner fa-spin mr-2"></i>Adding...';
+
+    try {
+        const res = await fetch('/api/medication', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${state.token}`
+            },
+            body: JSON.stringify(data)
+        });
+
+        if (res.ok) {
+            const successMsg = document.getElementById('save-success');
+            successMsg.classList.remove('hidden');
+            setTimeout(() => successMsg.classList.add('hidden'), 3000);
+
+            e.target.reset();
+            fetchMedications();
+        } else {
+            const result = await res.json();
+            alert('Error: ' + result.msg);
+        }
+    } catch (err) {
+        console.error(err);
+        alert('Failed to add medication');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = originalBtnText;
+    }
+});
+
+async function fetchMedications() {
+    try {
+        const res = await fetch('/api/medication', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+        renderMedications(data);
+    } catch (err) {
+        console.error('Failed to fetch medications:', err);
+    }
+}
+
+function renderMedications(meds) {
+    const list = document.getElementById('medication-list');
+    list.innerHTML = '';
+
+    if (meds.length === 0) {
+        list.innerHTML = `
+            <div class="text-center py-12">
+                <i class="fa-solid fa-pills text-6xl text-gray-500 mb-4"></i>
+                <p class="text-gray-400 text-lg">No medications scheduled</p>
+                <p class="text-gray-500 text-sm mt-2">Add your first medication to get started</p>
+            </div>
+        `;
+        return;
+    }
+
+    meds.forEach(med => {
+        const el = document.createElement('div');
+        el.className = 'bg-gradient-to-r from-gray-800/50 to-gray-700/50 p-5 rounded-lg border-l-4 border-primary hover:shadow-lg transition';
+        el.innerHTML = `
+            <div class="flex justify-between items-start">
+                <div class="flex-1">
+                    <div class="flex items-center mb-2">
+                        <i class="fa-solid fa-capsules text-primary text-xl mr-3"></i>
+                        <h4 class="font-bold text-white text-lg">${med.name}</h4>
+                    </div>
+                    <div class="ml-8 space-y-1">
+                        <p class="text-gray-300"><i class="fa-solid fa-weight-hanging mr-2 text-gray-400"></i>${med.dosage}</p>
+                        <p class="text-gray-300"><i class="fa-solid fa-clock mr-2 text-gray-400"></i>${med.time} • ${med.frequency}</p>
+                        <p class="text-gray-400 text-sm"><i class="fa-solid fa-chart-line mr-2"></i>${formatAdherence(med.adherence)}</p>
+                    </div>
+                    <div class="ml-8 mt-3 flex gap-2">
+                        <button onclick="logDose('${med._id}', 'taken')" class="px-3 py-1 text-sm rounded-lg bg-green-500/20 text-green-300 hover:bg-green-500/40 transition">
+                            <i class="fa-solid fa-check mr-1"></i>Taken
+                        </button>
+                        <button onclick="logDose('${med._id}', 'late')" class="px-3 py-1 text-sm rounded-lg bg-yellow-500/20 text-yellow-300 hover:bg-yellow-500/40 transition">
+                            <i class="fa-solid fa-hourglass-half mr-1"></i>Late
+                        </button>
+                        <button onclick="logDose('${med._id}', 'skipped')" class="px-3 py-1 text-sm rounded-lg bg-red-500/20 text-red-300 hover:bg-red-500/40 transition">
+                            <i class="fa-solid fa-xmark mr-1"></i>Skipped
+                        </button>
+                    </div>
+                </div>
+                <button onclick="deleteMed('${med._id}')" 
+                    class="ml-4 p-2 text-gray-400 hover:text-red-400 hover:bg-red-500/20 rounded-lg transition">
+                    <i class="fa-solid fa-trash"></i>
+                </button>
+            </div>
+        `;
+        list.appendChild(el);
+    });
+}
+
+function formatAdherence(adherence) {
+    if (!adherence) return 'No doses logged yet';
+    const parts = ['7d', '30d', '90d']
+        .filter(w => adherence[w] && adherence[w].rate !== null)
+        .map(w => `${w}: ${Math.round(adherence[w].rate * 100)}%`);
+    return parts.length ? 'Adherence ' + parts.join(' • ') : 'No doses logged yet';
+}
+
+window.logDose = async function(id, status) {
+    try {
+        const res = await fetch('/api/medication/events', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${state.token}`
+            },
+            body: JSON.stringify({ events: [{ medication_id: id, status: status, timestamp: new Date().toISOString() }] })
+        });
+        if (!res.ok) {
+            const result = await res.json();
+            alert('Error: ' + result.msg);
+            return;
+        }
+        fetchMedications();
+    } catch (err) {
+        console.error(err);
+        alert('Failed to log dose');
+    }
+};
+
+window.deleteMed = async function(id) {
+    if(!confirm('Remove this medication from your schedule?')) return;
+    try {
+        await fetch(`/api/medication/${id}`, {
+            method: 'DELETE',
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        fetchMedications();
+    } catch (err) {
+        console.error(err);
+        alert('Failed to delete medication');
+    }
+};
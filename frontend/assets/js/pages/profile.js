@@ -0,0 +1,118 @@
+const state = {
+    token: localStorage.getItem('token')
+};
+
+if (!state.token) {
+    window.location.href = '/login';
+}
+
+// Load profile on page load
+document.addEventListener('DOMContentLoaded', () => {
+    fetchProfile();
+});
+
+// Form submission
+document.getElementById('profile-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const formData = new FormData(e.target);
+    const data = Object.fromEntries(formData.entries());
+
+    const submitBtn = e.target.querySelector('button[type="submit"]');
+    const originalBtnText = submitBtn.innerHTML;
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<i class="fa-solid fa-spinner fa-spin mr-2"></i>Saving...';
+
+    try {
+        const res = await fetch('/api/profile', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${state.token}`
+            },
+            body: JSON.stringify(data)
+        });
+        const resData = await res.json();
+
+        if (res.ok) {
+            const successMsg = document.getElementById('save-success');
+            successMsg.classList.remove('hidden');
+            setTimeout(() => successMsg.classList.add('hidden'), 3000);
+
+            if (resData.bmi) {
+                updateBMI(resData.bmi);
+            }
+            if (resData.recommendations) {
+                displayRecommendations(resData.recommendations);
+            }
+            // Update prompt to update name on dashboard?
+            // User can refresh.
+        } else {
+            alert('Error: ' + resData.msg);
+        }
+    } catch (err) {
+        console.error(err);
+        alert('Failed to save profile');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = originalBtnText;
+    }
+});
+
+async function fetchProfile() {
+    try {
+        const res = await fetch('/api/profile', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+
+        if (data) {
+            if (data.full_name) document.getElementById('p-full-name').value = data.full_name;
+            if (data.age) document.getElementById('p-age').value = data.age;
+            if (data.gender) document.getElementById('p-gender').value = data.gender;
+            if (data.height) document.getElementById('p-height').value = data.height;
+            if (data.weight) document.getElementById('p-weight').value = data.weight;
+            if (data.activity_level) document.getElementById('p-activity').value = data.activity_level;
+
+            if (data.bmi) updateBMI(data.bmi);
+            if (data.activity_level) {
+                document.getElementById('activity-display').textContent = data.activity_level.charAt(0).toUpperCase() + data.activity_level.slice(1);
+            }
+            if (data.recommended_exercises) {
+                displayRecommendations(data.recommended_exercises);
+            }
+        }
+    } catch (err) {
+        console.error('Failed to fetch profile:', err);
+    }
+}
+
+function updateBMI(bmi) {
+    document.getElementById('bmi-display').textContent = bmi.toFixed(1);
+    const statusEl = document.getElementById('bmi-status');
+    if (bmi < 18.5) {
+        statusEl.textContent = 'Underweight';
+        statusEl.className = 'text-xs text-blue-400 mt-2';
+    } else if (bmi < 25) {
+        statusEl.textContent = 'Normal';
+        statusEl.className = 'text-xs text-green-400 mt-2';
+    } else if (bmi < 30) {
+        statusEl.textContent = 'Overweight';
+        statusEl.className = 'text-xs text-yellow-400 mt-2';
+    } else {
+        statusEl.textContent = 'Obese';
+        statusEl.className = 'text-xs text-red-400 mt-2';
+    }
+}
+
+function displayRecommendations(recs) {
+    const container = document.getElementById('exercise-recommendations');
+    const list = document.getElementById('rec-list');
+    list.innerHTML = '';
+    recs.forEach(r => {
+        const li = document.createElement('li');
+        li.className = 'flex items-center p-3 bg-gray-800/50 rounded-lg';
+        li.innerHTML = `<i class="fa-solid fa-check-circle text-secondary mr-3"></i><span class="text-gray-300">${r}</span>`;
+        list.appendChild(li);
+    });
+    container.classList.remove('hidden');
+}
@@ -0,0 +1,39 @@
+// Clinic to sign in to, from /register?clinic=<id>; remembered for later visits
+const clinic = new URLSearchParams(window.location.search).get('clinic') || localStorage.getItem('clinic');
+
+document.getElementById('register-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const name = document.getElementById('name').value;
+    const email = document.getElementById('email').value;
+    const password = document.getElementById('password').value;
+    const errorMsg = document.getElementById('error-message');
+    const submitBtn = e.target.querySelector('button[type="submit"]');
+
+    errorMsg.classList.add('hidden');
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<i class="fa-solid fa-spinner fa-spin mr-2"></i>Creating account...';
+
+    try {
+        const res = await fetch('/api/auth/register', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', ...(clinic ? { 'X-Tenant': clinic } : {}) },
+            body: JSON.stringify({ name, email, password })
+        });
+        const data = await res.json();
+
+        if (res.ok) {
+            alert('✅ Registration successful! Please login.');
+            window.location.href = clinic ? '/login?clinic=' + encodeURIComponent(clinic) : '/login';
+        } else {
+            errorMsg.textContent = data.msg || 'Registration failed';
+            errorMsg.classList.remove('hidden');
+        }
+    } catch (err) {
+        console.error(err);
+        errorMsg.textContent = 'Network error. Please check your connection and try again.';
+        errorMsg.classList.remove('hidden');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = '<i class="fa-solid fa-rocket mr-2"></i>Get Started';
+    }
+});
@@ -0,0 +1,122 @@
+const state = {
+    token: localStorage.getItem('token')
+};
+
+if (!state.token) {
+    window.location.href = '/login';
+}
+
+// Calculate and display risk score
+async function calculateRisk() {
+    try {
+        const res = await fetch('/api/health/risk', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        // Rate limited or server busy: keep showing the last score until the next poll
+        if (res.status === 429 || res.status === 503) return;
+        const data = await res.json();
+
+        // Update score
+        const scoreEl = document.getElementById('risk-score-value');
+        const levelEl = document.getElementById('risk-level-text');
+        const circle = document.getElementById('risk-circle');
+        const progressBar = document.getElementById('risk-progress-bar');
+        const percentageEl = document.getElementById('risk-percentage');
+
+        // Animate score
+        animateValue(scoreEl, 0, data.score, 1000);
+        percentageEl.textContent = data.score + '%';
+        progressBar.style.width = data.score + '%';
+
+        // Update circle (circumference = 2 * π * r = 2 * 3.14159 * 88 ≈ 552)
+        const offset = 552 - (552 * data.score / 100);
+        circle.style.strokeDashoffset = offset;
+
+        // Update colors based on risk level
+        let color = '#10B981'; // green
+        let textColor = 'text-green-500';
+        if (data.score > 60) {
+            color = '#EF4444'; // red
+            textColor = 'text-red-500';
+        } else if (data.score > 30) {
+            color = '#EAB308'; // yellow
+            textColor = 'text-yellow-500';
+        }
+
+        circle.style.stroke = color;
+        levelEl.className = `text-2xl font-bold ${textColor} mt-4`;
+        levelEl.textContent = data.level + " Risk";
+
+        // Update factors
+        const factorsList = document.getElementById('risk-factors-list');
+        const factorsContainer = document.getElementById('risk-factors-container');
+        if (data.factors && data.factors.length > 0) {
+            factorsContainer.classList.remove('hidden');
+            factorsList.innerHTML = '';
+            data.factors.forEach(factor => {
+                const li = document.createElement('li');
+                li.className = 'glass-card p-3 flex items-center';
+                li.innerHTML = `<i class="fa-solid fa-exclamation-triangle text-yellow-400 mr-3"></i><span class="text-gray-300">${factor}</span>`;
+                factorsList.appendChild(li);
+            });
+        } else {
+            factorsContainer.classList.add('hidden');
+        }
+
+        // Update trend indicators
+        if (data.trend_indicators && data.trend_indicators.length > 0) {
+            const trendContainer = document.getElementById('trend-indicators-container');
+            const trendList = document.getElementById('trend-indicators-list');
+            trendContainer.classList.remove('hidden');
+            trendList.innerHTML = '';
+            data.trend_indicators.forEach(trend => {
+                const badge = document.createElement('div');
+                badge.className = 'px-4 py-2 bg-yellow-500/20 border border-yellow-500/50 rounded-full text-yellow-400 text-sm';
+                badge.textContent = trend;
+                trendList.appendChild(badge);
+            });
+        }
+
+        // Update risk probabilities
+        if (data.risk_probabilities && Object.keys(data.risk_probabilities).length > 0) {
+            const probContainer = document.getElementById('risk-probabilities-container');
+            const probGrid = document.getElementById('risk-probabilities-grid');
+            probContainer.classList.remove('hidden');
+            probGrid.innerHTML = '';
+
+            Object.entries(data.risk_probabilities).forEach(([key, value]) => {
+                const prob = Math.round(value * 100);
+                const card = document.createElement('div');
+                card.className = 'glass-card p-4 text-center';
+                card.innerHTML = `
+                    <div class="text-gray-400 text-sm mb-2 capitalize">${key.replace('_', ' ')}</div>
+                    <div class="text-3xl font-bold text-white">${prob}%</div>
+                `;
+                probGrid.appendChild(card);
+            });
+        }
+
+    } catch (err) {
+        console.error('Failed to calculate risk:', err);
+    }
+}
+
+function animateValue(element, start, end, duration) {
+    let startTimestamp = null;
+    const step = (timestamp) => {
+        if (!startTimestamp) startTimestamp = timestamp;
+        const progress = Math.min((timestamp - startTimestamp) / duration, 1);
+        element.textContent = Math.floor(progress * (end - start) + start);
+        if (progress < 1) {
+            window.requestAnimationFrame(step);
+        }
+    };
+    window.requestAnimationFrame(step);
+}
+
+// Load risk score on page load
+document.addEventListener('DOMContentLoaded', () => {
+    calculateRisk();
+    // Refresh every 30 seconds if data changes
+    setInterval(calculateRisk, 30000);
+});
@@ -0,0 +1,35 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const toggleBtn = document.getElementById('theme-toggle');
+    const toggleKnob = document.getElementById('theme-toggle-knob');
+    const html = document.documentElement;
+
+    // Initial state
+    let isDark = html.classList.contains('dark');
+    updateToggleUI(isDark);
+
+    toggleBtn.addEventListener('click', () => {
+        isDark = !isDark;
+        if (isDark) {
+            html.classList.add('dark');
+            localStorage.setItem('theme', 'dark');
+        } else {
+            html.classList.remove('dark');
+            localStorage.setItem('theme', 'light');
+        }
+        updateToggleUI(isDark);
+    });
+
+    function updateToggleUI(dark) {
+        if (dark) {
+            toggleBtn.classList.remove('bg-slate-300');
+            toggleBtn.classList.add('bg-indigo-600');
+            toggleKnob.classList.remove('translate-x-1');
+            toggleKnob.classList.add('translate-x-7');
+        } else {
+            toggleBtn.classList.add('bg-slate-300');
+            toggleBtn.classList.remove('bg-indigo-600');
+            toggleKnob.classList.add('translate-x-1');
+            toggleKnob.classList.remove('translate-x-7');
+        }
+    }
+});
@@ -0,0 +1,190 @@
+const state = {
+    token: localStorage.getItem('token')
+};
+
+if (!state.token) {
+    window.location.href = '/login';
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    loadLatestEntryDisplayOnly();
+    loadRecentEntries();
+});
+
+function resetForNewEntry() {
+    document.getElementById('vitals-form').reset();
+    document.getElementById('success-message').classList.add('hidden');
+    document.getElementById('vitals-form').scrollIntoView({ behavior: 'smooth' });
+}
+
+// Form submission
+document.getElementById('vitals-form').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const formData = new FormData(e.target);
+    const heartRate = formData.get('heart_rate');
+    const bpSystolic = formData.get('bp_systolic');
+    const bpDiastolic = formData.get('bp_diastolic');
+    const bloodSugar = formData.get('blood_sugar');
+
+    // Validate
+    if (!heartRate && !bpSystolic && !bpDiastolic && !bloodSugar) {
+        alert('⚠️ Please enter at least one vital sign value.');
+        return;
+    }
+
+    const submitBtn = e.target.querySelector('button[type="submit"]');
+    const originalBtnText = submitBtn.innerHTML;
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<i class="fa-solid fa-circle-notch fa-spin mr-2"></i>Saving...';
+
+    try {
+        // Note: We do NOT set Content-Type header manually for FormData; browser handles it
+        const res = await fetch('/api/health/log', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${state.token}`
+            },
+            body: formData
+        });
+
+        const text = await res.text();
+        let result;
+        try {
+            result = JSON.parse(text);
+        } catch (e) {
+            console.error("Non-JSON response:", text);
+            throw new Error(`Server Error (${res.status}): ${text.substring(0, 100)}...`);
+        }
+
+        if (res.ok) {
+            const successMsg = document.getElementById('success-message');
+            successMsg.classList.remove('hidden');
+
+            if (result.alerts && result.alerts.length > 0) {
+                alert('⚠️ Health Alert:\n' + result.alerts.join('\n'));
+            }
+
+            loadLatestEntryDisplayOnly();
+            loadRecentEntries(); // Refresh list
+            setTimeout(() => successMsg.classList.add('hidden'), 5000);
+            document.getElementById('vitals-form').reset();
+
+        } else {
+            alert('❌ ' + (result.msg || 'Failed to save.'));
+        }
+    } catch (err) {
+        console.error(err);
+        alert('❌ Error: ' + err.message);
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = originalBtnText;
+    }
+});
+
+async function loadLatestVitals() {
+    try {
+        const res = await fetch('/api/health/latest', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+
+        if (data && (data.heart_rate || data.bp_systolic)) {
+            document.getElementById('heart-rate').value = data.heart_rate || '';
+            document.getElementById('bp-systolic').value = data.bp_systolic || '';
+            document.getElementById('bp-diastolic').value = data.bp_diastolic || '';
+            document.getElementById('blood-sugar').value = data.blood_sugar || '';
+
+            const form = document.getElementById('vitals-form');
+            form.classList.add('ring-2', 'ring-indigo-500', 'p-2', 'rounded-xl');
+            setTimeout(() => form.classList.remove('ring-2', 'ring-indigo-500', 'p-2', 'rounded-xl'), 1000);
+        } else {
+            alert('No previous data found to edit.');
+        }
+    } catch (err) { console.error(err); }
+}
+
+async function loadLatestEntryDisplayOnly() {
+    try {
+        const res = await fetch('/api/health/latest', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const data = await res.json();
+
+        const latestDiv = document.getElementById('latest-entry');
+        if (data && (data.heart_rate || data.bp_systolic || data.blood_sugar)) {
+            latestDiv.classList.remove('hidden');
+            setTimeout(() => latestDiv.classList.remove('opacity-0'), 100);
+
+            document.getElementById('latest-hr').textContent = (data.heart_rate || '--') + ' bpm';
+            document.getElementById('latest-bp').textContent = `${data.bp_systolic || '--'}/${data.bp_diastolic || '--'}`;
+            document.getElementById('latest-sugar').textContent = (data.blood_sugar || '--') + ' mg/dL';
+
+            if (data.updated_at || data.timestamp) {
+                const date = new Date(data.updated_at || data.timestamp + 'Z'); // Ensure UTC parsing
+                document.getElementById('latest-date').textContent = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            }
+        }
+    } catch (err) { console.error(err); }
+}
+
+async function loadRecentEntries() {
+    try {
+        const res = await fetch('/api/health/logs?limit=5', {
+            headers: { 'Authorization': `Bearer ${state.token}` }
+        });
+        const logs = await res.json();
+
+        const recentDiv = document.getElementById('recent-entries');
+        const tbody = document.getElementById('recent-entries-body');
+        tbody.innerHTML = ''; // Clear
+
+        if (logs && logs.length > 0) {
+            recentDiv.classList.remove('hidden');
+            setTimeout(() => recentDiv.classList.remove('opacity-0'), 100);
+
+            logs.forEach(log => {
+                // Try to parse timestamp, handle both isoformat and others
+                let date;
+                if (log.timestamp) {
+                    if (log.timestamp.endsWith('Z')) {
+                        date = new Date(log.timestamp);
+                    } else {
+                        // Assume UTC if not specified
+                        date = new Date(log.timestamp + 'Z');
+                    }
+                } else {
+                    date = new Date(); // fallback
+                }
+
+                const dateStr = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+
+                let imageHtml = '<span class="text-slate-600">-</span>';
+                if (log.image_path) {
+                    imageHtml = `<a href="/${log.image_path}" target="_blank" class="text-indigo-400 hover:text-indigo-300 transition"><i class="fa-solid fa-image mr-1"></i> View</a>`;
+                }
+
+                const row = `
+                    <tr class="hover:bg-white/5 transition">
+                        <td class="p-4 font-medium text-slate-200">${dateStr}</td>
+                        <td class="p-4 text-rose-300 font-semibold">${log.heart_rate || '--'} <span class="text-xs text-slate-500 font-normal">bpm</span></td>
+                        <td class="p-4 text-blue-300 font-semibold">${log.bp_systolic || '--'}/${log.bp_diastolic || '--'}</td>
+                        <td class="p-4 text-emerald-300 font-semibold">${log.blood_sugar || '--'} <span class="text-xs text-slate-500 font-normal">mg/dL</span></td>
+                        <td class="p-4">${imageHtml}</td>
+                    </tr>
+                `;
+                tbody.innerHTML += row;
+            });
+        } else {
+            // Show empty state if needed, or helper text
+            tbody.innerHTML = '<tr><td colspan="5" class="p-4 text-center text-slate-500">No recent entries found.</td></tr>';
+            recentDiv.classList.remove('hidden');
+            recentDiv.classList.remove('opacity-0');
+        }
+    } catch (err) { console.error("Recent entries error:", err); }
+}
+
+function clearForm() {
+    document.getElementById('vitals-form').reset();
+    document.getElementById('success-message').classList.add('hidden');
+}
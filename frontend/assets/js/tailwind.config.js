@@ -0,0 +1,34 @@
+tailwind.config = {
+    darkMode: 'class',
+    theme: {
+        extend: {
+            fontFamily: {
+                sans: ['Inter', 'sans-serif'],
+                display: ['Outfit', 'sans-serif'],
+            },
+            colors: {
+                primary: '#6366f1', /* Indigo 500 */
+                secondary: '#ec4899', /* Pink 500 */
+                accent: '#8b5cf6', /* Violet 500 */
+                dark: '#0f172a',
+                'glass-border': 'rgba(255, 255, 255, 0.125)',
+            },
+            animation: {
+                'blob': 'blob 7s infinite',
+                'fade-in': 'fadeIn 0.5s ease-out',
+            },
+            keyframes: {
+                blob: {
+                    '0%': { transform: 'translate(0px, 0px) scale(1)' },
+                    '33%': { transform: 'translate(30px, -50px) scale(1.1)' },
+                    '66%': { transform: 'translate(-20px, 20px) scale(0.9)' },
+                    '100%': { transform: 'translate(0px, 0px) scale(1)' },
+                },
+                fadeIn: {
+                    '0%': { opacity: '0', transform: 'translateY(10px)' },
+                    '100%': { opacity: '1', transform: 'translateY(0)' },
+                }
+            }
+        }
+    }
+}
@@ -0,0 +1,29 @@
+import argparse
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.analytics import run_pipeline
+
+# Runs against the database configured by MONGO_URI / MONGO_DB_NAME.
+# Seed it first (e.g. with tests/bench_load.py or a bulk import) for meaningful numbers.
+
+def run_scaling(max_workers, partitions_per_worker):
+    print("--- Analytics Pipeline Scaling Benchmark ---")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        summary = run_pipeline(workers, workers * partitions_per_worker, write=False)
+        elapsed = summary['duration_seconds']
+        baseline = baseline or elapsed
+        users_per_sec = summary['users'] / elapsed if elapsed else 0
+        print(f"Workers: {workers:2d} | {elapsed:8.2f}s | {users_per_sec:10,.0f} users/s | "
+              f"speedup x{baseline / elapsed:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the analytics pipeline across 1..N worker processes")
+    parser.add_argument('--max-workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--partitions-per-worker', type=int, default=4)
+    args = parser.parse_args()
+    run_scaling(args.max_workers, args.partitions_per_worker)
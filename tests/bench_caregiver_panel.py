@@ -0,0 +1,132 @@
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PASSWORD = "panel-bench-password"
+
+
+def seed(db, patients, alerts_per_patient, cached_share, cache, seed_value=42):
+    """One caregiver with a group of N active patients; returns (caregiver email, group id)"""
+    from werkzeug.security import generate_password_hash
+    from backend.services.cache import cache_key
+    from bench_load import synthetic_reading
+
+    rng = random.Random(seed_value)
+    hashed = generate_password_hash(PASSWORD)
+    run_tag = int(time.time())
+    now = datetime.datetime.utcnow()
+
+    caregiver_email = f"caregiver_{run_tag}@example.com"
+    caregiver_id = str(db.users.insert_one({
+        "email": caregiver_email, "password": hashed, "name": "Panel Caregiver", "created_at": now
+    }).inserted_id)
+    group_id = str(db.patient_groups.insert_one({
+        "name": "Bench Ward", "owner_id": caregiver_id, "created_at": now
+    }).inserted_id)
+
+    patient_ids = [
+        str(user_id) for user_id in db.users.insert_many([
+            {"email": f"patient_{run_tag}_{i}@example.com", "password": hashed,
+             "name": f"Patient {i}", "created_at": now}
+            for i in range(patients)
+        ]).inserted_ids
+    ]
+    db.group_members.insert_many([
+        {"group_id": group_id, "patient_id": patient_id, "status": "active", "invited_at": now, "joined_at": now}
+        for patient_id in patient_ids
+    ])
+    db.profiles.insert_many([
+        {"user_id": patient_id, "full_name": f"Patient {i}", "age": rng.randint(20, 90),
+         "height": rng.randint(150, 195), "weight": rng.randint(50, 130),
+         "activity_level": rng.choice(('sedentary', 'moderate', 'active'))}
+        for i, patient_id in enumerate(patient_ids)
+    ])
+    # A few patients have not logged anything yet
+    db.latest_vitals.insert_many([
+        {"user_id": patient_id, "updated_at": now,
+         **synthetic_reading(rng, now - datetime.timedelta(minutes=rng.randint(0, 600)))}
+        for patient_id in patient_ids if rng.random() > 0.03
+    ])
+    alerts = []
+    for patient_id in patient_ids:
+        for _ in range(rng.randint(0, alerts_per_patient)):
+            alerts.append({
+                "user_id": patient_id, "timestamp": now - datetime.timedelta(minutes=rng.randint(0, 10000)),
+                "alerts": ["Bench alert"], "read": rng.random() < 0.5,
+                "severity": "critical" if rng.random() < 0.15 else "warning"
+            })
+    if alerts:
+        db.alerts.insert_many(alerts)
+
+    if cache is not None:
+        for patient_id in patient_ids:
+            if rng.random() < cached_share:
+                score = rng.randint(0, 100)
+                level = "Low" if score <= 30 else ("Moderate" if score <= 60 else "High")
+                cache.set(cache_key('risk', patient_id), {"default": {"score": score, "level": level}})
+    return caregiver_email, group_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caregiver panel latency for a large patient group")
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--alerts', type=int, default=6, help="Up to this many alerts per patient")
+    parser.add_argument('--cached-risk', type=float, default=0.5, help="Share of patients with a cached risk score")
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--budget', type=float, default=1.0, help="Fail when p95 latency exceeds this (seconds)")
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-memory mongomock database")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        import backend.db
+        backend.db._client = mongomock.MongoClient()
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+    sys.path.insert(0, os.path.dirname(__file__))
+    from app import create_app
+    from backend.db import connect
+
+    app = create_app()
+    client = app.test_client()
+    email, group_id = seed(connect(), args.patients, args.alerts, args.cached_risk, app.extensions.get('cache'))
+    token = client.post('/api/auth/login', json={"email": email, "password": PASSWORD}).get_json()['access_token']
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print("--- Caregiver Panel Benchmark ---")
+    print(f"Patients: {args.patients:,} | {args.requests} requests | "
+          f"backend: {'mongomock' if args.mongomock else 'mongodb'}")
+
+    pages = max(1, -(-args.patients // args.per_page))
+    timings = []
+    body = None
+    for i in range(args.requests):
+        start = time.perf_counter()
+        response = client.get(f'/api/caregiver/groups/{group_id}/panel?page={i % pages + 1}&per_page={args.per_page}',
+                              headers=headers)
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            sys.exit(f"Panel request failed: {response.status_code} {response.get_data(as_text=True)}")
+        body = body or response.get_json()
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"   {'p50':<10}{statistics.median(timings) * 1000:>10.1f} ms")
+    print(f"   {'p95':<10}{p95 * 1000:>10.1f} ms")
+    print(f"   {'max':<10}{timings[-1] * 1000:>10.1f} ms")
+    print(f"   severity summary: {body['summary']}")
+    if args.mongomock:
+        # mongomock has no indexes, so every $in is a full scan; only real MongoDB is held to the budget
+        print("   (mongomock run: latency budget not enforced)")
+    elif p95 > args.budget:
+        sys.exit(f"p95 {p95:.3f}s is over the {args.budget}s budget")
+
+
+if __name__ == '__main__':
+    main()
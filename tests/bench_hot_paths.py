@@ -0,0 +1,220 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.risk_model import calculate_risk_score
+from backend.services.insights import generate_ai_insights, build_risk_data
+from backend.services.validation import clean_input, validate_vitals
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'bench_hot_paths.json')
+
+
+def _profile(age, height, weight, activity='moderate', **extra):
+    return {"age": age, "height": height, "weight": weight, "bmi": round(weight / (height / 100) ** 2, 2),
+            "gender": "male", "activity_level": activity, **extra}
+
+
+def _log(hr, sys_bp, dia_bp, sugar):
+    return {"heart_rate": hr, "bp_systolic": sys_bp, "bp_diastolic": dia_bp, "blood_sugar": sugar}
+
+
+# Shaped like services.trends.series_stats output
+RISING = {"n": 12, "ewma": 150.0, "mean": 141.2, "std": 6.4, "slope": 1.9, "change": 20.9,
+          "direction": "rising", "time_in_range": 0.25}
+
+# (name, profile, latest log, adherence, trends) - one case per branch family
+SCENARIOS = [
+    ("healthy", _profile(30, 175, 70, 'active'), _log(68, 115, 75, 90), None, None),
+    ("obesity_class_1", _profile(45, 170, 90), _log(78, 125, 80, 100), None, None),
+    ("obesity_class_2", _profile(50, 165, 100, 'sedentary'), _log(80, 132, 84, 110), None, None),
+    ("obesity_class_3", _profile(55, 160, 110, 'sedentary'), _log(84, 138, 88, 118), None, None),
+    ("underweight", _profile(22, 180, 55), _log(70, 110, 70, 85), None, None),
+    ("hypertensive_crisis", _profile(62, 172, 80), _log(96, 185, 122, 120), None, None),
+    ("stage_2_hypertension", _profile(58, 170, 78), _log(82, 145, 92, 105), None, None),
+    ("hypoglycemia", _profile(35, 168, 62), _log(88, 112, 72, 58), None, None),
+    ("diabetic_range", _profile(60, 170, 85), _log(80, 130, 82, 210), None, None),
+    ("bradycardia", _profile(70, 175, 74, 'sedentary'), _log(38, 118, 76, 95), None, None),
+    ("athlete_bradycardia", _profile(28, 182, 75, 'active'), _log(38, 112, 70, 90), None, None),
+    ("tachycardia", _profile(40, 170, 70), _log(128, 122, 80, 100), None, None),
+    ("metabolic_syndrome", _profile(57, 168, 98, 'sedentary'), _log(86, 152, 96, 215),
+     {"rate": 0.55, "total": 40}, None),
+    ("worsening_trends", _profile(64, 170, 88), _log(92, 150, 95, 165), {"rate": 0.9, "total": 60},
+     {"bp_systolic": RISING, "blood_sugar": RISING}),
+    ("missing_data", {}, {}, None, None),
+]
+
+VALIDATION_INPUTS = [
+    {"heart_rate": "72", "bp_systolic": "120", "bp_diastolic": "80", "blood_sugar": "95"},
+    {"heart_rate": 72, "bp_systolic": 120, "bp_diastolic": 80, "blood_sugar": 95},
+    {"heart_rate": " 88 ", "bp_systolic": "", "bp_diastolic": "null", "blood_sugar": None},
+    {"heart_rate": "250", "bp_systolic": "120", "bp_diastolic": "80", "blood_sugar": "95"},
+    {"heart_rate": "abc", "bp_systolic": "120"},
+]
+CLEAN_INPUTS = ["72", " 120 ", "", "null", None, 95, "abc"]
+
+
+def _risk_cases():
+    return [(profile, log, adherence, trends) for _name, profile, log, adherence, trends in SCENARIOS]
+
+
+def _insight_cases():
+    return [
+        (profile, log, build_risk_data(calculate_risk_score(profile, log, adherence, trends)))
+        for _name, profile, log, adherence, trends in SCENARIOS
+    ]
+
+
+def bench_calculate_risk_score(cases):
+    for profile, log, adherence, trends in cases:
+        calculate_risk_score(profile, log, adherence, trends)
+
+
+def bench_generate_ai_insights(cases):
+    for profile, log, risk_data in cases:
+        generate_ai_insights(profile, log, risk_data)
+
+
+def bench_validate_vitals(cases):
+    for data in cases:
+        try:
+            validate_vitals(data)
+        except ValueError:
+            pass
+
+
+def bench_clean_input(cases):
+    for val in cases:
+        clean_input(val)
+
+
+# name -> (function, fixture builder); each call covers every case once
+BENCHMARKS = {
+    'calculate_risk_score': (bench_calculate_risk_score, _risk_cases),
+    'generate_ai_insights': (bench_generate_ai_insights, _insight_cases),
+    'validate_vitals': (bench_validate_vitals, lambda: VALIDATION_INPUTS),
+    'clean_input': (bench_clean_input, lambda: CLEAN_INPUTS),
+}
+
+
+def measure(fn, cases, rounds, min_time):
+    """
+    pytest-benchmark style: calibrate iterations so a round lasts at least
+    min_time, time each round, then measure allocations on one extra pass.
+    Times are per case (one call of the function under test).
+    """
+    fn(cases)  # warm caches and imports
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(cases)
+        if time.perf_counter() - start >= min_time:
+            break
+        iterations *= 2
+
+    per_call = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(cases)
+            per_call.append((time.perf_counter() - start) / (iterations * len(cases)))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn(cases)
+    after = tracemalloc.take_snapshot()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    return {
+        "cases": len(cases),
+        "rounds": rounds,
+        "iterations": iterations,
+        "min_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "mean_us": round(statistics.mean(per_call) * 1e6, 3),
+        "stddev_us": round(statistics.stdev(per_call) * 1e6, 3) if len(per_call) > 1 else 0.0,
+        "peak_bytes_per_call": round(peak / len(cases)),
+        "retained_bytes_per_call": round(allocated / len(cases))
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    print(f"\n{'benchmark':<24}{'median us':>12}{'baseline':>12}{'change':>10}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<24}{stats['median_us']:>12}{'-':>12}{'new':>10}")
+            continue
+        change = stats['median_us'] / base['median_us'] - 1 if base['median_us'] else 0.0
+        print(f"{name:<24}{stats['median_us']:>12}{base['median_us']:>12}{change:>+10.1%}")
+        if change > tolerance:
+            failures.append(f"{name}: median {stats['median_us']}us vs baseline {base['median_us']}us ({change:+.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for risk scoring, insights and validation")
+    parser.add_argument('-k', dest='only', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--min-time', type=float, default=0.01, help="Minimum seconds per round")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help="Fail when slower than the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print("--- Hot Path Micro-benchmarks ---")
+    print(f"{'benchmark':<24}{'cases':>6}{'min us':>10}{'median us':>11}{'stddev':>9}{'peak B':>9}{'kept B':>8}")
+    results = {}
+    for name, (fn, build_cases) in BENCHMARKS.items():
+        if args.only and args.only not in name:
+            continue
+        stats = measure(fn, build_cases(), args.rounds, args.min_time)
+        results[name] = stats
+        print(f"{name:<24}{stats['cases']:>6}{stats['min_us']:>10}{stats['median_us']:>11}"
+              f"{stats['stddev_us']:>9}{stats['peak_bytes_per_call']:>9}{stats['retained_bytes_per_call']:>8}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                existing = json.load(fh)
+        with open(args.baseline, 'w') as fh:
+            json.dump({**existing, **results}, fh, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("\nNo baseline stored yet; run with --save-baseline to create one")
+            return
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        failures = compare(results, baseline, args.tolerance)
+        if failures:
+            print("\nPerformance regressions:")
+            for failure in failures:
+                print(f"   {failure}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == '__main__':
+    main()
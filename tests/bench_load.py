@@ -0,0 +1,294 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'bench_load.json')
+PASSWORD = "loadtest-password"
+
+# Share of operations in the traffic mix (risk.html polls every 30s, so risk dominates)
+TRAFFIC_MIX = {
+    'login': 5,
+    'log_vitals': 20,
+    'dashboard': 25,
+    'risk_poll': 35,
+    'alert_check': 15
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def synthetic_reading(rng, timestamp=None):
+    from backend.services.validation import VITAL_RULES
+    means = {'heart_rate': (75, 12), 'bp_systolic': (125, 15), 'bp_diastolic': (80, 10), 'blood_sugar': (105, 25)}
+    # Keep values inside the accepted ranges so every logged reading is valid
+    reading = {
+        field: min(high, max(low, round(rng.gauss(*means[field]))))
+        for field, _label, low, high, _unit in VITAL_RULES
+    }
+    if timestamp is not None:
+        reading["timestamp"] = timestamp
+    return reading
+
+
+def seed(db, users, readings, seed_value=42):
+    """Insert N users with profiles and M readings each; returns their emails"""
+    from werkzeug.security import generate_password_hash
+    from backend.services.importer import rebuild_latest_vitals
+    from backend.services.trends import rebuild_trend_state
+    from backend.services.anomaly import rebuild_baselines
+
+    rng = random.Random(seed_value)
+    # Hash once: seeding thousands of users shouldn't be dominated by password hashing
+    hashed = generate_password_hash(PASSWORD)
+    run_tag = int(time.time())
+    emails = []
+    now = datetime.datetime.utcnow()
+
+    for i in range(users):
+        email = f"load_{run_tag}_{i}@example.com"
+        user_id = str(db.users.insert_one({
+            "email": email, "password": hashed, "name": f"Load User {i}", "created_at": now
+        }).inserted_id)
+        db.profiles.insert_one({
+            "user_id": user_id,
+            "age": rng.randint(20, 85),
+            "gender": rng.choice(('male', 'female')),
+            "height": rng.randint(150, 195),
+            "weight": rng.randint(50, 130),
+            "activity_level": rng.choice(('sedentary', 'moderate', 'active')),
+            "smoking": rng.random() < 0.2,
+            "diabetes": rng.random() < 0.15
+        })
+        db.alert_thresholds.insert_one({
+            "user_id": user_id,
+            "heart_rate_min": 60, "heart_rate_max": 100, "heart_rate_enabled": True,
+            "bp_systolic_max": 140, "bp_diastolic_max": 90, "bp_enabled": True,
+            "blood_sugar_min": 70, "blood_sugar_max": 140, "blood_sugar_enabled": True
+        })
+        logs = [
+            {"user_id": user_id, "image_path": None,
+             **synthetic_reading(rng, now - datetime.timedelta(hours=readings - j))}
+            for j in range(readings)
+        ]
+        if logs:
+            db.health_logs.insert_many(logs)
+            rebuild_latest_vitals(db, user_id)
+            rebuild_trend_state(db, user_id)
+            rebuild_baselines(db, user_id)
+        emails.append(email)
+    return emails
+
+
+class Client:
+    """One keep-alive HTTP connection per worker thread"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection; reconnect once
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def login(self, email):
+        status, data = self.request('POST', '/api/auth/login', {"email": email, "password": PASSWORD})
+        if status == 200:
+            self.token = json.loads(data)['access_token']
+        return status
+
+
+def run_operation(client, op, email, rng):
+    """Perform one user-level operation; returns the list of HTTP statuses it produced"""
+    if op == 'login':
+        return [client.login(email)]
+    if op == 'log_vitals':
+        return [client.request('POST', '/api/health/log', synthetic_reading(rng))[0]]
+    if op == 'dashboard':
+        # What index.html fetches on load
+        return [client.request('GET', path)[0] for path in ('/api/health/latest', '/api/health/risk', '/api/profile/')]
+    if op == 'risk_poll':
+        return [client.request('GET', '/api/health/risk')[0]]
+    if op == 'alert_check':
+        return [client.request('POST', '/api/alerts/check')[0], client.request('GET', '/api/alerts/')[0]]
+    raise ValueError(op)
+
+
+def worker(base_url, emails, duration, results, lock, seed_value):
+    rng = random.Random(seed_value)
+    ops, weights = zip(*TRAFFIC_MIX.items())
+    email = rng.choice(emails)
+    client = Client(base_url)
+    client.login(email)
+    local = {op: {"latencies": [], "errors": 0} for op in ops}
+
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        op = rng.choices(ops, weights)[0]
+        start = time.perf_counter()
+        statuses = run_operation(client, op, email, rng)
+        elapsed = time.perf_counter() - start
+        local[op]["latencies"].append(elapsed)
+        if any(status >= 400 for status in statuses):
+            local[op]["errors"] += 1
+
+    with lock:
+        for op, stats in local.items():
+            results[op]["latencies"].extend(stats["latencies"])
+            results[op]["errors"] += stats["errors"]
+
+
+def run_load(base_url, emails, concurrency, duration):
+    results = {op: {"latencies": [], "errors": 0} for op in TRAFFIC_MIX}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(base_url, emails, duration, results, lock, i))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for op, stats in results.items():
+        latencies = sorted(stats["latencies"])
+        report[op] = {
+            "requests": len(latencies),
+            "errors": stats["errors"],
+            "throughput": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None
+        }
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Regressions: p95 slower than baseline, or throughput lower, by more than tolerance"""
+    failures = []
+    for op, stats in report.items():
+        base = baseline.get(op)
+        if not base or not stats['requests']:
+            continue
+        if base.get('p95_ms') and stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            failures.append(f"{op}: p95 {stats['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if base.get('throughput') and stats['throughput'] < base['throughput'] * (1 - tolerance):
+            failures.append(f"{op}: throughput {stats['throughput']}/s vs baseline {base['throughput']}/s")
+        if stats['errors'] > base.get('errors', 0):
+            failures.append(f"{op}: {stats['errors']} failed operations (baseline {base.get('errors', 0)})")
+    return failures
+
+
+def start_server(use_mongomock):
+    """Boot the app on a free local port in this process"""
+    if use_mongomock:
+        import mongomock
+        import backend.db
+        backend.db._client = mongomock.MongoClient()
+
+    # Measure the application, not the limiter's 429s
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from app import create_app
+
+    app = create_app()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the HTTP API")
+    parser.add_argument('--users', type=int, default=50, help="Synthetic users to seed")
+    parser.add_argument('--readings', type=int, default=200, help="Readings seeded per user")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent simulated clients")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of traffic")
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-memory mongomock database")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    print("--- API Load Test ---")
+    base_url, server = start_server(args.mongomock)
+    from backend.db import connect
+    db = connect()
+
+    start = time.perf_counter()
+    emails = seed(db, args.users, args.readings)
+    print(f"Seeded {args.users:,} users x {args.readings:,} readings in {time.perf_counter() - start:.1f}s")
+    print(f"Driving {args.concurrency} clients for {args.duration:.0f}s against {base_url}")
+
+    report = run_load(base_url, emails, args.concurrency, args.duration)
+    server.shutdown()
+
+    print(f"\n{'operation':<14}{'ops':>8}{'ops/s':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, stats in report.items():
+        print(f"{op:<14}{stats['requests']:>8}{stats['throughput']:>9}{stats['errors']:>8}"
+              f"{stats['p50_ms'] or 0:>10}{stats['p95_ms'] or 0:>10}{stats['p99_ms'] or 0:>10}")
+
+    run = {
+        "config": {"users": args.users, "readings": args.readings, "concurrency": args.concurrency,
+                   "duration": args.duration, "backend": "mongomock" if args.mongomock else "mongodb"},
+        "operations": report
+    }
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as fh:
+            json.dump(run, fh, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline stored yet; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    if baseline.get('config', {}).get('backend') != run['config']['backend']:
+        print(f"\nWarning: baseline was recorded against {baseline['config'].get('backend')}")
+    failures = compare(report, baseline['operations'], args.tolerance)
+    if failures:
+        print("\nPerformance regressions:")
+        for failure in failures:
+            print(f"   {failure}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == '__main__':
+    main()
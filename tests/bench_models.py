@@ -0,0 +1,131 @@
+import argparse
+import datetime
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import HealthReading, Profile
+from backend.services.risk_model import calculate_risk_score, VITAL_DEFAULTS
+
+
+def synthetic_docs(count, seed=7):
+    """Dicts shaped like decoded health_logs documents"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "user_id": f"user_{i % 1000}",
+            "timestamp": start + datetime.timedelta(minutes=i),
+            "heart_rate": rng.randint(45, 130),
+            "bp_systolic": rng.randint(95, 190),
+            "bp_diastolic": rng.randint(55, 125),
+            "blood_sugar": rng.randint(55, 320),
+            "image_path": None
+        }
+        for i in range(count)
+    ]
+
+
+def measure_memory(build):
+    """Bytes allocated by build() that are still alive when it returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<34}{elapsed:>8.3f}s")
+    return result, elapsed
+
+
+def scan_dicts(docs):
+    # What the routes do today: .get() and int() on every access
+    out_of_range = 0
+    sugar_total = 0
+    for doc in docs:
+        try:
+            hr = int(doc.get('heart_rate'))
+        except (TypeError, ValueError):
+            hr = None
+        if hr is not None and (hr < 60 or hr > 100):
+            out_of_range += 1
+        try:
+            sugar_total += int(doc.get('blood_sugar') or 0)
+        except (TypeError, ValueError):
+            pass
+    return out_of_range, sugar_total
+
+
+def scan_records(readings):
+    out_of_range = 0
+    sugar_total = 0
+    for reading in readings:
+        hr = reading.heart_rate
+        if hr is not None and (hr < 60 or hr > 100):
+            out_of_range += 1
+        sugar_total += reading.blood_sugar or 0
+    return out_of_range, sugar_total
+
+
+def score_dicts(profile_doc, docs):
+    for doc in docs:
+        calculate_risk_score(profile_doc, doc)
+
+
+def score_records(profile, readings):
+    for reading in readings:
+        calculate_risk_score(profile, reading)
+
+
+def run_benchmark(count, risk_sample):
+    print("--- Domain Record Benchmark ---")
+    print(f"Readings: {count:,} | Risk scoring sample: {risk_sample:,}")
+
+    docs, total_bytes = measure_memory(lambda: synthetic_docs(count))
+    # Both containers below share the same value objects, so only the containers are counted
+    _copies, dict_bytes = measure_memory(lambda: [dict(doc) for doc in docs])
+    del _copies
+    readings, record_bytes = measure_memory(lambda: [HealthReading.from_bson(doc) for doc in docs])
+
+    print(f"\nMemory per reading (values themselves: {(total_bytes - dict_bytes) / count:.0f} B, shared)")
+    print(f"   {'raw dicts':<34}{dict_bytes / 2**20:>8.1f} MiB ({dict_bytes / count:.0f} B/reading)")
+    print(f"   {'HealthReading records':<34}{record_bytes / 2**20:>8.1f} MiB ({record_bytes / count:.0f} B/reading)")
+    print(f"   {'saving':<34}{1 - record_bytes / dict_bytes:>8.1%}")
+
+    print("\nTime")
+    timed("parse dicts -> records", lambda: [HealthReading.from_bson(doc) for doc in docs])
+    dict_result, dict_scan = timed("scan dicts (.get + int)", scan_dicts, docs)
+    record_result, record_scan = timed("scan records (attributes)", scan_records, readings)
+    assert dict_result == record_result, "scans disagree"
+    print(f"   {'scan speed-up':<34}{dict_scan / record_scan:>8.2f}x")
+
+    profile_doc = {"age": 58, "height": 170, "weight": 92, "bmi": 31.83, "activity_level": "sedentary"}
+    profile = Profile.from_bson(profile_doc)
+    sample_docs = docs[:risk_sample]
+    sample_readings = [HealthReading.from_bson(doc, defaults=VITAL_DEFAULTS) for doc in sample_docs]
+    _r, dict_risk = timed("calculate_risk_score (dicts)", score_dicts, profile_doc, sample_docs)
+    _r, record_risk = timed("calculate_risk_score (records)", score_records, profile, sample_readings)
+    print(f"   {'risk scoring speed-up':<34}{dict_risk / record_risk:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and speed of __slots__ records vs raw Mongo dicts")
+    parser.add_argument('--readings', type=int, default=1_000_000)
+    parser.add_argument('--risk-sample', type=int, default=100_000, help="Readings scored with the risk model")
+    args = parser.parse_args()
+    run_benchmark(args.readings, min(args.risk_sample, args.readings))
+
+
+if __name__ == '__main__':
+    main()
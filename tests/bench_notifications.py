@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import Alert
+from backend.services.notifications import FileChannel, HttpChannel, Notifier, serve_sink
+
+
+def run(db, channel, alerts, users, concurrency, digest_window, burst, timeout, seed_value=5):
+    """Enqueue the alerts in per-user bursts and deliver until the queue drains"""
+    db.notification_jobs.drop()
+    # Retries within the run instead of minutes later
+    notifier = Notifier(lambda: db, [channel], digest_window=digest_window, retry_base=0.05, poll_interval=0.05,
+                        concurrency={channel.name: concurrency})
+    notifier.ensure_indexes()
+
+    rng = random.Random(seed_value)
+    start = time.perf_counter()
+    notifier.start()
+    enqueued = 0
+    while enqueued < alerts:
+        user_id = f"user_{rng.randrange(users)}"
+        for _ in range(min(burst, alerts - enqueued)):
+            severity = 'critical' if rng.random() < 0.1 else 'warning'
+            notifier.enqueue(Alert(user_id, [f"Bench alert {enqueued}"], severity))
+            enqueued += 1
+    enqueue_seconds = time.perf_counter() - start
+
+    while sum(notifier.queue_depth().values()) and time.perf_counter() - start < timeout:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    notifier.stop()
+    return notifier.report()[channel.name], enqueue_seconds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification queue delivery throughput against a local sink")
+    parser.add_argument('--alerts', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=5, help="Alerts enqueued back to back for one user")
+    parser.add_argument('--channel', choices=('http', 'file'), default='http')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help="Worker counts to compare")
+    parser.add_argument('--digest-window', type=float, default=0, help="Seconds warnings wait for a digest")
+    parser.add_argument('--sink-delay', type=float, default=0.01, help="Seconds the HTTP sink takes per delivery")
+    parser.add_argument('--sink-fail-rate', type=float, default=0.05, help="Share of deliveries the sink rejects")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-memory mongomock database")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        db = mongomock.MongoClient()['notification_bench']
+        # mongomock is not thread-safe, so only a single worker is meaningful
+        args.concurrency = [1]
+    else:
+        from pymongo import MongoClient
+        db = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))['notification_bench']
+
+    if args.channel == 'http':
+        sink = serve_sink(0, args.sink_fail_rate, args.sink_delay)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        channel = HttpChannel(f"http://127.0.0.1:{sink.server_port}/")
+    else:
+        channel = FileChannel(os.path.join(os.path.dirname(__file__), '..', 'notifications', 'bench_outbox.jsonl'))
+
+    print("--- Notification Queue Benchmark ---")
+    print(f"Alerts: {args.alerts:,} | users: {args.users} | burst: {args.burst} | channel: {args.channel} | "
+          f"digest window: {args.digest_window}s")
+    print(f"\n{'workers':>8}{'deliveries':>12}{'jobs':>8}{'digested':>10}{'retries':>9}{'failed':>8}"
+          f"{'enqueue/s':>11}{'jobs/s':>9}")
+    for concurrency in args.concurrency:
+        stats, enqueue_seconds, elapsed = run(
+            db, channel, args.alerts, args.users, concurrency, args.digest_window, args.burst, args.timeout
+        )
+        print(f"{concurrency:>8}{stats['deliveries']:>12}{stats['delivered_jobs']:>8}{stats['digested_jobs']:>10}"
+              f"{stats['retries']:>9}{stats['failed_jobs']:>8}{args.alerts / enqueue_seconds:>11.0f}"
+              f"{stats['delivered_jobs'] / elapsed:>9.0f}")
+    db.client.drop_database('notification_bench')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Read throughput with and without secondary reads on a local replica set.
+
+Start a 3-member replica set first, e.g.:
+
+    mkdir -p /tmp/rs/{0,1,2}
+    for i in 0 1 2; do
+        mongod --replSet rs0 --port 2701$i --dbpath /tmp/rs/$i --bind_ip localhost --fork --logpath /tmp/rs/$i.log
+    done
+    mongosh --port 27010 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27010"}, {_id: 1, host: "localhost:27011"}, {_id: 2, host: "localhost:27012"}]})'
+
+then run:
+
+    python tests/bench_read_routing.py --uri "mongodb://localhost:27010,localhost:27011,localhost:27012/?replicaSet=rs0"
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+DB_NAME = 'read_routing_bench'
+
+
+def seed(db, users, readings):
+    db.health_logs.drop()
+    db.health_logs.create_index([("user_id", 1), ("timestamp", -1)])
+    start = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    rng = random.Random(3)
+    batch = []
+    for i in range(readings):
+        batch.append({
+            "user_id": f"user_{i % users}",
+            "timestamp": start + datetime.timedelta(minutes=i),
+            "heart_rate": rng.randint(55, 110),
+            "bp_systolic": rng.randint(100, 160),
+            "bp_diastolic": rng.randint(60, 100),
+            "blood_sugar": rng.randint(70, 200)
+        })
+        if len(batch) == 5000:
+            db.health_logs.insert_many(batch)
+            batch = []
+    if batch:
+        db.health_logs.insert_many(batch)
+
+
+def writer(db, users, stop, counter):
+    rng = random.Random(11)
+    while not stop.is_set():
+        db.health_logs.insert_one({
+            "user_id": f"user_{rng.randrange(users)}",
+            "timestamp": datetime.datetime.utcnow(),
+            "heart_rate": rng.randint(55, 110)
+        })
+        counter[0] += 1
+
+
+def reader(db, users, deadline, latencies):
+    rng = random.Random(threading.get_ident())
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        list(db.health_logs.find({"user_id": f"user_{rng.randrange(users)}"}).sort("timestamp", -1).limit(50))
+        latencies.append(time.perf_counter() - start)
+
+
+def run_phase(client, label, read_preference, users, threads, duration):
+    db = client.get_database(DB_NAME, read_preference=read_preference)
+    stop = threading.Event()
+    writes = [0]
+    write_thread = threading.Thread(target=writer, args=(client[DB_NAME], users, stop, writes), daemon=True)
+    write_thread.start()
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+    workers = [threading.Thread(target=reader, args=(db, users, deadline, latencies)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop.set()
+    write_thread.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    print(f"   {label:<34}{len(latencies) / duration:>10.0f}{p95:>10.1f}{writes[0] / duration:>10.0f}")
+
+
+def check_read_your_writes(client, samples):
+    """Write on the primary, read straight back from a secondary, with and without a causal session"""
+    stale = {"causal": 0, "plain": 0}
+    secondary = client.get_database(DB_NAME, read_preference=SecondaryPreferred(max_staleness=90))
+    for i in range(samples):
+        with client.start_session(causal_consistency=True) as session:
+            doc_id = client[DB_NAME].health_logs.insert_one(
+                {"user_id": "ryw", "timestamp": datetime.datetime.utcnow(), "seq": i}, session=session
+            ).inserted_id
+            if secondary.health_logs.find_one({"_id": doc_id}, session=session) is None:
+                stale['causal'] += 1
+        doc_id = client[DB_NAME].health_logs.insert_one(
+            {"user_id": "ryw", "timestamp": datetime.datetime.utcnow(), "seq": i}
+        ).inserted_id
+        if secondary.health_logs.find_one({"_id": doc_id}) is None:
+            stale['plain'] += 1
+    print(f"\nRead-your-writes over {samples} write/read pairs")
+    print(f"   {'causal session, stale reads':<34}{stale['causal']:>10}")
+    print(f"   {'no session, stale reads':<34}{stale['plain']:>10}")
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Primary vs secondaryPreferred reads on a replica set")
+    parser.add_argument('--uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27010,localhost:27011,localhost:27012/?replicaSet=rs0'))
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--readings', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--ryw-samples', type=int, default=500)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, maxPoolSize=args.threads * 2)
+    hello = client.admin.command('hello')
+    if 'setName' not in hello:
+        sys.exit("Not a replica set: start one as described at the top of this file")
+    print("--- Read Routing Benchmark ---")
+    print(f"Replica set: {hello['setName']} ({len(hello.get('hosts', []))} members) | "
+          f"{args.readings:,} readings, {args.users} users, {args.threads} reader threads")
+    seed(client[DB_NAME], args.users, args.readings)
+
+    print(f"\n   {'read preference':<34}{'reads/s':>10}{'p95 ms':>10}{'writes/s':>10}")
+    run_phase(client, "primary", Primary(), args.users, args.threads, args.duration)
+    run_phase(client, "secondaryPreferred (90s staleness)", SecondaryPreferred(max_staleness=90),
+              args.users, args.threads, args.duration)
+
+    stale = check_read_your_writes(client, args.ryw_samples)
+    client.drop_database(DB_NAME)
+    if stale['causal']:
+        sys.exit("Causal sessions returned stale reads")
+
+
+if __name__ == '__main__':
+    main()
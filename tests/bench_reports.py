@@ -0,0 +1,88 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.reports import period_bounds, run_reports
+from backend.services.storage import LocalStorage
+
+
+def seed(db, users, readings_per_day, period, seed_value=7):
+    """Users with a period of readings, a profile and a few alerts; returns their ids"""
+    from bench_load import synthetic_reading
+
+    rng = random.Random(seed_value)
+    start, end = period_bounds(period)
+    days = (end - start).days
+    user_ids = [f"report_bench_{i}" for i in range(users)]
+    db.profiles.insert_many([
+        {"user_id": user_id, "full_name": f"Bench User {i}", "age": rng.randint(20, 90),
+         "height": rng.randint(150, 195), "weight": rng.randint(50, 130),
+         "activity_level": rng.choice(('sedentary', 'moderate', 'active'))}
+        for i, user_id in enumerate(user_ids)
+    ])
+    for user_id in user_ids:
+        db.health_logs.insert_many([
+            {"user_id": user_id, **synthetic_reading(
+                rng, start + datetime.timedelta(days=day, minutes=rng.randint(0, 1439)))}
+            for day in range(days) for _ in range(readings_per_day)
+        ])
+        db.alerts.insert_many([
+            {"user_id": user_id, "timestamp": start + datetime.timedelta(minutes=rng.randint(0, days * 1440 - 1)),
+             "alerts": ["Bench alert"], "read": False,
+             "severity": "critical" if rng.random() < 0.2 else "warning"}
+            for _ in range(rng.randint(1, 6))
+        ])
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report rendering throughput (reports/min per core)")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--readings-per-day', type=int, default=4)
+    parser.add_argument('--period', choices=('weekly', 'monthly'), default='weekly')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(1, multiprocessing.cpu_count() // 2), multiprocessing.cpu_count()}),
+                        help="Pool sizes to compare")
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-memory mongomock database")
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    if args.mongomock:
+        import mongomock
+        db = mongomock.MongoClient()['report_bench']
+        # Worker processes cannot see an in-memory database, so render in this process
+        args.workers = [0]
+    else:
+        from pymongo import MongoClient
+        os.environ.setdefault('MONGO_DB_NAME', 'report_bench')
+        db = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))[os.environ['MONGO_DB_NAME']]
+
+    user_ids = seed(db, args.users, args.readings_per_day, args.period)
+    report_dir = tempfile.mkdtemp(prefix='report_bench_')
+    print("--- Report Generation Benchmark ---")
+    print(f"Users: {args.users:,} | {args.period} | {args.readings_per_day} readings/day | "
+          f"backend: {'mongomock' if args.mongomock else 'mongodb'}")
+    print(f"\n{'workers':>8}{'reports':>9}{'failed':>8}{'seconds':>9}{'reports/min':>13}{'per core':>10}")
+    try:
+        for workers in args.workers:
+            # Fresh directory each run so every artifact is really written
+            shutil.rmtree(report_dir, ignore_errors=True)
+            summary = run_reports(args.period, workers=workers, user_ids=user_ids,
+                                  db=db, storage=LocalStorage(report_dir))
+            per_min = summary['reports'] / (summary['duration_seconds'] / 60) if summary['duration_seconds'] else 0
+            print(f"{workers:>8}{summary['reports']:>9}{summary['failed']:>8}{summary['duration_seconds']:>9.2f}"
+                  f"{per_min:>13,.0f}{summary['reports_per_min_per_core']:>10,.0f}")
+    finally:
+        shutil.rmtree(report_dir, ignore_errors=True)
+        db.client.drop_database(db.name)
+
+
+if __name__ == '__main__':
+    main()
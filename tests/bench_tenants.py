@@ -0,0 +1,177 @@
+"""
+Per-user query latency as clinics are added to one deployment.
+
+Every clinic gets its own database (with hashed user_id shard keys) and its
+own connection pool. The benchmark adds clinics in steps, seeds each one and
+drives the dashboard queries (latest vitals, recent history, unread alerts)
+against random clinics; p95 should stay flat as the number of clinics grows.
+
+Start a local sharded cluster first (two single-node shards), e.g.:
+
+    mkdir -p /tmp/sh/{cfg,s1,s2}
+    mongod --configsvr --replSet cfg --port 27019 --dbpath /tmp/sh/cfg --fork --logpath /tmp/sh/cfg.log
+    mongod --shardsvr --replSet s1 --port 27101 --dbpath /tmp/sh/s1 --fork --logpath /tmp/sh/s1.log
+    mongod --shardsvr --replSet s2 --port 27102 --dbpath /tmp/sh/s2 --fork --logpath /tmp/sh/s2.log
+    mongosh --port 27019 --eval 'rs.initiate({_id: "cfg", configsvr: true, members: [{_id: 0, host: "localhost:27019"}]})'
+    mongosh --port 27101 --eval 'rs.initiate({_id: "s1", members: [{_id: 0, host: "localhost:27101"}]})'
+    mongosh --port 27102 --eval 'rs.initiate({_id: "s2", members: [{_id: 0, host: "localhost:27102"}]})'
+    mongos --configdb cfg/localhost:27019 --port 27017 --fork --logpath /tmp/sh/mongos.log
+    mongosh --port 27017 --eval 'sh.addShard("s1/localhost:27101"); sh.addShard("s2/localhost:27102")'
+
+then run:
+
+    python tests/bench_tenants.py --uri mongodb://localhost:27017/ --tenants 1 2 4 8 16
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_NAME = 'tenant_bench'
+
+
+def seed(db, tenant_id, users, readings, rng):
+    """Users with a history of readings, latest vitals and a few alerts; returns their ids"""
+    from bench_load import synthetic_reading
+
+    start = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    user_ids = [f"{tenant_id}_user_{i}" for i in range(users)]
+    for user_id in user_ids:
+        logs = [{"user_id": user_id, **synthetic_reading(rng, start + datetime.timedelta(minutes=30 * i))}
+                for i in range(readings)]
+        db.health_logs.insert_many(logs)
+        db.latest_vitals.insert_one({key: value for key, value in logs[-1].items() if key != '_id'})
+        db.alerts.insert_many([
+            {"user_id": user_id, "timestamp": start + datetime.timedelta(hours=rng.randint(0, 719)),
+             "alerts": ["Bench alert"], "read": rng.random() < 0.5, "severity": "warning"}
+            for _ in range(rng.randint(1, 5))
+        ])
+    return user_ids
+
+
+def dashboard(db, user_id):
+    """The per-user reads behind the dashboard"""
+    db.latest_vitals.find_one({"user_id": user_id})
+    list(db.health_logs.find({"user_id": user_id}).sort("timestamp", -1).limit(50))
+    db.alerts.count_documents({"user_id": user_id, "read": False})
+
+
+def reader(databases, users, deadline, latencies):
+    rng = random.Random(threading.get_ident())
+    tenants = list(databases)
+    while time.perf_counter() < deadline:
+        tenant_id = rng.choice(tenants)
+        start = time.perf_counter()
+        dashboard(databases[tenant_id], rng.choice(users[tenant_id]))
+        latencies.append(time.perf_counter() - start)
+
+
+def run_phase(databases, users, threads, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    workers = [threading.Thread(target=reader, args=(databases, users, deadline, latencies)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    latencies.sort()
+    return latencies
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def shards_per_query(db, user_id):
+    """How many shards the history query is routed to (1 = targeted)"""
+    plan = db.command('explain', {"find": "health_logs", "filter": {"user_id": user_id},
+                                  "sort": {"timestamp": -1}, "limit": 50}, verbosity='queryPlanner')
+    return len(plan['queryPlanner']['winningPlan'].get('shards', [None]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency as clinics (tenants) are added")
+    parser.add_argument('--uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'),
+                        help="mongos of a sharded cluster (a plain mongod works, unsharded)")
+    parser.add_argument('--tenants', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help="Number of clinics at each step")
+    parser.add_argument('--users', type=int, default=50, help="Users per clinic")
+    parser.add_argument('--readings', type=int, default=200, help="Readings per user")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of traffic per step")
+    parser.add_argument('--max-growth', type=float, default=1.5,
+                        help="Fail when p95 at the last step exceeds the first step's by this factor")
+    parser.add_argument('--mongomock', action='store_true', help="Use an in-memory mongomock database")
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    # backend.db reads these at import
+    os.environ['MONGO_URI'] = args.uri
+    os.environ['MONGO_DB_NAME'] = DB_NAME
+    from backend.db import connect, ensure_indexes, get_client, is_sharded, tenant_db_name
+    from backend.services.tenants import provision_tenant
+
+    if args.mongomock:
+        import mongomock
+        client = mongomock.MongoClient()
+        # mongomock is not thread-safe and has no sharding: one reader, plain databases
+        args.threads = 1
+        sharded = False
+        shards = []
+    else:
+        client = get_client()
+        sharded = is_sharded(client)
+        shards = [shard['_id'] for shard in client.admin.command('listShards')['shards']] if sharded else []
+
+    print("--- Multi-Tenant Benchmark ---")
+    print(f"Backend: {'mongomock' if args.mongomock else args.uri} | "
+          f"{'sharded, ' + str(len(shards)) + ' shards' if sharded else 'not sharded'} | "
+          f"{args.users} users x {args.readings} readings per clinic, {args.threads} reader threads")
+    print(f"\n{'clinics':>8}{'documents':>12}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'shards/query':>14}")
+
+    rng = random.Random(5)
+    databases, users, p95s = {}, {}, []
+    try:
+        for count in args.tenants:
+            for i in range(len(databases), count):
+                tenant_id = f"bench-{i:03d}"
+                if args.mongomock:
+                    db = client[tenant_db_name(tenant_id)]
+                    ensure_indexes(db)
+                else:
+                    # Spread the clinics' primary shards round-robin
+                    provision_tenant(tenant_id, max_pool_size=args.threads * 2,
+                                     primary_shard=shards[i % len(shards)] if shards else None)
+                    db = connect(tenant_id)
+                users[tenant_id] = seed(db, tenant_id, args.users, args.readings, rng)
+                databases[tenant_id] = db
+
+            latencies = run_phase(databases, users, args.threads, args.duration)
+            first = next(iter(databases))
+            targeted = shards_per_query(databases[first], users[first][0]) if sharded else '-'
+            documents = count * args.users * args.readings
+            p95 = percentile(latencies, 95) * 1000
+            p95s.append(p95)
+            print(f"{count:>8}{documents:>12,}{len(latencies) / args.duration:>9,.0f}"
+                  f"{percentile(latencies, 50) * 1000:>9.2f}{p95:>9.2f}"
+                  f"{percentile(latencies, 99) * 1000:>9.2f}{targeted:>14}")
+    finally:
+        drop = client.drop_database
+        for tenant_id in databases:
+            drop(tenant_db_name(tenant_id))
+        drop(DB_NAME)
+
+    growth = p95s[-1] / p95s[0] if p95s and p95s[0] else 1.0
+    print(f"\np95 at {args.tenants[-1]} clinics is {growth:.2f}x the p95 at {args.tenants[0]}")
+    if growth > args.max_growth:
+        sys.exit(f"Latency grew more than {args.max_growth}x as clinics were added")
+
+
+if __name__ == '__main__':
+    main()
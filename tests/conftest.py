@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture
+def db():
+    """An empty in-memory database (mongomock), one per test"""
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient()['test_db']
@@ -0,0 +1,64 @@
+import datetime
+
+from backend.services.adherence import compute_windows, get_adherence, record_dose_events, summarize_adherence
+
+TODAY = datetime.date(2026, 3, 31)
+
+
+def _day(days_ago):
+    return (TODAY - datetime.timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+def test_windows_count_only_their_days():
+    days = {
+        _day(0): {"taken": 2},
+        _day(6): {"late": 1, "skipped": 1},   # last day of the 7-day window
+        _day(7): {"skipped": 2},              # first day outside it
+        _day(29): {"taken": 4},
+        _day(89): {"taken": 1},
+        _day(90): {"taken": 10},              # beyond every window
+    }
+    windows = compute_windows(days, TODAY)
+
+    assert windows['7d'] == {"taken": 2, "skipped": 1, "late": 1, "total": 4, "rate": 0.75, "on_time_rate": 0.5}
+    assert windows['30d']['total'] == 10 and windows['30d']['rate'] == 0.7
+    assert windows['90d']['total'] == 11 and windows['90d']['taken'] == 7
+
+
+def test_windows_without_doses_have_no_rate():
+    windows = compute_windows({}, TODAY)
+    assert windows['7d'] == {"taken": 0, "skipped": 0, "late": 0, "total": 0, "rate": None, "on_time_rate": None}
+
+
+def test_recorded_events_update_stored_windows(db):
+    now = datetime.datetime.utcnow()
+    events = [
+        {"medication_id": "m1", "status": "taken", "timestamp": now},
+        {"medication_id": "m1", "status": "skipped", "timestamp": now - datetime.timedelta(days=10)},
+        {"medication_id": "m2", "status": "late", "timestamp": now},
+    ]
+    refreshed = record_dose_events(db, 'u1', events)
+    assert refreshed['m1']['7d']['rate'] == 1.0 and refreshed['m1']['30d']['rate'] == 0.5
+
+    record_dose_events(db, 'u1', [{"medication_id": "m1", "status": "taken", "timestamp": now}])
+    stored = db.medication_adherence.find_one({"user_id": "u1", "medication_id": "m1"})
+    assert stored['version'] == 2 and stored['windows']['30d']['total'] == 3
+
+    adherence = get_adherence(db, 'u1', ['m1'])
+    assert list(adherence) == ['m1'] and adherence['m1'] == stored['windows']
+    assert summarize_adherence(get_adherence(db, 'u1'))['total'] == 4
+
+
+def test_stale_windows_are_not_written_over_newer_ones(db):
+    now = datetime.datetime.utcnow()
+    original = db.medication_adherence.find_one_and_update
+
+    def counted_then_raced(*args, **kwargs):
+        doc = original(*args, **kwargs)
+        # Another batch counts and stores its windows before this one stores its own
+        db.medication_adherence.update_one({"_id": doc['_id']}, {"$inc": {"version": 1}, "$set": {"windows": "newer"}})
+        return doc
+
+    db.medication_adherence.find_one_and_update = counted_then_raced
+    record_dose_events(db, 'u1', [{"medication_id": "m1", "status": "taken", "timestamp": now}])
+    assert db.medication_adherence.find_one({"medication_id": "m1"})['windows'] == "newer"
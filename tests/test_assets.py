@@ -0,0 +1,42 @@
+import pytest
+
+from backend.services.assets import minify_css, minify_js
+
+
+def test_css_drops_comments_and_whitespace():
+    source = "/* header */\na  >  b {\n  color:  red;\n  margin: 0 auto;\n}\n"
+    assert minify_css(source) == "a>b{color:red;margin:0 auto}"
+
+
+def test_css_keeps_strings_and_descendant_pseudo_classes():
+    source = '.x :hover, .y { content: "a  /* b */  c"; }'
+    assert minify_css(source) == '.x :hover,.y{content:"a  /* b */  c"}'
+
+
+def test_js_keeps_strings_templates_and_regexes():
+    source = (
+        'var s = "// not a comment";  // a comment\n'
+        'var t = `x ${ a + "}" } y`;\n'
+        'var re = /\\/\\*[/]*\\//g;  /* another */\n'
+    )
+    assert minify_js(source) == 'var s="// not a comment";var t=`x ${ a + "}" } y`;var re=/\\/\\*[/]*\\//g;\n'
+
+
+def test_js_tells_division_from_regex():
+    assert minify_js("var d = a / b / 2;\nreturn /x/.test(d)\n") == "var d=a/b/2;return/x/.test(d)\n"
+
+
+def test_js_keeps_line_breaks_that_can_end_a_statement():
+    source = "let x = 1\nlet y = x\n++x\nfunction f() {\n    return a + +b\n}\n"
+    assert minify_js(source) == "let x=1\nlet y=x\n++x\nfunction f(){return a+ +b}\n"
+
+
+def test_js_joins_lines_that_cannot_end_a_statement():
+    source = "call(\n    a,\n    b\n);\nvar o = {\n    k: 1\n};\n"
+    assert minify_js(source) == "call(a,b);var o={k:1};\n"
+
+
+@pytest.mark.parametrize('source', ['var s = "open', 'var t = `open ${x', '/* open', 'x = /open\n'])
+def test_js_rejects_unterminated_literals(source):
+    with pytest.raises(ValueError):
+        minify_js(source)
@@ -0,0 +1,79 @@
+import pytest
+
+from backend.db import VERSIONED_RETRIES, update_versioned
+
+
+def _add(amount):
+    def apply(doc):
+        doc = doc or {"total": 0}
+        return {**doc, "total": doc['total'] + amount}
+    return apply
+
+
+def test_creates_then_updates(db):
+    key = {"user_id": "u1"}
+    assert update_versioned(db.state, key, _add(2))['version'] == 1
+    written = update_versioned(db.state, key, _add(3))
+    assert (written['total'], written['version']) == (5, 2)
+    assert db.state.count_documents({}) == 1
+
+
+def test_concurrent_write_is_not_lost(db):
+    key = {"user_id": "u1"}
+    update_versioned(db.state, key, _add(1))
+    calls = []
+
+    def apply(doc):
+        calls.append(doc['total'])
+        if len(calls) == 1:
+            # Another writer lands between this read and this write
+            db.state.update_one(key, {"$inc": {"total": 10, "version": 1}})
+        return {**doc, "total": doc['total'] + 1}
+
+    written = update_versioned(db.state, key, apply)
+    assert calls == [1, 11]
+    assert db.state.find_one(key)['total'] == written['total'] == 12
+    assert written['version'] == 3
+
+
+def test_concurrent_create_is_retried_as_update(db):
+    db.state.create_index("user_id", unique=True)
+    key = {"user_id": "u1"}
+    calls = []
+
+    def apply(doc):
+        calls.append(doc)
+        if doc is None:
+            db.state.insert_one({"user_id": "u1", "total": 7, "version": 1})
+        return _add(1)(doc)
+
+    assert update_versioned(db.state, key, apply)['total'] == 8
+    assert calls[0] is None and calls[1]['total'] == 7
+
+
+def test_document_without_version(db):
+    db.state.insert_one({"user_id": "u1", "total": 4})
+    written = update_versioned(db.state, {"user_id": "u1"}, _add(1))
+    assert (written['total'], written['version']) == (5, 1)
+    assert db.state.find_one({"user_id": "u1"})['version'] == 1
+
+
+def test_none_leaves_document_unchanged(db):
+    update_versioned(db.state, {"user_id": "u1"}, _add(1))
+    current = update_versioned(db.state, {"user_id": "u1"}, lambda doc: None)
+    assert (current['total'], current['version']) == (1, 1)
+
+
+def test_gives_up_under_constant_contention(db):
+    key = {"user_id": "u1"}
+    update_versioned(db.state, key, _add(1))
+    attempts = []
+
+    def apply(doc):
+        attempts.append(1)
+        db.state.update_one(key, {"$inc": {"version": 1}})
+        return _add(1)(doc)
+
+    with pytest.raises(RuntimeError, match="contention"):
+        update_versioned(db.state, key, apply)
+    assert len(attempts) == VERSIONED_RETRIES
@@ -0,0 +1,70 @@
+import datetime
+
+import pytest
+
+from backend.services import risk_history as rh
+
+START = datetime.datetime(2026, 1, 1)
+
+
+def _record(db, minutes, score, cardio, user_id='u1'):
+    rh.record_snapshot(db, user_id, {"score": score, "risk_probabilities": {"cardio": cardio}},
+                       f"{minutes}", START + datetime.timedelta(minutes=minutes))
+
+
+def test_unchanged_inputs_are_not_recorded(db):
+    result = {"score": 10, "risk_probabilities": {}}
+    assert rh.record_snapshot(db, 'u1', result, 'same', START)
+    assert not rh.record_snapshot(db, 'u1', result, 'same', START + datetime.timedelta(minutes=1))
+    assert db.risk_history.find_one()['count'] == 1
+
+
+def test_full_bucket_starts_a_new_one(db, monkeypatch):
+    monkeypatch.setattr(rh, 'BUCKET_POINTS', 3)
+    for minutes in range(7):
+        _record(db, minutes, minutes, 0.1)
+    assert [doc['count'] for doc in db.risk_history.find().sort("start", 1)] == [3, 3, 1]
+
+
+def test_hourly_points_average_each_hour(db):
+    for minutes, score, cardio in ((0, 10, 0.1), (30, 30, 0.3), (59, 20, 0.2), (60, 50, 0.5), (185, 40, 0.4)):
+        _record(db, minutes, score, cardio)
+
+    history = rh.risk_history(db, 'u1', START, START + datetime.timedelta(days=1), 'hour')
+    assert history['resolution'] == 'hour' and not history['truncated']
+    assert history['points'] == [
+        {"timestamp": "2026-01-01T00:00:00", "score": 20.0, "max_score": 30,
+         "risk_probabilities": {"cardio": 0.2}, "samples": 3},
+        {"timestamp": "2026-01-01T01:00:00", "score": 50.0, "max_score": 50,
+         "risk_probabilities": {"cardio": 0.5}, "samples": 1},
+        {"timestamp": "2026-01-01T03:00:00", "score": 40.0, "max_score": 40,
+         "risk_probabilities": {"cardio": 0.4}, "samples": 1},
+    ]
+
+
+def test_range_spans_buckets_and_excludes_outside_points(db, monkeypatch):
+    monkeypatch.setattr(rh, 'BUCKET_POINTS', 2)
+    for minutes in range(6):
+        _record(db, minutes * 60, minutes, 0.1)
+    _record(db, 0, 99, 0.9, user_id='u2')
+
+    history = rh.risk_history(db, 'u1', START + datetime.timedelta(hours=1), START + datetime.timedelta(hours=4), 'raw')
+    assert [point['score'] for point in history['points']] == [1, 2, 3, 4]
+
+
+def test_raw_history_keeps_the_newest_points(db, monkeypatch):
+    monkeypatch.setattr(rh, 'MAX_RAW_POINTS', 3)
+    for minutes in range(5):
+        _record(db, minutes, minutes, 0.1)
+    history = rh.risk_history(db, 'u1', START, START + datetime.timedelta(hours=1), 'raw')
+    assert history['truncated'] and [point['score'] for point in history['points']] == [2, 3, 4]
+
+
+@pytest.mark.parametrize('days, resolution', [(1, 'raw'), (2, 'raw'), (3, 'hour'), (60, 'hour'), (61, 'day')])
+def test_auto_resolution(days, resolution):
+    assert rh.auto_resolution(START, START + datetime.timedelta(days=days)) == resolution
+
+
+def test_unknown_resolution(db):
+    with pytest.raises(ValueError):
+        rh.risk_history(db, 'u1', START, START + datetime.timedelta(days=1), 'week')
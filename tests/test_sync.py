@@ -0,0 +1,55 @@
+import datetime
+
+from backend.services.sync import SETTLE_SECONDS, changes_since, record_delete, stamp
+
+
+def _log(db, user_id='u1', heart_rate=70):
+    doc = stamp(db, user_id, {"user_id": user_id, "heart_rate": heart_rate})
+    db.health_logs.insert_one(doc)
+    return doc
+
+
+def _later(seconds=SETTLE_SECONDS + 1):
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+
+
+def test_pages_through_settled_changes(db):
+    docs = [_log(db, heart_rate=60 + i) for i in range(3)]
+    _log(db, user_id='someone_else')
+
+    changes, position, has_more = changes_since(db, 'u1', 0, limit=2, now=_later())
+    assert [doc['heart_rate'] for doc in changes['health_logs']['upserts']] == [60, 61]
+    assert (position, has_more) == (docs[1]['sync_seq'], True)
+
+    changes, position, has_more = changes_since(db, 'u1', position, limit=2, now=_later())
+    assert [doc['heart_rate'] for doc in changes['health_logs']['upserts']] == [62]
+    assert (position, has_more) == (docs[2]['sync_seq'], False)
+
+
+def test_unsettled_changes_do_not_advance_the_position(db):
+    settled = _log(db)
+    fresh = [_log(db) for _ in range(2)]
+    # The first reading settled long ago, the others were just written
+    db.health_logs.update_one({"_id": settled['_id']}, {"$set": {
+        "sync_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=SETTLE_SECONDS + 1)}})
+
+    changes, position, has_more = changes_since(db, 'u1', 0, limit=5)
+    assert len(changes['health_logs']['upserts']) == 3
+    assert (position, has_more) == (settled['sync_seq'], False)
+
+    # A full page with nothing settled: no has_more, or the client would re-read it forever
+    changes, position, has_more = changes_since(db, 'u1', settled['sync_seq'], limit=1)
+    assert [doc['_id'] for doc in changes['health_logs']['upserts']] == [str(fresh[0]['_id'])]
+    assert (position, has_more) == (settled['sync_seq'], False)
+
+
+def test_deletes_come_back_as_tombstones_in_order(db):
+    kept = _log(db)
+    gone = _log(db)
+    db.health_logs.delete_one({"_id": gone['_id']})
+    record_delete(db, 'u1', 'health_logs', gone['_id'])
+
+    changes, position, has_more = changes_since(db, 'u1', 0, now=_later())
+    assert [doc['_id'] for doc in changes['health_logs']['upserts']] == [str(kept['_id'])]
+    assert changes['health_logs']['deletes'] == [str(gone['_id'])]
+    assert position == gone['sync_seq'] + 1 and not has_more
@@ -0,0 +1,76 @@
+import datetime
+import os
+
+from bson import ObjectId, json_util
+
+from backend.services.write_behind import FSYNC_NEVER, WriteBehindBuffer
+
+
+def _reading(minute, user_id='u1'):
+    return {"_id": ObjectId(), "user_id": user_id, "heart_rate": 70,
+            "timestamp": datetime.datetime(2026, 1, 1, 10, minute)}
+
+
+def _buffer(db, wal_dir, **kwargs):
+    return WriteBehindBuffer(lambda: db.health_logs, str(wal_dir), flush_interval=0.01, fsync=FSYNC_NEVER, **kwargs)
+
+
+def _write_segment(wal_dir, name, docs):
+    path = os.path.join(str(wal_dir), name)
+    with open(path, 'w', encoding='utf-8') as fh:
+        for doc in docs:
+            fh.write(json_util.dumps(doc) + "\n")
+    return path
+
+
+def test_submitted_readings_are_flushed_and_wal_removed(db, tmp_path):
+    buffer = _buffer(db, tmp_path, prepare=lambda docs: [doc.update(stamped=True) for doc in docs])
+    buffer.start()
+    ids = [buffer.submit(_reading(minute)) for minute in range(5)]
+    buffer.stop()
+
+    assert sorted(doc['_id'] for doc in db.health_logs.find({"stamped": True})) == sorted(ids)
+    assert buffer.stats['flushed'] == 5
+    assert os.listdir(tmp_path) == []
+
+
+def test_replay_skips_readings_already_written(db, tmp_path):
+    flushed, lost = _reading(0), _reading(1)
+    db.health_logs.insert_one(dict(flushed))
+    path = _write_segment(tmp_path, 'health_logs.999999.00000001.wal', [flushed, lost])
+
+    buffer = _buffer(db, tmp_path)
+    assert buffer.replay() == 2
+    assert db.health_logs.count_documents({}) == 2
+    assert db.health_logs_dead_letter.count_documents({}) == 0
+    assert not os.path.exists(path)
+
+
+def test_replay_ignores_torn_final_line(db, tmp_path):
+    path = _write_segment(tmp_path, 'health_logs.999999.00000001.wal', [_reading(0)])
+    with open(path, 'a', encoding='utf-8') as fh:
+        fh.write('{"_id": {"$oid": "')
+
+    assert _buffer(db, tmp_path).replay() == 1
+    assert db.health_logs.count_documents({}) == 1
+
+
+def test_rejected_reading_is_dead_lettered(db, tmp_path):
+    db.health_logs.create_index([("user_id", 1), ("timestamp", 1)], unique=True)
+    original = _reading(0)
+    db.health_logs.insert_one(dict(original))
+    clash = {**_reading(0), "heart_rate": 90}
+    fresh = _reading(1)
+
+    buffer = _buffer(db, tmp_path)
+    buffer._insert([dict(original), clash, fresh])
+
+    assert db.health_logs.count_documents({}) == 2
+    dead = list(db.health_logs_dead_letter.find())
+    assert [doc['_id'] for doc in dead] == [clash['_id']]
+    assert dead[0]['code'] == 11000 and dead[0]['doc']['heart_rate'] == 90
+    assert buffer.stats['dead_lettered'] == 1
+
+    # Replaying the same batch files nothing twice
+    buffer._insert([dict(original), clash, fresh])
+    assert db.health_logs_dead_letter.count_documents({}) == 1